@@ -0,0 +1,144 @@
+import asyncio
+import logging
+import os
+from datetime import datetime, timezone, timedelta
+from typing import Dict, Any, Iterable, Optional
+
+from pymongo.errors import DuplicateKeyError
+
+ATTENDANCE_RECONCILE_SECONDS = float(os.getenv('ATTENDANCE_RECONCILE_SECONDS', '300'))
+
+COUNTERS_ID = "attendance"
+# One worker per interval holds this lease and runs the periodic reconcile
+RECONCILE_LEASE_ID = "attendance_reconcile"
+RECONCILE_ATTEMPTS = 3
+COUNTER_FIELDS = ("total_registrations", "completed_payments", "checked_in")
+
+def deltas_for(regs: Iterable[Dict[str, Any]], sign: int = 1) -> Dict[str, int]:
+    """Counter changes for adding (sign=1) or removing (sign=-1) registrations"""
+    deltas = {field: 0 for field in COUNTER_FIELDS}
+    for reg in regs:
+        deltas["total_registrations"] += sign
+        if reg.get("estado_pago") == "completado":
+            deltas["completed_payments"] += sign
+        if reg.get("check_in"):
+            deltas["checked_in"] += sign
+    return deltas
+
+class AttendanceCounters:
+    """
+    Running totals in `counters/attendance`, so the gate dashboard reads one
+    document instead of counting registrations.
+
+    Writers call `bump` with the change they made, in the same request;
+    the document is only ever created by a full count, at startup or on
+    the first bump or read that finds it missing.
+    Each `reconcile_interval` seconds one worker (whichever takes the
+    lease) recounts from `registrations` and $incs the difference, which
+    corrects any drift left by failed or racing writes. Every bump also
+    increments `version`; a correction only applies if the version is the
+    one read before counting, so it never overwrites a concurrent bump.
+    """
+
+    def __init__(self, db, reconcile_interval: float = ATTENDANCE_RECONCILE_SECONDS):
+        self.db = db
+        self.reconcile_interval = reconcile_interval
+        self._task = None
+
+    async def start(self):
+        if self._task is None:
+            try:
+                # Counters never reconciled (a new deployment on an existing
+                # database) would otherwise show near-zero totals until the first run
+                await self.read()
+            except Exception as e:
+                logging.error(f"Attendance counters startup reconcile error: {str(e)}")
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def bump(self, **deltas: int):
+        deltas = {field: value for field, value in deltas.items() if value}
+        if not deltas:
+            return
+        result = await self.db.counters.update_one({"_id": COUNTERS_ID}, {"$inc": {**deltas, "version": 1}})
+        if not result.matched_count:
+            # No counters yet: a full count already includes this change
+            await self.reconcile()
+
+    async def read(self) -> Dict[str, Any]:
+        doc = await self.db.counters.find_one({"_id": COUNTERS_ID})
+        if doc is None or "reconciled_at" not in doc:
+            doc = await self.reconcile()
+        return {field: doc.get(field, 0) for field in COUNTER_FIELDS}
+
+    async def _count(self) -> Dict[str, int]:
+        return {
+            "total_registrations": await self.db.registrations.count_documents({}),
+            "completed_payments": await self.db.registrations.count_documents({"estado_pago": "completado"}),
+            "checked_in": await self.db.registrations.count_documents({"check_in": True}),
+        }
+
+    async def reconcile(self) -> Dict[str, Any]:
+        """Recount from registrations and $inc the counters by the drift, if no bump raced the count"""
+        previous: Optional[Dict[str, Any]] = None
+        for _ in range(RECONCILE_ATTEMPTS):
+            previous = await self.db.counters.find_one({"_id": COUNTERS_ID})
+            counts = await self._count()
+            now = datetime.now(timezone.utc)
+
+            if previous is None:
+                doc = {"_id": COUNTERS_ID, **counts, "version": 0, "reconciled_at": now}
+                try:
+                    await self.db.counters.insert_one(doc)
+                    return doc
+                except DuplicateKeyError:
+                    # A bump created it meanwhile; count again against it
+                    continue
+
+            drift = {field: counts[field] - previous.get(field, 0) for field in COUNTER_FIELDS
+                     if counts[field] != previous.get(field, 0)}
+            version = previous.get("version")
+            guard = {"_id": COUNTERS_ID, "version": version if version is not None else {"$exists": False}}
+            update: Dict[str, Any] = {"$set": {"reconciled_at": now}}
+            if drift:
+                update["$inc"] = {**drift, "version": 1}
+            result = await self.db.counters.update_one(guard, update)
+            if result.matched_count:
+                if drift:
+                    logging.warning(f"Attendance counters drifted, corrected by {drift}")
+                return {**previous, **counts, "reconciled_at": now}
+
+        logging.info("Attendance counters changed during every recount; reconcile left for the next run")
+        return previous or {}
+
+    async def _claim_reconcile(self) -> bool:
+        """Take the reconcile lease for this interval; False if another worker holds it"""
+        now = datetime.now(timezone.utc)
+        try:
+            await self.db.counters.update_one(
+                {"_id": RECONCILE_LEASE_ID, "lease_until": {"$lte": now}},
+                {"$set": {"lease_until": now + timedelta(seconds=self.reconcile_interval * 0.9)}},
+                upsert=True
+            )
+        except DuplicateKeyError:
+            return False
+        return True
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(self.reconcile_interval)
+            try:
+                if await self._claim_reconcile():
+                    await self.reconcile()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logging.error(f"Attendance counters reconcile error: {str(e)}")
@@ -0,0 +1,97 @@
+#!/usr/bin/env python3
+"""
+Benchmark de concurrencia del canje de cupones.
+
+Crea un cupón de prueba con `usos_maximos` limitado y lanza N canjes en
+paralelo, primero con el patrón anterior (leer el cupón, validar y luego
+`$inc` incondicional) y después con `reserve_coupon` (un único
+find_one_and_update condicionado a usos_actuales < usos_maximos).
+Reporta cuántos canjes se aceptaron, el valor final de usos_actuales y la
+latencia. El cupón de prueba se elimina al terminar.
+
+Requiere MONGO_URL y DB_NAME (backend/.env) de un MongoDB real: mongomock
+serializa las operaciones, así que ahí la carrera no se reproduce y los
+dos caminos dan el mismo resultado.
+
+Uso:
+  python3 bench_coupon_redemption.py [canjes_paralelos] [usos_maximos]
+"""
+
+import asyncio
+import os
+import sys
+import time
+import uuid
+from pathlib import Path
+
+from dotenv import load_dotenv
+from motor.motor_asyncio import AsyncIOMotorClient
+
+from coupon_redemption import RESERVED, reserve_coupon
+
+ROOT_DIR = Path(__file__).parent
+load_dotenv(ROOT_DIR / '.env')
+
+async def legacy_redeem(db, codigo: str) -> bool:
+    """Lo que hacía create_registration: leer, validar y sumar sin condición"""
+    coupon = await db.coupons.find_one({"codigo": codigo, "activo": True})
+    if not coupon:
+        return False
+    if coupon.get("usos_maximos") and coupon.get("usos_actuales", 0) >= coupon["usos_maximos"]:
+        return False
+    await db.coupons.update_one({"codigo": codigo}, {"$inc": {"usos_actuales": 1}})
+    return True
+
+async def atomic_redeem(db, codigo: str) -> bool:
+    outcome, _ = await reserve_coupon(db, codigo)
+    return outcome == RESERVED
+
+async def run(db, name: str, redeem, parallel: int, max_uses: int):
+    codigo = f"BENCH-{uuid.uuid4().hex[:8].upper()}"
+    await db.coupons.insert_one({
+        "id": str(uuid.uuid4()), "codigo": codigo, "tipo_descuento": 10,
+        "usos_maximos": max_uses, "usos_actuales": 0, "activo": True,
+    })
+    latencies = []
+
+    async def one():
+        started = time.perf_counter()
+        accepted = await redeem(db, codigo)
+        latencies.append((time.perf_counter() - started) * 1000)
+        return accepted
+
+    try:
+        started = time.perf_counter()
+        results = await asyncio.gather(*[one() for _ in range(parallel)])
+        elapsed = time.perf_counter() - started
+        final = (await db.coupons.find_one({"codigo": codigo}))["usos_actuales"]
+    finally:
+        await db.coupons.delete_one({"codigo": codigo})
+
+    latencies.sort()
+    accepted = sum(results)
+    print(f"{name:<28} aceptados {accepted:>4}/{parallel}  usos_actuales {final:>4}/{max_uses}  "
+          f"sobre-canje {max(0, final - max_uses):>4}  "
+          f"p50 {latencies[len(latencies) // 2]:7.1f} ms  p95 {latencies[int(len(latencies) * 0.95)]:7.1f} ms  "
+          f"total {elapsed:5.2f} s")
+    return final - max_uses
+
+async def main():
+    parallel = int(sys.argv[1]) if len(sys.argv) > 1 else 500
+    max_uses = int(sys.argv[2]) if len(sys.argv) > 2 else 100
+
+    # Pool grande para que los canjes lleguen realmente en paralelo a Mongo
+    client = AsyncIOMotorClient(os.environ['MONGO_URL'], maxPoolSize=parallel)
+    db = client[os.environ['DB_NAME']]
+
+    print(f"{parallel} canjes en paralelo sobre un cupón con {max_uses} usos\n")
+    await run(db, "leer + $inc (anterior)", legacy_redeem, parallel, max_uses)
+    over = await run(db, "find_one_and_update", atomic_redeem, parallel, max_uses)
+    client.close()
+
+    if over > 0:
+        print("\nERROR: el canje atómico sobre-canjeó el cupón")
+        sys.exit(1)
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,229 @@
+#!/usr/bin/env python3
+"""
+Benchmark del render del email de confirmación.
+
+Compara el costo por render del f-string anterior de server.py
+(generate_confirmation_email, reproducido aquí tal cual) con el de
+email_templates.py, que es el mismo f-string pero escapa cada valor.
+
+Uso:
+  python3 bench_email_templates.py [cantidad]
+"""
+
+import hashlib
+import sys
+import time
+import urllib.parse
+import uuid
+
+from email_templates import generate_qr_url, render_confirmation_email
+
+SECRET = "bench-secret"
+
+def legacy_qr_url(registration_id: str, secret_key: str) -> str:
+    """generate_qr_url tal como estaba en server.py"""
+    verification_hash = hashlib.sha256(
+        f"{registration_id}{secret_key}".encode()
+    ).hexdigest()[:16]
+    qr_data = f"{registration_id}|{verification_hash}"
+    encoded_data = urllib.parse.quote(qr_data)
+    return f"https://quickchart.io/qr?text={encoded_data}&size=200&dark=000000&light=ffffff"
+
+def legacy_confirmation_email(registration: dict, secret_key: str) -> str:
+    """generate_confirmation_email tal como estaba en server.py: un f-string por email"""
+    # Generate QR URL for email (quickchart.io is compatible with all email clients)
+    qr_url = legacy_qr_url(registration['id'], secret_key)
+    
+    categories_html = ''.join([f'<tr><td style="padding: 5px 10px; color: #333333; font-size: 14px;">• {cat}</td></tr>' for cat in registration['categorias']])
+    
+    return f"""
+    <!DOCTYPE html>
+    <html>
+    <head>
+        <meta charset="UTF-8">
+        <meta name="viewport" content="width=device-width, initial-scale=1.0">
+    </head>
+    <body style="margin: 0; padding: 0; font-family: Arial, Helvetica, sans-serif; background-color: #f4f4f4;">
+        <table role="presentation" width="100%" cellspacing="0" cellpadding="0" border="0" style="background-color: #f4f4f4;">
+            <tr>
+                <td align="center" style="padding: 20px 10px;">
+                    <table role="presentation" width="600" cellspacing="0" cellpadding="0" border="0" style="background-color: #ffffff; max-width: 600px;">
+                        
+                        <!-- Header -->
+                        <tr>
+                            <td style="background-color: #DC2626; padding: 30px 20px; text-align: center;">
+                                <h1 style="margin: 0; color: #ffffff; font-size: 28px; font-weight: bold;">INSCRIPCIÓN CONFIRMADA</h1>
+                                <p style="margin: 10px 0 0 0; color: #ffffff; font-size: 16px;">Campeonato Interligas Super GP Corona XP 2026</p>
+                            </td>
+                        </tr>
+                        
+                        <!-- Welcome -->
+                        <tr>
+                            <td style="padding: 30px 30px 20px 30px;">
+                                <h2 style="margin: 0 0 15px 0; color: #DC2626; font-size: 22px;">¡Bienvenido al campeonato!</h2>
+                                <p style="margin: 0 0 10px 0; color: #333333; font-size: 16px; line-height: 1.5;">
+                                    Estimado/a <strong>{registration['nombre']} {registration['apellido']}</strong>,
+                                </p>
+                                <p style="margin: 0; color: #333333; font-size: 16px; line-height: 1.5;">
+                                    Tu inscripción ha sido confirmada exitosamente para el Campeonato Interligas Super GP Corona XP 2026.
+                                </p>
+                            </td>
+                        </tr>
+                        
+                        <!-- QR Code Section -->
+                        <tr>
+                            <td style="padding: 0 30px 20px 30px;">
+                                <table role="presentation" width="100%" cellspacing="0" cellpadding="0" border="0" style="background-color: #f8f9fa; border: 2px dashed #10B981; border-radius: 8px;">
+                                    <tr>
+                                        <td style="padding: 25px; text-align: center;">
+                                            <h3 style="margin: 0 0 15px 0; color: #333333; font-size: 18px; font-weight: bold;">Tu Código QR de Acceso</h3>
+                                            <img src="{qr_url}" alt="Código QR" width="200" height="200" style="display: block; margin: 0 auto; border: 4px solid #ffffff; box-shadow: 0 2px 8px rgba(0,0,0,0.1);" />
+                                            <p style="margin: 15px 0 0 0; color: #666666; font-size: 14px;">Presenta este QR el día del evento para tu check-in</p>
+                                        </td>
+                                    </tr>
+                                </table>
+                            </td>
+                        </tr>
+                        
+                        <!-- Details Section -->
+                        <tr>
+                            <td style="padding: 0 30px 20px 30px;">
+                                <h3 style="margin: 0 0 15px 0; color: #10B981; font-size: 18px; border-bottom: 2px solid #10B981; padding-bottom: 10px;">Detalles de tu inscripción</h3>
+                                <table role="presentation" width="100%" cellspacing="0" cellpadding="0" border="0">
+                                    <tr>
+                                        <td style="padding: 8px 0; border-bottom: 1px solid #eeeeee;">
+                                            <strong style="color: #10B981;">ID de Inscripción:</strong>
+                                            <span style="color: #333333; margin-left: 10px;">{registration['id']}</span>
+                                        </td>
+                                    </tr>
+                                    <tr>
+                                        <td style="padding: 8px 0; border-bottom: 1px solid #eeeeee;">
+                                            <strong style="color: #10B981;">Número de Competición:</strong>
+                                            <span style="color: #333333; margin-left: 10px; font-weight: bold; font-size: 18px;">#{registration['numero_competicion']}</span>
+                                        </td>
+                                    </tr>
+                                    <tr>
+                                        <td style="padding: 8px 0; border-bottom: 1px solid #eeeeee;">
+                                            <strong style="color: #10B981;">Cédula:</strong>
+                                            <span style="color: #333333; margin-left: 10px;">{registration['cedula']}</span>
+                                        </td>
+                                    </tr>
+                                    <tr>
+                                        <td style="padding: 8px 0; border-bottom: 1px solid #eeeeee;">
+                                            <strong style="color: #10B981;">Categorías:</strong>
+                                        </td>
+                                    </tr>
+                                    {categories_html}
+                                    <tr>
+                                        <td style="padding: 8px 0; border-bottom: 1px solid #eeeeee;">
+                                            <strong style="color: #10B981;">Precio Total:</strong>
+                                            <span style="color: #333333; margin-left: 10px; font-weight: bold;">COP {registration['precio_final']:,.0f}</span>
+                                        </td>
+                                    </tr>
+                                    <tr>
+                                        <td style="padding: 8px 0;">
+                                            <strong style="color: #10B981;">Estado de Pago:</strong>
+                                            <span style="color: #ffffff; margin-left: 10px; background-color: #10B981; padding: 3px 10px; border-radius: 4px; font-weight: bold; font-size: 12px;">{registration['estado_pago'].upper()}</span>
+                                        </td>
+                                    </tr>
+                                </table>
+                            </td>
+                        </tr>
+                        
+                        <!-- Event Info -->
+                        <tr>
+                            <td style="padding: 0 30px 20px 30px;">
+                                <h3 style="margin: 0 0 15px 0; color: #10B981; font-size: 18px; border-bottom: 2px solid #10B981; padding-bottom: 10px;">Información del Evento</h3>
+                                <p style="margin: 0 0 8px 0; color: #333333; font-size: 15px;">
+                                    <strong>Fechas:</strong> 27, 28 de Febrero y 1 de Marzo 2026
+                                </p>
+                                <p style="margin: 0; color: #333333; font-size: 15px;">
+                                    <strong>Ubicación:</strong> Corona Club XP, Avenida Panamericana Km 9 El Cofre, Popayán
+                                </p>
+                            </td>
+                        </tr>
+                        
+                        <!-- Important Notice -->
+                        <tr>
+                            <td style="padding: 0 30px 20px 30px;">
+                                <table role="presentation" width="100%" cellspacing="0" cellpadding="0" border="0" style="background-color: #DC2626; border-radius: 8px;">
+                                    <tr>
+                                        <td style="padding: 15px 20px; text-align: center;">
+                                            <p style="margin: 0; color: #ffffff; font-size: 14px; font-weight: bold;">
+                                                ⚠️ IMPORTANTE: Lleva tu QR code impreso o en tu celular el día del evento
+                                            </p>
+                                        </td>
+                                    </tr>
+                                </table>
+                            </td>
+                        </tr>
+                        
+                        <!-- Contact -->
+                        <tr>
+                            <td style="padding: 0 30px 30px 30px;">
+                                <p style="margin: 0 0 15px 0; color: #333333; font-size: 14px;">
+                                    Para cualquier consulta, contáctanos en <a href="mailto:inscripcionescorona@gmail.com" style="color: #10B981; text-decoration: none; font-weight: bold;">inscripcionescorona@gmail.com</a>
+                                </p>
+                                <p style="margin: 0; color: #DC2626; font-size: 16px; font-weight: bold;">
+                                    ¡Nos vemos en la pista! 🏁
+                                </p>
+                            </td>
+                        </tr>
+                        
+                        <!-- Footer -->
+                        <tr>
+                            <td style="background-color: #1a1a1a; padding: 20px 30px; text-align: center;">
+                                <p style="margin: 0; color: #999999; font-size: 12px;">
+                                    © 2026 Corona Club XP - Campeonato Interligas Super GP
+                                </p>
+                            </td>
+                        </tr>
+                        
+                    </table>
+                </td>
+            </tr>
+        </table>
+    </body>
+    </html>
+    """
+
+def sample_registrations(count: int) -> list:
+    return [
+        {
+            "id": str(uuid.uuid4()),
+            "nombre": f"Piloto {i}",
+            "apellido": "Pérez & Hijos",
+            "cedula": str(10000000 + i),
+            "numero_competicion": str(i),
+            "categorias": ["115cc Elite", "SuperMoto", "Hasta 220 4T Elite"],
+            "precio_final": 300000.0,
+            "estado_pago": "completado",
+        }
+        for i in range(count)
+    ]
+
+def per_render_us(label: str, started: float, count: int) -> float:
+    elapsed = time.perf_counter() - started
+    print(f"{label:<32} {elapsed / count * 1e6:10.1f} µs/render   ({elapsed:.3f}s total)")
+    return elapsed
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    registrations = sample_registrations(count)
+    print(f"Renderizando {count} emails de confirmación\n")
+    # Mismo QR en el email que antes: los ya enviados deben seguir validando
+    assert all(legacy_qr_url(reg["id"], SECRET) == generate_qr_url(reg["id"], SECRET) for reg in registrations)
+
+    started = time.perf_counter()
+    for reg in registrations:
+        legacy_confirmation_email(reg, SECRET)
+    before = per_render_us("antes: f-string", started, count)
+
+    started = time.perf_counter()
+    for reg in registrations:
+        render_confirmation_email(reg, SECRET)
+    after = per_render_us("después: f-string escapado", started, count)
+    print(f"\nescapar cuesta {(after - before) / count * 1e6:.1f} µs por email")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,54 @@
+#!/usr/bin/env python3
+"""
+Benchmark de las variantes WebP de las imágenes subidas.
+
+Para cada foto (o una de 4000x3000 generada si no se indica ninguna)
+mide el tiempo de render_variant y el peso de thumb, medium y full
+frente al original que servía /uploads.
+
+Uso:
+  python3 bench_image_variants.py [foto.jpg ...]
+"""
+
+import io
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+from PIL import Image
+
+from image_variants import IMAGE_VARIANTS, IMAGE_WEBP_QUALITY, render_variant
+
+REPEAT = 3
+
+def sample_photo(directory: Path) -> Path:
+    """Ruido con gradiente: comprime como una foto real, no como un color plano"""
+    noise = Image.effect_noise((4000, 3000), 40).convert("RGB")
+    gradient = Image.linear_gradient("L").resize((4000, 3000)).convert("RGB")
+    path = directory / "muestra.jpg"
+    Image.blend(noise, gradient, 0.6).save(path, "JPEG", quality=92)
+    return path
+
+def main():
+    with tempfile.TemporaryDirectory() as tmp:
+        photos = [Path(arg) for arg in sys.argv[1:]] or [sample_photo(Path(tmp))]
+        for photo in photos:
+            original = photo.stat().st_size
+            with Image.open(photo) as image:
+                print(f"\n{photo.name}: {image.size[0]}x{image.size[1]}, {original / 1024:.0f} KB "
+                      f"(WebP calidad {IMAGE_WEBP_QUALITY}, mejor de {REPEAT})")
+
+            for variant, size in IMAGE_VARIANTS.items():
+                best = float("inf")
+                for _ in range(REPEAT):
+                    started = time.perf_counter()
+                    webp = render_variant(photo, size)
+                    best = min(best, time.perf_counter() - started)
+                with Image.open(io.BytesIO(webp)) as image:
+                    dimensions = f"{image.size[0]}x{image.size[1]}"
+                print(f"  {variant:<8} {dimensions:>11} {best * 1000:8.1f} ms   {len(webp) / 1024:8.0f} KB   "
+                      f"{len(webp) / original:.1%} del original")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,96 @@
+#!/usr/bin/env python3
+"""
+Benchmark de serialización de listados grandes de inscripciones.
+
+Compara el camino anterior de GET /registrations (convertir created_at
+con fromisoformat fila por fila, jsonable_encoder y json de la librería
+estándar) contra OrjsonResponse, y mide el tamaño y el costo de
+comprimir el cuerpo con gzip y Brotli (si está instalado).
+
+Uso:
+  python3 bench_json_responses.py [filas ...]
+"""
+
+import json
+import sys
+import time
+import uuid
+from datetime import datetime, timezone, timedelta
+
+from fastapi.encoders import jsonable_encoder
+
+from compression import GZIP_LEVEL, BROTLI_QUALITY, brotli, compress
+from json_responses import dumps
+
+REPEAT = 5
+
+def sample_registrations(count: int) -> list:
+    start = datetime(2026, 1, 15, tzinfo=timezone.utc)
+    return [
+        {
+            "id": str(uuid.uuid4()),
+            "nombre": f"Piloto {i}",
+            "apellido": "Muñoz Pérez",
+            "cedula": str(1000000000 + i),
+            "numero_competicion": str(i % 999),
+            "celular": "3001234567",
+            "correo": f"piloto{i}@example.com",
+            "liga": "Liga de Motociclismo del Cauca",
+            "categorias": ["SUPERMOTO PRO", "VELOTIERRA 4T"][: 1 + i % 2],
+            "precio_base": 144000.0,
+            "descuento": 0.0,
+            "precio_final": 144000.0,
+            "comision_plataforma": 7200.0,
+            "neto_evento": 136800.0,
+            "codigo_cupon": None,
+            "estado_pago": "completado" if i % 3 else "pendiente_pago",
+            "mercadopago_payment_id": None,
+            "mercadopago_preference_id": None,
+            "check_in": False,
+            "check_in_time": None,
+            # Como se guarda hoy: texto ISO
+            "created_at": (start + timedelta(minutes=i)).isoformat(),
+        }
+        for i in range(count)
+    ]
+
+def legacy_render(page: dict) -> bytes:
+    """Lo que hacían get_registrations y JSONResponse"""
+    for reg in page["registrations"]:
+        if isinstance(reg.get('created_at'), str):
+            reg['created_at'] = datetime.fromisoformat(reg['created_at'])
+    content = jsonable_encoder(page)
+    return json.dumps(content, ensure_ascii=False, allow_nan=False, indent=None, separators=(",", ":")).encode("utf-8")
+
+def timed(fn, make_input) -> tuple:
+    best = float("inf")
+    for _ in range(REPEAT):
+        value = make_input()
+        started = time.perf_counter()
+        result = fn(value)
+        best = min(best, time.perf_counter() - started)
+    return best * 1000, result
+
+def main():
+    sizes = [int(arg) for arg in sys.argv[1:]] or [1000, 5000, 20000]
+    for count in sizes:
+        rows = sample_registrations(count)
+        page = lambda: {"registrations": [dict(row) for row in rows], "next_cursor": None}
+        print(f"\n{count} inscripciones (mejor de {REPEAT})")
+
+        legacy_ms, legacy_body = timed(legacy_render, page)
+        orjson_ms, body = timed(dumps, page)
+        print(f"  {'antes: fromisoformat + json':<34} {legacy_ms:8.1f} ms   {len(legacy_body) / 1024:8.0f} KB")
+        print(f"  {'después: orjson':<34} {orjson_ms:8.1f} ms   {len(body) / 1024:8.0f} KB   "
+              f"x{legacy_ms / orjson_ms:.1f}")
+
+        encodings = [("gzip", f"gzip -{GZIP_LEVEL}")]
+        if brotli is not None:
+            encodings.append(("br", f"brotli q{BROTLI_QUALITY}"))
+        for encoding, label in encodings:
+            compress_ms, compressed = timed(lambda b: compress(b, encoding), lambda: body)
+            print(f"  {'  + ' + label:<34} {compress_ms:8.1f} ms   {len(compressed) / 1024:8.0f} KB   "
+                  f"{len(compressed) / len(body):.0%} del original")
+
+if __name__ == "__main__":
+    main()
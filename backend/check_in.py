@@ -0,0 +1,140 @@
+import os
+import uuid
+from datetime import datetime, timezone, timedelta
+from typing import Optional, Tuple, Dict, Any, List
+
+from pymongo import ReturnDocument, UpdateOne
+
+from gate_manifest import gate_version_now
+
+# Gate devices buffer scans while offline, so scans may arrive hours late,
+# but never from further back than the event or ahead of the server clock
+SCAN_MAX_AGE = timedelta(hours=float(os.getenv('CHECK_IN_SCAN_MAX_AGE_HOURS', '72')))
+SCAN_MAX_CLOCK_SKEW = timedelta(seconds=float(os.getenv('CHECK_IN_SCAN_MAX_SKEW_SECONDS', '300')))
+
+CHECKED_IN = "checked_in"
+ALREADY_CHECKED_IN = "already_checked_in"
+UNPAID = "unpaid"
+NOT_FOUND = "not_found"
+
+# Result code -> (HTTP status, message shown at the gate)
+CHECK_IN_RESULTS = {
+    CHECKED_IN: (200, "Check-in exitoso"),
+    ALREADY_CHECKED_IN: (409, "Este piloto ya hizo check-in"),
+    UNPAID: (400, "El pago no está completado"),
+    NOT_FOUND: (404, "Inscripción no encontrada"),
+}
+
+CHECK_IN_PROJECTION = {
+    "_id": 0, "id": 1, "nombre": 1, "apellido": 1, "numero_competicion": 1,
+    "categorias": 1, "check_in": 1, "check_in_time": 1, "check_in_gate": 1, "check_in_batch": 1,
+    "estado_pago": 1,
+}
+
+def check_in_filter(registration_id: str) -> Dict[str, Any]:
+    """Matches only a paid registration that has not checked in yet"""
+    return {"id": registration_id, "check_in": False, "estado_pago": "completado"}
+
+def check_in_update(when: datetime, gate_id: Optional[str] = None,
+                    batch_id: Optional[str] = None) -> Dict[str, Any]:
+    fields = {"check_in": True, "check_in_time": when, "gate_version": gate_version_now()}
+    if gate_id:
+        fields["check_in_gate"] = gate_id
+    if batch_id:
+        # Lets batch_check_in tell its own writes from concurrent ones
+        fields["check_in_batch"] = batch_id
+    return {"$set": fields}
+
+def classify_failure(reg: Optional[Dict[str, Any]]) -> str:
+    """Explain why check_in_filter did not match `reg`"""
+    if reg is None:
+        return NOT_FOUND
+    if reg.get("check_in"):
+        return ALREADY_CHECKED_IN
+    return UNPAID
+
+async def atomic_check_in(db, registration_id: str, when: datetime,
+                          gate_id: Optional[str] = None) -> Tuple[str, Optional[Dict[str, Any]]]:
+    """
+    Check a pilot in with a single conditional find_one_and_update, so two
+    scanners reading the same QR cannot both succeed. Only the failure path
+    needs a second read, to report which condition failed.
+    """
+    reg = await db.registrations.find_one_and_update(
+        check_in_filter(registration_id),
+        check_in_update(when, gate_id),
+        projection=CHECK_IN_PROJECTION,
+        return_document=ReturnDocument.AFTER
+    )
+    if reg is not None:
+        return CHECKED_IN, reg
+
+    current = await db.registrations.find_one({"id": registration_id}, CHECK_IN_PROJECTION)
+    return classify_failure(current), current
+
+class ScanTimeOutOfRange(ValueError):
+    """A client scan time too far in the past or in the future of the server clock"""
+
+def parse_scanned_at(value: Optional[str], now: Optional[datetime] = None) -> datetime:
+    now = now or datetime.now(timezone.utc)
+    if not value:
+        return now
+    scanned_at = datetime.fromisoformat(value.replace("Z", "+00:00"))
+    scanned_at = scanned_at if scanned_at.tzinfo else scanned_at.replace(tzinfo=timezone.utc)
+    # check_in_time orders conflicts between gates: a bad device clock must not win them
+    if not now - SCAN_MAX_AGE <= scanned_at <= now + SCAN_MAX_CLOCK_SKEW:
+        raise ScanTimeOutOfRange(value)
+    return scanned_at
+
+async def batch_check_in(db, records: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """
+    Apply many scans `{registration_id, scanned_at, gate_id}` with one
+    unordered bulk_write of conditional updates and one read to attribute
+    the outcome of each record. The scan time is kept as check_in_time;
+    a record that lost (earlier scan, other gate or a previous sync)
+    carries a `conflict` with the check-in that won.
+    """
+    # Parse every timestamp before applying anything, so a bad record rejects the whole batch
+    now = datetime.now(timezone.utc)
+    scans = [(parse_scanned_at(record.get("scanned_at"), now), record) for record in records]
+    if not scans:
+        return []
+
+    # Within the batch only the earliest scan of each pilot is written; the
+    # server would apply duplicate updates in no particular order
+    winners: Dict[str, Tuple[datetime, Dict[str, Any]]] = {}
+    for scanned_at, record in scans:
+        current = winners.get(record["registration_id"])
+        if current is None or scanned_at < current[0]:
+            winners[record["registration_id"]] = (scanned_at, record)
+
+    batch_id = str(uuid.uuid4())
+    await db.registrations.bulk_write([
+        UpdateOne(check_in_filter(registration_id), check_in_update(scanned_at, record.get("gate_id"), batch_id))
+        for registration_id, (scanned_at, record) in winners.items()
+    ], ordered=False)
+
+    regs = await db.registrations.find({"id": {"$in": list(winners)}}, CHECK_IN_PROJECTION).to_list(len(winners))
+    regs_by_id = {reg["id"]: reg for reg in regs}
+
+    results = []
+    for scanned_at, record in scans:
+        registration_id = record["registration_id"]
+        reg = regs_by_id.get(registration_id)
+        won = (
+            reg is not None
+            and reg.get("check_in_batch") == batch_id
+            and winners[registration_id][1] is record
+        )
+        code = CHECKED_IN if won else classify_failure(reg)
+        result = {"registration_id": registration_id, "scanned_at": scanned_at.isoformat(), "code": code}
+        if code == CHECKED_IN:
+            # What the live dashboards show for a new check-in
+            result["pilot"] = {field: reg.get(field) for field in ("nombre", "apellido", "numero_competicion")}
+        if code == ALREADY_CHECKED_IN:
+            result["conflict"] = {
+                "check_in_time": reg.get("check_in_time"),
+                "gate_id": reg.get("check_in_gate"),
+            }
+        results.append(result)
+    return results
@@ -0,0 +1,106 @@
+from datetime import datetime, timezone
+from typing import Optional, Dict, Any, Iterable, List, Tuple
+
+from pymongo import UpdateOne
+
+from date_migration import to_datetime
+
+# Registrations do not carry an event id yet; everything belongs to the default event
+DEFAULT_EVENT_ID = "default"
+
+ROLLUP_FIELDS = {
+    "total_revenue": "precio_final",
+    "total_commission": "comision_plataforma",
+    "total_net_to_events": "neto_evento",
+}
+ROLLUP_PROJECTION = {
+    "_id": 0, "id": 1, "event_id": 1, "created_at": 1, "estado_pago": 1,
+    "precio_final": 1, "comision_plataforma": 1, "neto_evento": 1,
+}
+
+def rollup_day(created_at: Any) -> str:
+    """UTC day (YYYY-MM-DD) a registration is counted under: the day it was created"""
+    when = to_datetime(created_at)
+    if when is not None:
+        return when.astimezone(timezone.utc).date().isoformat()
+    # Legacy string dates that do not parse still start with the day
+    if isinstance(created_at, str) and created_at:
+        return created_at[:10]
+    return datetime.now(timezone.utc).date().isoformat()
+
+def _accumulate(regs: Iterable[Dict[str, Any]], sign: int) -> Dict[Tuple[str, str], Dict[str, float]]:
+    totals: Dict[Tuple[str, str], Dict[str, float]] = {}
+    for reg in regs:
+        key = (reg.get("event_id") or DEFAULT_EVENT_ID, rollup_day(reg.get("created_at")))
+        entry = totals.setdefault(key, {"total_registrations": 0, **{field: 0.0 for field in ROLLUP_FIELDS}})
+        entry["total_registrations"] += sign
+        for field, source in ROLLUP_FIELDS.items():
+            entry[field] += sign * float(reg.get(source) or 0)
+    return totals
+
+def _rollup_id(event_id: str, day: str) -> str:
+    return f"{event_id}:{day}"
+
+async def apply_payment_change(db, regs: Iterable[Dict[str, Any]], sign: int):
+    """
+    Add (sign=1) or remove (sign=-1) registrations from the rollups. Call it
+    when a registration enters or leaves estado_pago "completado", or when a
+    paid registration is deleted.
+    """
+    totals = _accumulate(regs, sign)
+    if not totals:
+        return
+    await db.commission_rollups.bulk_write([
+        UpdateOne(
+            {"_id": _rollup_id(event_id, day)},
+            {"$inc": deltas, "$setOnInsert": {"event_id": event_id, "day": day}},
+            upsert=True
+        )
+        for (event_id, day), deltas in totals.items()
+    ], ordered=False)
+
+async def read_commission_totals(db, date_from: Optional[str] = None, date_to: Optional[str] = None,
+                                 event_id: Optional[str] = None) -> Dict[str, Any]:
+    """Totals and per-day rows over the rollups in [date_from, date_to] (inclusive days)"""
+    query: Dict[str, Any] = {}
+    if event_id:
+        query["event_id"] = event_id
+    if date_from or date_to:
+        query["day"] = {}
+        if date_from:
+            query["day"]["$gte"] = date_from
+        if date_to:
+            query["day"]["$lte"] = date_to
+
+    rows = await db.commission_rollups.find(query, {"_id": 0}).sort("day", 1).to_list(None)
+    totals = {"total_registrations": 0, **{field: 0.0 for field in ROLLUP_FIELDS}}
+    by_day: Dict[str, Dict[str, Any]] = {}
+    for row in rows:
+        day = by_day.setdefault(row["day"], {"day": row["day"], "total_registrations": 0,
+                                              **{field: 0.0 for field in ROLLUP_FIELDS}})
+        for field in totals:
+            day[field] += row.get(field, 0)
+            totals[field] += row.get(field, 0)
+
+    # $inc on floats drifts by fractions of a cent; amounts are COP
+    for entry in [totals, *by_day.values()]:
+        for field in ROLLUP_FIELDS:
+            entry[field] = round(entry[field], 2)
+    return {"totals": totals, "by_day": list(by_day.values())}
+
+async def rebuild_commission_rollups(db) -> List[Dict[str, Any]]:
+    """Recompute every rollup from the paid registrations and drop the ones left empty"""
+    totals = _accumulate(
+        [reg async for reg in db.registrations.find({"estado_pago": "completado"}, ROLLUP_PROJECTION)], 1
+    )
+    rebuilt = [
+        {"_id": _rollup_id(event_id, day), "event_id": event_id, "day": day, **values}
+        for (event_id, day), values in totals.items()
+    ]
+    if rebuilt:
+        await db.commission_rollups.bulk_write([
+            UpdateOne({"_id": doc["_id"]}, {"$set": {k: v for k, v in doc.items() if k != "_id"}}, upsert=True)
+            for doc in rebuilt
+        ], ordered=False)
+    await db.commission_rollups.delete_many({"_id": {"$nin": [doc["_id"] for doc in rebuilt]}})
+    return rebuilt
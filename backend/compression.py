@@ -0,0 +1,120 @@
+import gzip
+import os
+from typing import Optional, Dict, Tuple
+
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+try:
+    import brotli
+except ImportError:  # gzip only
+    brotli = None
+
+# Below this a response fits in a packet or two; compressing it only costs CPU
+COMPRESSION_MIN_BYTES = int(os.getenv('COMPRESSION_MIN_BYTES', '1024'))
+GZIP_LEVEL = int(os.getenv('GZIP_LEVEL', '6'))
+# 4-5 is Brotli's usual on-the-fly setting: smaller than gzip -6 at about the same cost
+BROTLI_QUALITY = int(os.getenv('BROTLI_QUALITY', '4'))
+
+COMPRESSIBLE_TYPES = ("application/json", "application/x-ndjson", "application/javascript", "text/", "image/svg+xml")
+
+def _qvalues(accept_encoding: Optional[str]) -> Dict[str, float]:
+    qvalues = {}
+    for coding in (accept_encoding or "").split(","):
+        name, _, params = coding.strip().partition(";")
+        q = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                q = float(params[2:])
+            except ValueError:
+                q = 0.0
+        if name:
+            qvalues[name.strip().lower()] = q
+    return qvalues
+
+def negotiate_encoding(accept_encoding: Optional[str]) -> Optional[str]:
+    """"br" or "gzip" as the client allows, Brotli first when it is installed"""
+    qvalues = _qvalues(accept_encoding)
+    wildcard = qvalues.get("*", 0.0)
+    for encoding in available_encodings():
+        if qvalues.get(encoding, wildcard) > 0:
+            return encoding
+    return None
+
+def available_encodings() -> Tuple[str, ...]:
+    return ("br", "gzip") if brotli is not None else ("gzip",)
+
+def compress(body: bytes, encoding: str, once: bool = False) -> bytes:
+    """`once` is for bodies compressed when stored and served many times: highest level"""
+    if encoding == "br":
+        return brotli.compress(body, quality=11 if once else BROTLI_QUALITY)
+    return gzip.compress(body, compresslevel=9 if once else GZIP_LEVEL, mtime=0)
+
+def weak_etag(etag: str) -> str:
+    # Same content, different bytes: only a weak validator still holds
+    return etag if etag.startswith("W/") else "W/" + etag
+
+class CompressionMiddleware:
+    """
+    Brotli/gzip for response bodies of COMPRESSION_MIN_BYTES or more.
+
+    Only responses that declare a Content-Length are compressed: those
+    are whole bodies, even when BaseHTTPMiddleware re-chunks them.
+    Streams (SSE, exports) have none and pass through untouched, as do
+    bodies that already carry a Content-Encoding, such as the
+    pre-compressed public cache, which shares this module's threshold,
+    encodings and ETag rule.
+    """
+
+    def __init__(self, app: ASGIApp, minimum_size: int = COMPRESSION_MIN_BYTES):
+        self.app = app
+        self.minimum_size = minimum_size
+
+    def _should_compress(self, headers: Headers) -> bool:
+        length = headers.get("content-length")
+        return (
+            length is not None and int(length) >= self.minimum_size
+            and "content-encoding" not in headers
+            and headers.get("content-type", "").startswith(COMPRESSIBLE_TYPES)
+        )
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        encoding = negotiate_encoding(Headers(scope=scope).get("accept-encoding"))
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+
+        start: Optional[Message] = None
+        chunks = []
+
+        async def send_compressed(message: Message):
+            nonlocal start
+            if message["type"] == "http.response.start":
+                if not self._should_compress(Headers(raw=message["headers"])):
+                    await send(message)
+                    return
+                start = message
+                return
+            if message["type"] != "http.response.body" or start is None:
+                await send(message)
+                return
+
+            chunks.append(message.get("body", b""))
+            if message.get("more_body", False):
+                return
+
+            body = compress(b"".join(chunks), encoding)
+            headers = MutableHeaders(raw=start["headers"])
+            headers["Content-Encoding"] = encoding
+            headers["Content-Length"] = str(len(body))
+            headers.add_vary_header("Accept-Encoding")
+            if "etag" in headers:
+                headers["ETag"] = weak_etag(headers["etag"])
+            await send(start)
+            await send({"type": "http.response.body", "body": body})
+
+        await self.app(scope, receive, send_compressed)
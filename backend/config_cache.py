@@ -0,0 +1,115 @@
+import asyncio
+import copy
+import logging
+import os
+import time
+from dataclasses import dataclass
+from typing import Any, Awaitable, Callable, Dict, Generic, Tuple, TypeVar
+
+CONFIG_CACHE_TTL = float(os.getenv('CONFIG_CACHE_TTL', '5'))
+
+T = TypeVar("T")
+
+@dataclass
+class CacheEntry(Generic[T]):
+    value: T
+    version: int
+    loaded_at: float
+
+class ConfigCache:
+    """
+    Per-worker cache for the singleton config documents (prices, categories,
+    groups, platform and MercadoPago config).
+
+    Every key carries a version stamp stored in `cache_versions/config`.
+    Admin writes bump the stamp through `invalidate`; each worker re-reads
+    the stamps at most once per `ttl` seconds, so another worker's write is
+    visible here within `ttl` and unchanged values are never reloaded.
+    """
+
+    VERSIONS_ID = "config"
+
+    def __init__(self, db, ttl: float = CONFIG_CACHE_TTL):
+        self.db = db
+        self.ttl = ttl
+        self._loaders: Dict[str, Callable[[], Awaitable[Any]]] = {}
+        self._entries: Dict[str, CacheEntry] = {}
+        self._versions: Dict[str, int] = {}
+        self._versions_checked_at = float("-inf")
+        self._sync_lock = asyncio.Lock()
+        self._load_locks: Dict[str, asyncio.Lock] = {}
+        self.hits = 0
+        self.loads = 0
+
+    def register(self, key: str, loader: Callable[[], Awaitable[Any]]):
+        self._loaders[key] = loader
+        self._load_locks[key] = asyncio.Lock()
+
+    async def get(self, key: str) -> Any:
+        """Return a private copy of the cached value, reloading it if its version moved"""
+        if time.monotonic() - self._versions_checked_at > self.ttl:
+            await self._sync_versions()
+
+        entry = self._entries.get(key)
+        if entry is None or entry.version != self._versions.get(key, 0):
+            entry = await self._load(key)
+        else:
+            self.hits += 1
+        # Callers mutate what they get back (prices[cat] = ..., categories.append(...))
+        return copy.deepcopy(entry.value)
+
+    async def versions(self, *keys: str) -> Tuple[int, ...]:
+        """Current version stamps of `keys`, re-read from Mongo at most once per `ttl`"""
+        if time.monotonic() - self._versions_checked_at > self.ttl:
+            await self._sync_versions()
+        return tuple(self._versions.get(key, 0) for key in keys)
+
+    async def invalidate(self, *keys: str):
+        """Bump the version of `keys` for every worker and drop the local copies"""
+        versions = await self.db.cache_versions.find_one_and_update(
+            {"_id": self.VERSIONS_ID},
+            {"$inc": {key: 1 for key in keys}},
+            upsert=True,
+            return_document=True
+        )
+        for key in keys:
+            self._entries.pop(key, None)
+            self._versions[key] = versions.get(key, 0)
+
+    async def warm(self):
+        try:
+            await self._sync_versions()
+            for key in self._loaders:
+                await self._load(key)
+        except Exception as e:
+            logging.error(f"Could not warm config cache: {str(e)}")
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "hits": self.hits,
+            "loads": self.loads,
+            "versions": dict(self._versions),
+            "ttl": self.ttl,
+        }
+
+    async def _sync_versions(self):
+        async with self._sync_lock:
+            if time.monotonic() - self._versions_checked_at <= self.ttl:
+                return
+            doc = await self.db.cache_versions.find_one({"_id": self.VERSIONS_ID}) or {}
+            self._versions = {key: value for key, value in doc.items() if key != "_id"}
+            self._versions_checked_at = time.monotonic()
+
+    async def _load(self, key: str) -> CacheEntry:
+        async with self._load_locks[key]:
+            version = self._versions.get(key, 0)
+            entry = self._entries.get(key)
+            if entry is not None and entry.version == version:
+                return entry
+            # Stamp with the version read before loading: a concurrent write
+            # can only make this entry look older than it is, never newer
+            value = await self._loaders[key]()
+            entry = CacheEntry(value=value, version=version, loaded_at=time.monotonic())
+            self._entries[key] = entry
+            self.loads += 1
+            return entry
@@ -0,0 +1,69 @@
+import asyncio
+import logging
+import os
+import time
+from typing import Optional, Dict, Any
+
+COUPON_INDEX_TTL = float(os.getenv('COUPON_INDEX_TTL', '5'))
+
+COUPON_INDEX_PROJECTION = {"_id": 0, "codigo": 1, "tipo_descuento": 1, "usos_maximos": 1, "usos_actuales": 1}
+
+class CouponIndex:
+    """
+    Per-worker copy of every active coupon, keyed by code.
+
+    The whole set is small, so any code missing from it is invalid and is
+    answered without a query; guessing costs nothing on Mongo. The copy is
+    reloaded at most once per `ttl` seconds while lookups keep coming, and
+    immediately on `invalidate` (coupon created here). Use counts may lag by
+    `ttl`; create_registration enforces usos_maximos atomically anyway.
+    """
+
+    def __init__(self, db, ttl: float = COUPON_INDEX_TTL):
+        self.db = db
+        self.ttl = ttl
+        self._coupons: Dict[str, Dict[str, Any]] = {}
+        self._loaded_at = float("-inf")
+        self._lock = asyncio.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.loads = 0
+
+    async def lookup(self, codigo: str) -> Optional[Dict[str, Any]]:
+        """The active coupon for `codigo`, or None when the code is invalid"""
+        if time.monotonic() - self._loaded_at > self.ttl:
+            await self._reload()
+        coupon = self._coupons.get((codigo or "").strip().upper())
+        if coupon is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return coupon
+
+    def invalidate(self):
+        self._loaded_at = float("-inf")
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "coupons": len(self._coupons),
+            "hits": self.hits,
+            "invalid_lookups": self.misses,
+            "loads": self.loads,
+            "ttl": self.ttl,
+        }
+
+    async def _reload(self):
+        async with self._lock:
+            if time.monotonic() - self._loaded_at <= self.ttl:
+                return
+            try:
+                coupons = await self.db.coupons.find({"activo": True}, COUPON_INDEX_PROJECTION).to_list(None)
+            except Exception as e:
+                # Keep answering from the previous copy rather than failing every lookup
+                logging.error(f"Could not reload coupon index: {str(e)}")
+                if self._coupons:
+                    return
+                raise
+            self._coupons = {coupon["codigo"]: coupon for coupon in coupons}
+            self._loaded_at = time.monotonic()
+            self.loads += 1
@@ -0,0 +1,162 @@
+import asyncio
+import logging
+import os
+import uuid
+from collections import Counter
+from datetime import datetime, timezone, timedelta
+from typing import Optional, Tuple, Dict, Any, Iterable, List
+
+from pymongo import ReturnDocument, UpdateOne
+
+from date_migration import date_range
+
+# A pending registration holds its coupon use this long before the use is released
+COUPON_RESERVATION_HOURS = float(os.getenv('COUPON_RESERVATION_HOURS', '72'))
+COUPON_RELEASE_INTERVAL_SECONDS = float(os.getenv('COUPON_RELEASE_INTERVAL_SECONDS', '600'))
+
+RESERVED = "reservado"
+EXHAUSTED = "agotado"
+INVALID = "invalido"
+RELEASED = "liberado"
+
+# usos_maximos null/0 means unlimited, as in /coupons/validate
+_HAS_USES_LEFT = {"$or": [
+    {"usos_maximos": None},
+    {"usos_maximos": 0},
+    {"$expr": {"$lt": ["$usos_actuales", "$usos_maximos"]}},
+]}
+
+def normalize_code(codigo: Optional[str]) -> str:
+    return (codigo or "").strip().upper()
+
+async def reserve_coupon(db, codigo: str) -> Tuple[str, Optional[Dict[str, Any]]]:
+    """
+    Take one use of a coupon with a single conditional find_one_and_update,
+    so concurrent submits can never push usos_actuales past usos_maximos.
+    Only a failed reservation reads again, to tell invalid from exhausted.
+    """
+    codigo = normalize_code(codigo)
+    coupon = await db.coupons.find_one_and_update(
+        {"codigo": codigo, "activo": True, **_HAS_USES_LEFT},
+        {"$inc": {"usos_actuales": 1}},
+        projection={"_id": 0, "codigo": 1, "tipo_descuento": 1, "usos_actuales": 1, "usos_maximos": 1},
+        return_document=ReturnDocument.AFTER
+    )
+    if coupon is not None:
+        return RESERVED, coupon
+
+    exists = await db.coupons.find_one({"codigo": codigo, "activo": True}, {"_id": 1})
+    return (EXHAUSTED if exists else INVALID), None
+
+async def release_coupon(db, codigo: str):
+    await db.coupons.update_one(
+        {"codigo": normalize_code(codigo), "usos_actuales": {"$gt": 0}},
+        {"$inc": {"usos_actuales": -1}}
+    )
+
+def uses_by_code(regs: Iterable[Dict[str, Any]]) -> Dict[str, int]:
+    return dict(Counter(normalize_code(reg["codigo_cupon"]) for reg in regs if reg.get("codigo_cupon")))
+
+async def adjust_uses(db, uses: Dict[str, int], sign: int):
+    """$inc usos_actuales by sign * n for each code in one bulk_write; releases never go below 0"""
+    if not uses:
+        return
+    if sign > 0:
+        operations = [UpdateOne({"codigo": codigo}, {"$inc": {"usos_actuales": count}})
+                      for codigo, count in uses.items()]
+    else:
+        operations = [
+            UpdateOne({"codigo": codigo}, [{"$set": {
+                "usos_actuales": {"$max": [0, {"$subtract": ["$usos_actuales", count]}]}
+            }}])
+            for codigo, count in uses.items()
+        ]
+    await db.coupons.bulk_write(operations, ordered=False)
+
+async def flip_reservations(db, ids: List[str], condition: Dict[str, Any], cupon_estado: str) -> List[Dict[str, Any]]:
+    """
+    Set cupon_estado on the registrations in `ids` still matching
+    `condition`, with one update_many, and return (id, codigo_cupon) of the
+    rows this call changed: the batch id tells them from rows a concurrent
+    caller flipped.
+    """
+    batch_id = str(uuid.uuid4())
+    result = await db.registrations.update_many(
+        {"id": {"$in": ids}, **condition}, {"$set": {"cupon_estado": cupon_estado, "cupon_batch": batch_id}}
+    )
+    if not result.modified_count:
+        return []
+    return await db.registrations.find(
+        {"id": {"$in": ids}, "cupon_batch": batch_id}, {"_id": 0, "id": 1, "codigo_cupon": 1}
+    ).to_list(len(ids))
+
+async def release_for_deleted(db, regs: Iterable[Dict[str, Any]]):
+    """Give back the uses held by deleted registrations"""
+    await adjust_uses(db, uses_by_code(reg for reg in regs if reg.get("cupon_estado") == RESERVED), -1)
+
+async def reclaim_for_paid(db, regs: Iterable[Dict[str, Any]]):
+    """
+    A registration whose reservation expired was paid after all: it paid
+    the discounted price, so its use is taken back even past usos_maximos.
+    """
+    ids = [reg["id"] for reg in regs if reg.get("cupon_estado") == RELEASED and reg.get("codigo_cupon")]
+    if not ids:
+        return
+    reclaimed = await flip_reservations(db, ids, {"cupon_estado": RELEASED}, RESERVED)
+    await adjust_uses(db, uses_by_code(reclaimed), 1)
+    for reg in reclaimed:
+        logging.warning(f"Coupon {reg['codigo_cupon']} reclaimed for late payment of {reg['id']}")
+
+class CouponReservations:
+    """Releases coupon uses held by registrations left unpaid for COUPON_RESERVATION_HOURS"""
+
+    def __init__(self, db, hours: float = COUPON_RESERVATION_HOURS,
+                 interval: float = COUPON_RELEASE_INTERVAL_SECONDS):
+        self.db = db
+        self.hours = hours
+        self.interval = interval
+        self._task: Optional[asyncio.Task] = None
+        self.released = 0
+
+    async def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def release_abandoned(self) -> int:
+        cutoff = datetime.now(timezone.utc) - timedelta(hours=self.hours)
+        abandoned = self.db.registrations.find(
+            {"cupon_estado": RESERVED, "estado_pago": {"$ne": "completado"}, **date_range("created_at", lt=cutoff)},
+            {"_id": 0, "id": 1}
+        )
+        ids = [reg["id"] async for reg in abandoned]
+        if not ids:
+            return 0
+        # Conditional, so workers running this concurrently release each use once
+        flipped = await flip_reservations(
+            self.db, ids, {"cupon_estado": RESERVED, "estado_pago": {"$ne": "completado"}}, RELEASED
+        )
+        await adjust_uses(self.db, uses_by_code(flipped), -1)
+        released = len(flipped)
+        if released:
+            logging.info(f"Released {released} coupon reservations from abandoned registrations")
+        self.released += released
+        return released
+
+    async def _run(self):
+        while True:
+            try:
+                await self.release_abandoned()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logging.error(f"Coupon reservation release error: {str(e)}")
+            await asyncio.sleep(self.interval)
@@ -0,0 +1,123 @@
+from datetime import datetime, timezone
+from typing import Optional, Dict, Any, List, Callable
+
+from pymongo import UpdateOne
+
+MIGRATION_ID = "bson_dates"
+MIGRATION_BATCH_SIZE = 500
+
+# Timestamp fields that used to be written as isoformat() strings, per collection.
+# "a.b" is field b of every subdocument in array a.
+DATE_FIELDS: Dict[str, List[str]] = {
+    "registrations": ["created_at", "fecha_preinscripcion", "check_in_time"],
+    "coupons": ["created_at"],
+    "news": ["created_at"],
+    "admins": ["created_at"],
+    "super_admins": ["created_at"],
+    "site_content": ["updated_at"],
+    "calendar": ["updated_at"],
+    "site_settings": ["updated_at", "gallery_images.created_at"],
+    "platform_config": ["updated_at"],
+    "event_mercadopago": ["updated_at"],
+    "counters": ["reconciled_at"],
+}
+
+def to_datetime(value: Any) -> Optional[datetime]:
+    """Parse a stored ISO 8601 timestamp; naive ones were written in UTC"""
+    if isinstance(value, datetime):
+        parsed = value
+    elif isinstance(value, str) and value:
+        try:
+            parsed = datetime.fromisoformat(value.replace("Z", "+00:00"))
+        except ValueError:
+            return None
+    else:
+        return None
+    return parsed if parsed.tzinfo else parsed.replace(tzinfo=timezone.utc)
+
+def date_range(field: str, gte: Optional[datetime] = None, lt: Optional[datetime] = None) -> Dict[str, Any]:
+    """
+    `gte <= field < lt` for rows holding a BSON date and for rows still
+    holding an ISO string: a date range never matches a string, so
+    readers need both until the migration has completed.
+    """
+    dates: Dict[str, Any] = {"$type": "date"}
+    strings: Dict[str, Any] = {"$type": "string"}
+    if gte is not None:
+        dates["$gte"] = gte
+        strings["$gte"] = gte.isoformat()
+    if lt is not None:
+        dates["$lt"] = lt
+        strings["$lt"] = lt.isoformat()
+    return {"$or": [{field: dates}, {field: strings}]}
+
+def convert_document(doc: Dict[str, Any], fields: List[str]) -> Dict[str, Any]:
+    """Top-level fields of `doc` whose string timestamps change, with the converted values"""
+    changes: Dict[str, Any] = {}
+    for path in fields:
+        top, _, sub = path.partition(".")
+        value = changes.get(top, doc.get(top))
+        if sub:
+            if not isinstance(value, list):
+                continue
+            items = []
+            for item in value:
+                if isinstance(item, dict) and isinstance(item.get(sub), str) and to_datetime(item[sub]):
+                    item = {**item, sub: to_datetime(item[sub])}
+                items.append(item)
+            if items != value:
+                changes[top] = items
+        elif isinstance(value, str) and to_datetime(value):
+            changes[top] = to_datetime(value)
+    return changes
+
+async def migrate_collection(db, name: str, fields: List[str], batch_size: int = MIGRATION_BATCH_SIZE,
+                             progress: Optional[Callable[[str, int, int], None]] = None) -> Dict[str, int]:
+    """
+    Convert the string timestamps of one collection in `_id` order, one
+    bulk_write per batch. The last `_id` handled is checkpointed in
+    `migrations/bson_dates`, so an interrupted run resumes where it
+    stopped; values that do not parse are left as they are and skipped.
+    """
+    checkpoint = await db.migrations.find_one({"_id": MIGRATION_ID}) or {}
+    last_id = checkpoint.get("last_id", {}).get(name)
+    pending = {"$or": [{field: {"$type": "string"}} for field in fields]}
+    projection = {field.partition(".")[0]: 1 for field in fields}
+    converted = unparsed = 0
+
+    while True:
+        query = {"$and": [pending, {"_id": {"$gt": last_id}}]} if last_id is not None else pending
+        batch = await db[name].find(query, projection).sort("_id", 1).limit(batch_size).to_list(batch_size)
+        if not batch:
+            break
+
+        updates = []
+        for doc in batch:
+            changes = convert_document(doc, fields)
+            if not changes:
+                unparsed += 1
+                continue
+            # Matches only while the old values are still there; a concurrent writer wins
+            updates.append(UpdateOne(
+                {"_id": doc["_id"], **{top: doc.get(top) for top in changes}}, {"$set": changes}
+            ))
+        if updates:
+            result = await db[name].bulk_write(updates, ordered=False)
+            converted += result.modified_count
+
+        last_id = batch[-1]["_id"]
+        await db.migrations.update_one(
+            {"_id": MIGRATION_ID}, {"$set": {f"last_id.{name}": last_id}}, upsert=True
+        )
+        if progress:
+            progress(name, converted, unparsed)
+
+    await db.migrations.update_one(
+        {"_id": MIGRATION_ID},
+        {"$set": {f"completed.{name}": datetime.now(timezone.utc)}},
+        upsert=True
+    )
+    return {"converted": converted, "unparsed": unparsed}
+
+async def reset_migration(db):
+    await db.migrations.delete_one({"_id": MIGRATION_ID})
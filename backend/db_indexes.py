@@ -0,0 +1,142 @@
+import logging
+from typing import Dict, List, Any
+
+from pymongo import IndexModel, ASCENDING, DESCENDING
+
+from gate_manifest import TOMBSTONE_RETENTION_SECONDS
+from live_events import LIVE_EVENTS_RETENTION_SECONDS
+
+# Keyset order used by the registration listings (see registration_query.py)
+_REGISTRATION_KEYSET = [("created_at", DESCENDING), ("id", DESCENDING)]
+
+# Every non-_id lookup the API does on a hot path needs an entry here
+REQUIRED_INDEXES: Dict[str, List[IndexModel]] = {
+    "registrations": [
+        IndexModel([("id", ASCENDING)], unique=True),
+        IndexModel(_REGISTRATION_KEYSET),
+        IndexModel([("estado_pago", ASCENDING)] + _REGISTRATION_KEYSET),
+        IndexModel([("check_in", ASCENDING)] + _REGISTRATION_KEYSET),
+        IndexModel([("liga", ASCENDING)] + _REGISTRATION_KEYSET),
+        IndexModel([("categorias", ASCENDING)] + _REGISTRATION_KEYSET),
+        IndexModel([("gate_version", ASCENDING)]),
+        IndexModel([("check_in", ASCENDING), ("check_in_time", DESCENDING), ("id", DESCENDING)]),
+        IndexModel([("cupon_estado", ASCENDING), ("created_at", ASCENDING)], sparse=True),
+    ],
+    "gate_tombstones": [
+        IndexModel([("gate_version", ASCENDING)]),
+        IndexModel([("created_at", ASCENDING)], expireAfterSeconds=TOMBSTONE_RETENTION_SECONDS),
+    ],
+    "live_events": [
+        IndexModel([("seq", ASCENDING)], unique=True),
+        IndexModel([("created_at", ASCENDING)], expireAfterSeconds=LIVE_EVENTS_RETENTION_SECONDS),
+    ],
+    "commission_rollups": [
+        IndexModel([("event_id", ASCENDING), ("day", ASCENDING)]),
+        IndexModel([("day", ASCENDING)]),
+    ],
+    "rate_limits": [
+        IndexModel([("expires_at", ASCENDING)], expireAfterSeconds=0),
+    ],
+    "coupons": [
+        IndexModel([("codigo", ASCENDING), ("activo", ASCENDING)]),
+    ],
+    "admins": [
+        IndexModel([("email", ASCENDING)], unique=True),
+    ],
+    "super_admins": [
+        IndexModel([("email", ASCENDING)], unique=True),
+    ],
+    "email_outbox": [
+        IndexModel([("idempotency_key", ASCENDING)], unique=True),
+        IndexModel([("status", ASCENDING), ("next_attempt_at", ASCENDING)]),
+        IndexModel([("registration_id", ASCENDING)]),
+    ],
+    "news": [
+        IndexModel([("created_at", DESCENDING)]),
+    ],
+    "site_content": [
+        IndexModel([("key", ASCENDING)]),
+    ],
+    "event_mercadopago": [
+        IndexModel([("event_id", ASCENDING)]),
+    ],
+}
+
+def _key_of(spec) -> tuple:
+    return tuple(
+        (field, direction if isinstance(direction, str) else int(direction))
+        for field, direction in spec
+    )
+
+class IndexManager:
+    """Creates the declared indexes that are missing and reports how they are used"""
+
+    def __init__(self, db, required: Dict[str, List[IndexModel]] = None):
+        self.db = db
+        self.required = required if required is not None else REQUIRED_INDEXES
+        self.last_run: Dict[str, Any] = {"created": [], "errors": [], "finished": False}
+
+    async def ensure(self):
+        """Create missing indexes; safe to run concurrently from every worker"""
+        created, errors = [], []
+        for collection_name, models in self.required.items():
+            collection = self.db[collection_name]
+            try:
+                existing = await collection.index_information()
+            except Exception as e:
+                errors.append({"collection": collection_name, "error": str(e)})
+                continue
+            existing_keys = {_key_of(info["key"]) for info in existing.values()}
+
+            for model in models:
+                spec = model.document
+                if _key_of(spec["key"].items()) in existing_keys:
+                    continue
+                try:
+                    name = await collection.create_indexes([model])
+                    created.append({"collection": collection_name, "name": name[0]})
+                    logging.info(f"Created index {name[0]} on {collection_name}")
+                except Exception as e:
+                    errors.append({"collection": collection_name, "index": spec["name"], "error": str(e)})
+                    logging.error(f"Could not create index {spec['name']} on {collection_name}: {str(e)}")
+
+        self.last_run = {"created": created, "errors": errors, "finished": True}
+        return self.last_run
+
+    async def report(self) -> Dict[str, Any]:
+        """Per-collection $indexStats usage, missing declared indexes and collection scans"""
+        collections = {}
+        for collection_name, models in self.required.items():
+            collection = self.db[collection_name]
+            entry: Dict[str, Any] = {}
+            try:
+                stats = await collection.aggregate([{"$indexStats": {}}]).to_list(None)
+                entry["indexes"] = [
+                    {
+                        "name": stat["name"],
+                        "key": stat.get("key"),
+                        "ops": stat.get("accesses", {}).get("ops", 0),
+                        "since": stat.get("accesses", {}).get("since"),
+                    }
+                    for stat in stats
+                ]
+                present = {_key_of(stat["key"].items()) for stat in stats if stat.get("key")}
+                entry["missing"] = [
+                    model.document["name"] for model in models
+                    if _key_of(model.document["key"].items()) not in present
+                ]
+            except Exception as e:
+                entry["error"] = str(e)
+
+            try:
+                coll_stats = await collection.aggregate(
+                    [{"$collStats": {"queryExecStats": {}}}]
+                ).to_list(1)
+                scans = coll_stats[0].get("queryExecStats", {}).get("collectionScans", {}) if coll_stats else {}
+                entry["collection_scans"] = scans.get("total", 0)
+            except Exception:
+                entry["collection_scans"] = None
+
+            collections[collection_name] = entry
+
+        return {"collections": collections, "bootstrap": self.last_run}
@@ -0,0 +1,239 @@
+import asyncio
+import logging
+import os
+import uuid
+from datetime import datetime, timezone, timedelta
+from typing import Optional, Dict, Any, List
+
+import httpx
+from pymongo import ReturnDocument, UpdateOne
+
+RESEND_API_URL = os.getenv('RESEND_API_URL', 'https://api.resend.com')
+EMAIL_SENDER = os.getenv('EMAIL_SENDER', 'Super GP Corona <coronaclubxp@vittalix.com>')
+EMAIL_OUTBOX_CONCURRENCY = int(os.getenv('EMAIL_OUTBOX_CONCURRENCY', '4'))
+EMAIL_OUTBOX_MAX_ATTEMPTS = int(os.getenv('EMAIL_OUTBOX_MAX_ATTEMPTS', '6'))
+EMAIL_HTTP_TIMEOUT = float(os.getenv('EMAIL_HTTP_TIMEOUT', '10'))
+
+RETRY_BASE_SECONDS = 30
+RETRY_MAX_SECONDS = 3600
+# A claimed email whose worker died becomes claimable again after this lease
+SEND_LEASE_SECONDS = 120
+POLL_INTERVAL_SECONDS = 5
+
+class PermanentSendError(Exception):
+    """Resend rejected the email; retrying will not help"""
+
+def retry_delay(attempts: int) -> timedelta:
+    return timedelta(seconds=min(RETRY_BASE_SECONDS * (2 ** (attempts - 1)), RETRY_MAX_SECONDS))
+
+class EmailOutbox:
+    """
+    Durable email queue in the `email_outbox` collection.
+
+    Handlers call `enqueue` and return immediately; a background worker in
+    every gunicorn worker claims due emails atomically, sends them through a
+    pooled httpx client with at most `concurrency` requests in flight, and
+    retries failures with exponential backoff. An email is unique per
+    `(registration_id, template)`, so retried handlers never send twice.
+    """
+
+    def __init__(self, db, api_key: Optional[str], api_url: str = RESEND_API_URL,
+                 concurrency: int = EMAIL_OUTBOX_CONCURRENCY,
+                 max_attempts: int = EMAIL_OUTBOX_MAX_ATTEMPTS):
+        self.db = db
+        self.api_key = api_key
+        self.api_url = api_url.rstrip("/")
+        self.concurrency = max(1, concurrency)
+        self.max_attempts = max(1, max_attempts)
+        self._client: Optional[httpx.AsyncClient] = None
+        self._worker: Optional[asyncio.Task] = None
+        self._wakeup = asyncio.Event()
+        self._stopping = False
+        self._inflight = set()
+
+    async def start(self):
+        if self._worker is not None:
+            return
+        self._client = httpx.AsyncClient(
+            base_url=self.api_url,
+            timeout=EMAIL_HTTP_TIMEOUT,
+            limits=httpx.Limits(max_connections=self.concurrency, max_keepalive_connections=self.concurrency)
+        )
+        self._stopping = False
+        self._worker = asyncio.create_task(self._run())
+
+    async def stop(self):
+        self._stopping = True
+        self._wakeup.set()
+        if self._worker is not None:
+            self._worker.cancel()
+            try:
+                await self._worker
+            except asyncio.CancelledError:
+                pass
+            self._worker = None
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+    async def enqueue(self, to: str, subject: str, html: str, cc: Optional[str] = None,
+                      registration_id: Optional[str] = None, template: str = "generic",
+                      resend: bool = False) -> Dict[str, Any]:
+        """
+        Queue an email. With a registration_id the email is idempotent per
+        (registration_id, template); `resend=True` re-queues that same entry.
+        """
+        key, update = self._outbox_update(to, subject, html, cc, registration_id, template, resend)
+        entry = await self.db.email_outbox.find_one_and_update(
+            {"idempotency_key": key}, update,
+            upsert=True, return_document=ReturnDocument.AFTER, projection={"_id": 0, "html": 0}
+        )
+        self._wakeup.set()
+        return entry
+
+    async def enqueue_many(self, messages: List[Dict[str, Any]], template: str = "generic") -> int:
+        """
+        Queue many emails in one bulk_write. Each message is a dict with the
+        `enqueue` arguments (to, subject, html, cc, registration_id).
+        Returns how many were newly queued.
+        """
+        if not messages:
+            return 0
+        operations = []
+        for message in messages:
+            key, update = self._outbox_update(
+                message["to"], message["subject"], message["html"], message.get("cc"),
+                message.get("registration_id"), template, False
+            )
+            operations.append(UpdateOne({"idempotency_key": key}, update, upsert=True))
+        result = await self.db.email_outbox.bulk_write(operations, ordered=False)
+        self._wakeup.set()
+        return result.upserted_count
+
+    def _outbox_update(self, to, subject, html, cc, registration_id, template, resend) -> tuple:
+        now = datetime.now(timezone.utc)
+        key = f"{registration_id}:{template}" if registration_id else str(uuid.uuid4())
+        message = {"to": to, "cc": cc, "subject": subject, "html": html}
+
+        if resend:
+            update = {
+                "$set": {**message, "status": "pending", "attempts": 0,
+                         "next_attempt_at": now, "last_error": None},
+                "$setOnInsert": {"id": str(uuid.uuid4()), "registration_id": registration_id,
+                                 "template": template, "created_at": now},
+            }
+        else:
+            update = {
+                "$setOnInsert": {**message, "id": str(uuid.uuid4()), "registration_id": registration_id,
+                                 "template": template, "status": "pending", "attempts": 0,
+                                 "next_attempt_at": now, "last_error": None, "created_at": now},
+            }
+        return key, update
+
+    async def send_now(self, to: str, subject: str, html: str, cc: Optional[str] = None) -> bool:
+        """Send synchronously (awaited, bounded by the HTTP timeout) without queueing"""
+        try:
+            await self._post({"to": to, "cc": cc, "subject": subject, "html": html})
+            return True
+        except Exception as e:
+            logging.error(f"Error sending email: {str(e)}")
+            return False
+
+    async def summary(self) -> Dict[str, Any]:
+        counts = await self.db.email_outbox.aggregate([
+            {"$group": {"_id": "$status", "count": {"$sum": 1}}}
+        ]).to_list(None)
+        failed = await self.db.email_outbox.find(
+            {"status": "failed"}, {"_id": 0, "html": 0}
+        ).sort("updated_at", -1).limit(20).to_list(20)
+        return {"counts": {c["_id"]: c["count"] for c in counts}, "recent_failures": failed}
+
+    async def _run(self):
+        slots = asyncio.Semaphore(self.concurrency)
+        while not self._stopping:
+            try:
+                claimed = False
+                while not self._stopping:
+                    await slots.acquire()
+                    entry = await self._claim()
+                    if entry is None:
+                        slots.release()
+                        break
+                    claimed = True
+                    task = asyncio.create_task(self._deliver(entry))
+                    self._inflight.add(task)
+                    task.add_done_callback(self._inflight.discard)
+                    task.add_done_callback(lambda _: slots.release())
+                if not claimed:
+                    self._wakeup.clear()
+                    try:
+                        await asyncio.wait_for(self._wakeup.wait(), POLL_INTERVAL_SECONDS)
+                    except asyncio.TimeoutError:
+                        pass
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logging.error(f"Email outbox worker error: {str(e)}")
+                await asyncio.sleep(POLL_INTERVAL_SECONDS)
+
+    async def _claim(self) -> Optional[Dict[str, Any]]:
+        now = datetime.now(timezone.utc)
+        return await self.db.email_outbox.find_one_and_update(
+            {"$or": [
+                {"status": "pending", "next_attempt_at": {"$lte": now}},
+                {"status": "sending", "lease_until": {"$lte": now}},
+            ]},
+            {"$set": {"status": "sending", "lease_until": now + timedelta(seconds=SEND_LEASE_SECONDS)},
+             "$inc": {"attempts": 1}},
+            sort=[("next_attempt_at", 1)],
+            return_document=ReturnDocument.AFTER
+        )
+
+    async def _deliver(self, entry: Dict[str, Any]):
+        now = datetime.now(timezone.utc)
+        try:
+            provider_id = await self._post(entry)
+        except Exception as e:
+            permanent = isinstance(e, PermanentSendError) or entry["attempts"] >= self.max_attempts
+            status = "failed" if permanent else "pending"
+            await self.db.email_outbox.update_one(
+                {"_id": entry["_id"]},
+                {"$set": {"status": status, "last_error": str(e), "updated_at": now,
+                          "next_attempt_at": now + retry_delay(entry["attempts"])},
+                 "$unset": {"lease_until": ""}}
+            )
+            logging.error(f"Email to {entry['to']} failed (attempt {entry['attempts']}, {status}): {str(e)}")
+            return
+
+        await self.db.email_outbox.update_one(
+            {"_id": entry["_id"]},
+            {"$set": {"status": "sent", "sent_at": now, "updated_at": now,
+                      "provider_id": provider_id, "last_error": None},
+             "$unset": {"lease_until": ""}}
+        )
+        logging.info(f"Email sent successfully to {entry['to']}")
+
+    async def _post(self, message: Dict[str, Any]) -> Optional[str]:
+        if not self.api_key:
+            raise PermanentSendError("RESEND_API_KEY not configured")
+        if self._client is None:
+            raise RuntimeError("Email outbox is not started")
+
+        payload = {
+            "from": EMAIL_SENDER,
+            "to": [message["to"]],
+            "subject": message["subject"],
+            "html": message["html"],
+        }
+        if message.get("cc"):
+            payload["cc"] = [message["cc"]]
+
+        response = await self._client.post(
+            "/emails", json=payload, headers={"Authorization": f"Bearer {self.api_key}"}
+        )
+        if response.status_code in [200, 201]:
+            return response.json().get("id")
+        error = f"{response.status_code} - {response.text}"
+        if 400 <= response.status_code < 500 and response.status_code != 429:
+            raise PermanentSendError(error)
+        raise RuntimeError(error)
@@ -0,0 +1,91 @@
+import hashlib
+import hmac
+import json
+import time
+from datetime import datetime, timezone
+from typing import Optional, Dict, Any, List
+
+from qr_service import qr_verification_hash
+
+# Devices sync with `since=<version>`; versions are server clock milliseconds.
+# The overlap re-sends recent changes so a write that was in flight while the
+# manifest was being read is never missed (devices upsert by id).
+SYNC_OVERLAP_MS = 5000
+# Deletions are kept this long; a device that has not synced since gets a full manifest
+TOMBSTONE_RETENTION_SECONDS = 7 * 24 * 3600
+
+MANIFEST_PROJECTION = {
+    "_id": 0, "id": 1, "nombre": 1, "apellido": 1, "numero_competicion": 1,
+    "categorias": 1, "check_in": 1, "check_in_time": 1, "estado_pago": 1,
+}
+
+def gate_version_now() -> int:
+    """Version stamp for any registration write that changes what gates see"""
+    return int(time.time() * 1000)
+
+def manifest_key(secret: str) -> bytes:
+    # Derived key, so the key given to gate devices is never the JWT secret itself
+    return hashlib.sha256(f"gate-manifest|{secret}".encode()).digest()
+
+def sign_manifest(body: Dict[str, Any], key: bytes) -> str:
+    canonical = json.dumps(body, sort_keys=True, separators=(",", ":"), ensure_ascii=False, default=str)
+    return hmac.new(key, canonical.encode(), hashlib.sha256).hexdigest()
+
+def _iso(value: Any) -> Any:
+    return value.isoformat() if isinstance(value, datetime) else value
+
+def manifest_entry(reg: Dict[str, Any], secret: str) -> Dict[str, Any]:
+    if reg.get("estado_pago") != "completado":
+        return {"id": reg["id"], "removed": True}
+    return {
+        "id": reg["id"],
+        "hash": qr_verification_hash(reg["id"], secret),
+        "nombre": f"{reg.get('nombre', '')} {reg.get('apellido', '')}".strip(),
+        "numero": reg.get("numero_competicion"),
+        "categorias": reg.get("categorias", []),
+        "check_in": bool(reg.get("check_in")),
+        # Devices get (and the signature covers) the same ISO text whatever the stored type
+        "check_in_time": _iso(reg.get("check_in_time")),
+    }
+
+async def record_deletions(db, registration_ids: List[str]):
+    """Leave tombstones so devices drop deleted registrations on their next delta sync"""
+    if not registration_ids:
+        return
+    version = gate_version_now()
+    now = datetime.now(timezone.utc)
+    await db.gate_tombstones.insert_many([
+        {"id": registration_id, "gate_version": version, "created_at": now}
+        for registration_id in registration_ids
+    ])
+
+async def build_manifest(db, secret: str, key: bytes, since: Optional[int] = None) -> Dict[str, Any]:
+    """
+    Full manifest of paid registrations, or the changes after `since`:
+    changed registrations (unpaid ones as removals) plus tombstones.
+    """
+    version = gate_version_now() - SYNC_OVERLAP_MS
+    retention_floor = gate_version_now() - TOMBSTONE_RETENTION_SECONDS * 1000
+    full = since is None or since < retention_floor
+
+    if full:
+        regs = await db.registrations.find({"estado_pago": "completado"}, MANIFEST_PROJECTION).to_list(None)
+        entries = [manifest_entry(reg, secret) for reg in regs]
+    else:
+        regs = await db.registrations.find({"gate_version": {"$gt": since}}, MANIFEST_PROJECTION).to_list(None)
+        entries = [manifest_entry(reg, secret) for reg in regs]
+        tombstones = await db.gate_tombstones.find(
+            {"gate_version": {"$gt": since}}, {"_id": 0, "id": 1}
+        ).to_list(None)
+        live_ids = {entry["id"] for entry in entries}
+        entries += [{"id": t["id"], "removed": True} for t in tombstones if t["id"] not in live_ids]
+
+    body = {
+        "version": version,
+        "since": None if full else since,
+        "full": full,
+        "generated_at": datetime.now(timezone.utc).isoformat(),
+        "count": len(entries),
+        "registrations": entries,
+    }
+    return {**body, "signature": sign_manifest(body, key)}
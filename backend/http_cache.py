@@ -0,0 +1,156 @@
+import asyncio
+import hashlib
+import json
+import logging
+import os
+from dataclasses import dataclass, field
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple, List
+
+from fastapi import Request, Response
+from config_cache import ConfigCache
+from json_responses import dumps
+from compression import COMPRESSION_MIN_BYTES, available_encodings, compress, negotiate_encoding, weak_etag
+
+PUBLIC_CACHE_MAX_AGE = int(os.getenv('PUBLIC_CACHE_MAX_AGE', '60'))
+
+# Landing content: browsers and CDNs reuse it for a minute, then revalidate in the background
+CACHE_CONTROL_CONTENT = f"public, max-age={PUBLIC_CACHE_MAX_AGE}, stale-while-revalidate=600"
+# Prices and news must never be shown stale; every use revalidates, which is a cheap 304
+CACHE_CONTROL_REVALIDATE = "public, no-cache"
+
+@dataclass
+class CachedBody:
+    body: bytes
+    etag: str
+    # config_cache stamps for a resource, part ETags for a bundle
+    versions: Tuple[Any, ...]
+    # Compressed once when the body is built, never per request; keyed by Content-Encoding
+    encoded: Dict[str, bytes] = field(default_factory=dict)
+
+def content_etag(body: bytes) -> str:
+    return '"' + hashlib.sha256(body).hexdigest()[:32] + '"'
+
+def etag_matches(if_none_match: Optional[str], *etags: str) -> bool:
+    if not if_none_match:
+        return False
+    for candidate in if_none_match.split(","):
+        candidate = candidate.strip()
+        if candidate == "*":
+            return True
+        # If-None-Match uses weak comparison
+        if candidate.startswith("W/"):
+            candidate = candidate[2:]
+        if candidate in etags:
+            return True
+    return False
+
+class PublicResponseCache:
+    """
+    Pre-serialized bodies of the public read endpoints, each with a
+    content-hash ETag.
+
+    A resource depends on config_cache version stamps; admin writes bump
+    them through `config_cache.invalidate`. While the stamps have not
+    moved, the stored bytes are served as is, and a request whose
+    If-None-Match carries the current ETag gets a 304 without a query.
+
+    A bundle is a JSON object of other resources keyed by name, spliced
+    together from their stored bytes; it is rebuilt only when one of its
+    parts is.
+    """
+
+    def __init__(self, config_cache: ConfigCache):
+        self.config_cache = config_cache
+        self._builders: Dict[str, Callable[[], Awaitable[Any]]] = {}
+        self._depends_on: Dict[str, Tuple[str, ...]] = {}
+        self._cache_control: Dict[str, str] = {}
+        self._bundles: Dict[str, List[str]] = {}
+        self._entries: Dict[str, CachedBody] = {}
+        self._locks: Dict[str, asyncio.Lock] = {}
+        self.not_modified = 0
+        self.hits = 0
+        self.builds = 0
+
+    def register(self, name: str, builder: Callable[[], Awaitable[Any]], depends_on: Tuple[str, ...],
+                 cache_control: str = CACHE_CONTROL_CONTENT):
+        self._builders[name] = builder
+        self._depends_on[name] = depends_on
+        self._cache_control[name] = cache_control
+        self._locks[name] = asyncio.Lock()
+
+    def register_bundle(self, name: str, parts: List[str], cache_control: str = CACHE_CONTROL_CONTENT):
+        self._bundles[name] = list(parts)
+        self._cache_control[name] = cache_control
+
+    async def respond(self, name: str, request: Request) -> Response:
+        entry = await self._current(name)
+        encoding = negotiate_encoding(request.headers.get("accept-encoding"))
+        encoded = entry.encoded.get(encoding) if encoding else None
+        headers = {
+            "ETag": weak_etag(entry.etag) if encoded is not None else entry.etag,
+            "Cache-Control": self._cache_control[name],
+            "Vary": "Accept-Encoding",
+        }
+        if etag_matches(request.headers.get("if-none-match"), entry.etag):
+            self.not_modified += 1
+            return Response(status_code=304, headers=headers)
+        if encoded is not None:
+            # CompressionMiddleware passes bodies with a Content-Encoding through
+            headers["Content-Encoding"] = encoding
+            return Response(content=encoded, media_type="application/json", headers=headers)
+        return Response(content=entry.body, media_type="application/json", headers=headers)
+
+    async def warm(self):
+        """Build every resource and bundle so the first visitors get stored bytes"""
+        try:
+            for name in [*self._builders, *self._bundles]:
+                await self._current(name)
+        except Exception as e:
+            logging.error(f"Could not warm public cache: {str(e)}")
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "hits": self.hits,
+            "builds": self.builds,
+            "not_modified": self.not_modified,
+            "resources": {name: entry.etag for name, entry in self._entries.items()},
+        }
+
+    async def _current(self, name: str) -> CachedBody:
+        if name in self._bundles:
+            return await self._current_bundle(name)
+        versions = await self.config_cache.versions(*self._depends_on[name])
+        entry = self._entries.get(name)
+        if entry is not None and entry.versions == versions:
+            self.hits += 1
+            return entry
+
+        async with self._locks[name]:
+            entry = self._entries.get(name)
+            if entry is not None and entry.versions == versions:
+                return entry
+            # Stamped with the versions read before building, as in ConfigCache._load
+            body = dumps(await self._builders[name]())
+            return self._store(name, body, versions)
+
+    async def _current_bundle(self, name: str) -> CachedBody:
+        parts = [(part, await self._current(part)) for part in self._bundles[name]]
+        versions = tuple(part_entry.etag for _, part_entry in parts)
+        entry = self._entries.get(name)
+        if entry is not None and entry.versions == versions:
+            self.hits += 1
+            return entry
+        body = b"{" + b",".join(
+            json.dumps(part).encode() + b":" + part_entry.body for part, part_entry in parts
+        ) + b"}"
+        return self._store(name, body, versions)
+
+    def _store(self, name: str, body: bytes, versions: Tuple[Any, ...]) -> CachedBody:
+        encoded = {}
+        if len(body) >= COMPRESSION_MIN_BYTES:
+            encoded = {encoding: compress(body, encoding, once=True) for encoding in available_encodings()}
+        entry = CachedBody(body=body, etag=content_etag(body), versions=versions, encoded=encoded)
+        self._entries[name] = entry
+        self.builds += 1
+        logging.debug(f"Public cache rebuilt {name} ({len(body)} bytes, {len(encoded.get('gzip', body))} gzipped)")
+        return entry
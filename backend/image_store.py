@@ -0,0 +1,127 @@
+import asyncio
+import hashlib
+import logging
+import re
+from pathlib import Path
+from stat import S_ISREG
+from typing import Optional, Tuple, Dict
+
+from fastapi import HTTPException
+
+from image_variants import IMAGE_VARIANTS, ImageVariantEngine
+from qr_store import _write_file_atomic
+
+# Files written by the upload endpoints (and older uploads): no separators, no leading dot
+_SOURCE_NAME = re.compile(r"^[A-Za-z0-9][A-Za-z0-9_.-]{0,200}\.(jpg|jpeg|png|gif|webp)$", re.IGNORECASE)
+VARIANT_SUFFIX = ".webp"
+
+def parse_variant_name(name: str, size: Optional[str] = None) -> Tuple[str, str]:
+    """
+    (source filename, variant) for `<file>@<variant>.webp`, or for
+    `<file>` plus `?size=<variant>` (medium when omitted).
+    """
+    if name.endswith(VARIANT_SUFFIX) and "@" in name:
+        name, _, suffix = name.rpartition("@")
+        size = suffix[:-len(VARIANT_SUFFIX)]
+    size = size or "medium"
+    if size not in IMAGE_VARIANTS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Tamaño de imagen no válido. Use: {', '.join(IMAGE_VARIANTS)}"
+        )
+    if not _SOURCE_NAME.match(name):
+        raise HTTPException(status_code=404, detail="Imagen no encontrada")
+    return name, size
+
+class ImageVariantStore:
+    """
+    WebP derivatives of the images in `source_dir`, cached on disk.
+
+    A variant's name carries a signature of the source's size and mtime and
+    of the render settings, so a cached file is never stale and the ETag is
+    known from a stat() alone, made in a thread like every other file
+    access here. Variants are rendered on first request, or ahead of time
+    with `pregenerate` right after an upload.
+    """
+
+    def __init__(self, engine: ImageVariantEngine, source_dir: Path, cache_dir: Path):
+        self.engine = engine
+        self.source_dir = Path(source_dir)
+        self.cache_dir = Path(cache_dir)
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        self._rendering: Dict[Path, asyncio.Future] = {}
+        self._background = set()
+        self._disk_hits = 0
+        self._renders = 0
+
+    async def lookup(self, filename: str, variant: str) -> Tuple[Path, str]:
+        """(source path, variant signature), or 404 when the source is not a file"""
+        path = self.source_dir / filename
+        try:
+            stat = await asyncio.to_thread(path.stat)
+        except (FileNotFoundError, NotADirectoryError):
+            stat = None
+        if stat is None or not S_ISREG(stat.st_mode):
+            raise HTTPException(status_code=404, detail="Imagen no encontrada")
+        key = f"{stat.st_mtime_ns}:{stat.st_size}:{IMAGE_VARIANTS[variant]}:{self.engine.quality}"
+        return path, hashlib.sha256(key.encode()).hexdigest()[:32]
+
+    def _path_for(self, source: Path, variant: str, signature: str) -> Path:
+        return self.cache_dir / f"{source.name}@{variant}.{signature[:16]}{VARIANT_SUFFIX}"
+
+    async def get_path(self, source: Path, variant: str, signature: str) -> Path:
+        """Path of the cached variant, rendering it in the pool on a miss"""
+        path = self._path_for(source, variant, signature)
+        if await asyncio.to_thread(path.is_file):
+            self._disk_hits += 1
+            return path
+
+        # Concurrent misses for the same variant share a single render
+        pending = self._rendering.get(path)
+        if pending is None:
+            pending = asyncio.ensure_future(self._render_and_store(source, variant, path))
+            self._rendering[path] = pending
+            pending.add_done_callback(lambda _: self._rendering.pop(path, None))
+        await asyncio.shield(pending)
+        return path
+
+    async def _render_and_store(self, source: Path, variant: str, path: Path):
+        webp = await self.engine.render(source, variant)
+        await asyncio.to_thread(_write_file_atomic, path, webp)
+        self._renders += 1
+
+    def pregenerate(self, filename: str):
+        """Render every variant of a fresh upload in the background"""
+        task = asyncio.create_task(self._pregenerate(filename))
+        self._background.add(task)
+        task.add_done_callback(self._background.discard)
+
+    async def _pregenerate(self, filename: str):
+        try:
+            await asyncio.gather(*(self._pregenerate_variant(filename, variant) for variant in IMAGE_VARIANTS))
+        except Exception as e:
+            # The variants will be rendered on first request instead
+            logging.warning(f"Could not pregenerate variants of {filename}: {e}")
+
+    async def _pregenerate_variant(self, filename: str, variant: str):
+        source, signature = await self.lookup(filename, variant)
+        await self.get_path(source, variant, signature)
+
+    async def discard(self, filename: str):
+        """Drop the variants of a deleted upload"""
+        if not _SOURCE_NAME.match(filename):
+            return
+        await asyncio.to_thread(_unlink_variants, self.cache_dir, filename)
+
+    def stats(self) -> dict:
+        return {
+            "variants": dict(IMAGE_VARIANTS),
+            "disk_hits": self._disk_hits,
+            "renders": self._renders,
+            "rendering": len(self._rendering),
+            "pregenerating": len(self._background),
+        }
+
+def _unlink_variants(cache_dir: Path, filename: str):
+    for path in cache_dir.glob(f"{filename}@*{VARIANT_SUFFIX}"):
+        path.unlink(missing_ok=True)
@@ -0,0 +1,206 @@
+import asyncio
+import logging
+import os
+import time
+from collections import deque
+from datetime import datetime, timezone
+from typing import Optional, Dict, Any, List, AsyncIterator
+
+from pymongo import ReturnDocument
+
+from json_responses import dumps
+
+LIVE_EVENTS_POLL_SECONDS = float(os.getenv('LIVE_EVENTS_POLL_SECONDS', '1'))
+LIVE_EVENTS_MAX_CONNECTIONS = int(os.getenv('LIVE_EVENTS_MAX_CONNECTIONS', '200'))
+# Events kept in memory per worker for Last-Event-ID replay; older ones come from Mongo
+LIVE_EVENTS_BUFFER = 2000
+# A connection that falls this far behind is told to reconnect instead of growing its queue
+LIVE_EVENTS_QUEUE_SIZE = 256
+LIVE_EVENTS_RETENTION_SECONDS = 24 * 3600
+HEARTBEAT_SECONDS = 15
+# How long a missing sequence number is waited for (its insert may still be in flight)
+GAP_GRACE_SECONDS = 2
+
+EVENT_REGISTRATION_CREATED = "registration.created"
+EVENT_PAYMENT_STATUS = "registration.payment"
+EVENT_CHECKED_IN = "registration.checked_in"
+
+EVENT_FIELDS = ("id", "nombre", "apellido", "numero_competicion", "estado_pago", "check_in", "check_in_time")
+
+def registration_event(reg: Dict[str, Any], **changes: Any) -> Dict[str, Any]:
+    """The registration fields dashboards need to update a row in place"""
+    data = {field: reg.get(field) for field in EVENT_FIELDS if field in reg}
+    data.update(changes)
+    return data
+
+def format_sse(event: Dict[str, Any]) -> bytes:
+    data = dumps(event["data"]).decode()
+    return f"id: {event['seq']}\nevent: {event['type']}\ndata: {data}\n\n".encode()
+
+class _Subscriber:
+    def __init__(self):
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=LIVE_EVENTS_QUEUE_SIZE)
+        self.overflowed = False
+
+class LiveEventBus:
+    """
+    Registration events (new registration, payment status, check-in) for
+    the admin and gate dashboards, delivered over SSE.
+
+    `publish` stores each event in the `live_events` collection under a
+    global sequence number, so every gunicorn worker sees every event.
+    Each worker runs one poller that reads new events in sequence order
+    and fans them out to its connections; the cost of a connection is a
+    bounded queue, not a query. Reconnecting clients resume from
+    Last-Event-ID out of the in-memory buffer, or Mongo for older ids.
+    """
+
+    SEQUENCE_ID = "live_events"
+
+    def __init__(self, db, poll_interval: float = LIVE_EVENTS_POLL_SECONDS,
+                 max_connections: int = LIVE_EVENTS_MAX_CONNECTIONS):
+        self.db = db
+        self.poll_interval = poll_interval
+        self.max_connections = max_connections
+        self._buffer: deque = deque(maxlen=LIVE_EVENTS_BUFFER)
+        self._subscribers: set = set()
+        self._last_seq: Optional[int] = None
+        self._gap_since: Optional[float] = None
+        self._wakeup = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+        self.published = 0
+        self.dropped_connections = 0
+
+    async def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def publish(self, event_type: str, data: Dict[str, Any]):
+        await self.publish_many(event_type, [data])
+
+    async def publish_many(self, event_type: str, items: List[Dict[str, Any]]):
+        """Store events with consecutive sequence numbers; failures are logged, never raised"""
+        if not items:
+            return
+        try:
+            sequence = await self.db.counters.find_one_and_update(
+                {"_id": self.SEQUENCE_ID}, {"$inc": {"seq": len(items)}},
+                upsert=True, return_document=ReturnDocument.AFTER
+            )
+            first = sequence["seq"] - len(items) + 1
+            now = datetime.now(timezone.utc)
+            await self.db.live_events.insert_many([
+                {"seq": first + offset, "type": event_type, "data": data, "created_at": now}
+                for offset, data in enumerate(items)
+            ])
+            self.published += len(items)
+            self._wakeup.set()
+        except Exception as e:
+            logging.error(f"Could not publish {event_type} event: {str(e)}")
+
+    def has_capacity(self) -> bool:
+        return len(self._subscribers) < self.max_connections
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "connections": len(self._subscribers),
+            "max_connections": self.max_connections,
+            "last_seq": self._last_seq,
+            "buffered": len(self._buffer),
+            "published": self.published,
+            "dropped_connections": self.dropped_connections,
+        }
+
+    async def stream(self, last_event_id: Optional[int] = None) -> AsyncIterator[bytes]:
+        """SSE byte stream: replay after `last_event_id`, then live events and heartbeats"""
+        subscriber = _Subscriber()
+        self._subscribers.add(subscriber)
+        try:
+            yield b"retry: 3000\n\n"
+            sent = last_event_id
+            if last_event_id is not None:
+                for event in await self._replay(last_event_id):
+                    sent = event["seq"]
+                    yield format_sse(event)
+
+            while True:
+                try:
+                    event = await asyncio.wait_for(subscriber.queue.get(), HEARTBEAT_SECONDS)
+                except asyncio.TimeoutError:
+                    yield b": ping\n\n"
+                    continue
+                if event is None:
+                    # Queue overflowed: the client reconnects and replays from its last id
+                    yield b"event: reset\ndata: {}\n\n"
+                    break
+                if sent is not None and event["seq"] <= sent:
+                    continue
+                sent = event["seq"]
+                yield format_sse(event)
+        finally:
+            self._subscribers.discard(subscriber)
+
+    async def _replay(self, after: int) -> List[Dict[str, Any]]:
+        if self._buffer and self._buffer[0]["seq"] <= after + 1:
+            return [event for event in self._buffer if event["seq"] > after]
+        return await self.db.live_events.find(
+            {"seq": {"$gt": after}}, {"_id": 0}
+        ).sort("seq", 1).limit(LIVE_EVENTS_BUFFER).to_list(LIVE_EVENTS_BUFFER)
+
+    def _dispatch(self, event: Dict[str, Any]):
+        self._buffer.append(event)
+        for subscriber in list(self._subscribers):
+            if subscriber.overflowed:
+                continue
+            try:
+                subscriber.queue.put_nowait(event)
+            except asyncio.QueueFull:
+                subscriber.overflowed = True
+                self.dropped_connections += 1
+                # Make room for the end-of-stream marker
+                subscriber.queue.get_nowait()
+                subscriber.queue.put_nowait(None)
+
+    async def _poll(self):
+        if self._last_seq is None:
+            sequence = await self.db.counters.find_one({"_id": self.SEQUENCE_ID}) or {}
+            self._last_seq = sequence.get("seq", 0)
+            return
+
+        events = await self.db.live_events.find(
+            {"seq": {"$gt": self._last_seq}}, {"_id": 0}
+        ).sort("seq", 1).limit(LIVE_EVENTS_BUFFER).to_list(LIVE_EVENTS_BUFFER)
+        for event in events:
+            if event["seq"] != self._last_seq + 1:
+                # A publisher holds the missing number but has not inserted it yet
+                now = time.monotonic()
+                if self._gap_since is None:
+                    self._gap_since = now
+                if now - self._gap_since < GAP_GRACE_SECONDS:
+                    return
+            self._gap_since = None
+            self._last_seq = event["seq"]
+            self._dispatch(event)
+
+    async def _run(self):
+        while True:
+            try:
+                await self._poll()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logging.error(f"Live events poller error: {str(e)}")
+            self._wakeup.clear()
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), self.poll_interval)
+            except asyncio.TimeoutError:
+                pass
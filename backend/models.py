@@ -48,6 +48,18 @@ class QRScanRequest(BaseModel):
 class CheckInRequest(BaseModel):
     registration_id: str
 
+class CheckInRecord(BaseModel):
+    registration_id: str
+    scanned_at: Optional[str] = None  # ISO 8601, when the gate device scanned the QR
+    gate_id: Optional[str] = None
+
+class CheckInBatch(BaseModel):
+    check_ins: List[CheckInRecord] = Field(..., min_length=1, max_length=1000)
+
+class BulkStatusUpdate(BaseModel):
+    registration_ids: List[str] = Field(..., min_length=1, max_length=1000)
+    estado_pago: str
+
 # Platform Configuration (Super Admin)
 class PlatformConfig(BaseModel):
     model_config = ConfigDict(extra="ignore")
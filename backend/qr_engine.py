@@ -0,0 +1,31 @@
+import os
+import time
+
+from qr_service import render_qr_png
+from render_pool import ProcessPoolRenderer
+
+QR_POOL_WORKERS = int(os.getenv('QR_POOL_WORKERS', '2'))
+QR_POOL_MAX_PENDING = int(os.getenv('QR_POOL_MAX_PENDING', '64'))
+
+def _timed_render(registration_id: str, secret_key: str) -> tuple:
+    """Runs inside the pool: returns (png_bytes, seconds spent rendering)"""
+    started = time.perf_counter()
+    png = render_qr_png(registration_id, secret_key)
+    return png, time.perf_counter() - started
+
+class QRRenderEngine(ProcessPoolRenderer):
+    """
+    Renders registration QR codes in the process pool, so the
+    qrcode/Pillow work never runs on the event loop.
+    """
+
+    name = "QR render"
+
+    def __init__(self, secret_key: str, max_workers: int = QR_POOL_WORKERS,
+                 max_pending: int = QR_POOL_MAX_PENDING, sample_size: int = 512):
+        super().__init__(max_workers, max_pending, sample_size)
+        self.secret_key = secret_key
+
+    async def render_png(self, registration_id: str) -> bytes:
+        """Render the QR for a registration as PNG bytes without blocking the loop"""
+        return await self._run(_timed_render, registration_id, self.secret_key)
@@ -4,16 +4,21 @@ import base64
 import hashlib
 from datetime import datetime, timezone
 
-def generate_qr_code(registration_id: str, secret_key: str) -> str:
+def qr_verification_hash(registration_id: str, secret_key: str) -> str:
     """
-    Genera un código QR único para una inscripción
-    Retorna el QR en formato base64
+    Hash de verificación que acompaña al id de inscripción dentro del QR
     """
-    verification_hash = hashlib.sha256(
+    return hashlib.sha256(
         f"{registration_id}{secret_key}".encode()
     ).hexdigest()[:16]
-    
-    qr_data = f"{registration_id}|{verification_hash}"
+
+def render_qr_png(registration_id: str, secret_key: str) -> bytes:
+    """
+    Renderiza el QR de una inscripción como bytes PNG.
+    Es una función pura a nivel de módulo para poder ejecutarse en un
+    ProcessPoolExecutor (ver qr_engine.py)
+    """
+    qr_data = f"{registration_id}|{qr_verification_hash(registration_id, secret_key)}"
     
     qr = qrcode.QRCode(
         version=1,
@@ -28,12 +33,19 @@ def generate_qr_code(registration_id: str, secret_key: str) -> str:
     
     buffer = io.BytesIO()
     img.save(buffer, format='PNG')
-    buffer.seek(0)
-    
-    img_base64 = base64.b64encode(buffer.getvalue()).decode()
-    
+    return buffer.getvalue()
+
+def png_to_data_uri(png_bytes: bytes) -> str:
+    img_base64 = base64.b64encode(png_bytes).decode()
     return f"data:image/png;base64,{img_base64}"
 
+def generate_qr_code(registration_id: str, secret_key: str) -> str:
+    """
+    Genera un código QR único para una inscripción
+    Retorna el QR en formato base64
+    """
+    return png_to_data_uri(render_qr_png(registration_id, secret_key))
+
 def verify_qr_code(qr_data: str, secret_key: str) -> tuple:
     """
     Verifica la autenticidad de un código QR
@@ -46,9 +58,7 @@ def verify_qr_code(qr_data: str, secret_key: str) -> tuple:
         
         registration_id, provided_hash = parts
         
-        expected_hash = hashlib.sha256(
-            f"{registration_id}{secret_key}".encode()
-        ).hexdigest()[:16]
+        expected_hash = qr_verification_hash(registration_id, secret_key)
         
         if provided_hash == expected_hash:
             return True, registration_id
@@ -0,0 +1,110 @@
+import asyncio
+import hashlib
+import os
+from collections import OrderedDict
+from pathlib import Path
+from typing import Optional, Iterable, List
+
+from qr_engine import QRRenderEngine
+
+QR_CACHE_MAX_ENTRIES = int(os.getenv('QR_CACHE_MAX_ENTRIES', '2048'))
+
+class QRAssetStore:
+    """
+    QR PNG assets keyed by registration id, kept out of the registration
+    documents. Rendering is deterministic (same id + secret -> same bytes),
+    so assets are cached in a per-worker LRU backed by a shared disk cache
+    and never need invalidating. Deletion only reaches the deleting
+    worker's LRU, so callers must check the registration still exists
+    before serving an asset.
+    """
+
+    def __init__(self, engine: QRRenderEngine, cache_dir: Path,
+                 max_entries: int = QR_CACHE_MAX_ENTRIES):
+        self.engine = engine
+        self.cache_dir = Path(cache_dir)
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        self.max_entries = max(1, max_entries)
+        self._memory: "OrderedDict[str, bytes]" = OrderedDict()
+        self._rendering = {}
+
+    def _path_for(self, registration_id: str) -> Path:
+        # Hash the id so user input never becomes part of a file path
+        digest = hashlib.sha256(registration_id.encode()).hexdigest()
+        return self.cache_dir / digest[:2] / f"{digest}.png"
+
+    def etag_for(self, registration_id: str) -> str:
+        key = f"{registration_id}{self.engine.secret_key}".encode()
+        return f'"{hashlib.sha256(key).hexdigest()[:32]}"'
+
+    def get_cached(self, registration_id: str) -> Optional[bytes]:
+        png = self._memory.get(registration_id)
+        if png is not None:
+            self._memory.move_to_end(registration_id)
+        return png
+
+    async def get_png(self, registration_id: str) -> bytes:
+        """Return the QR PNG from memory, disk or a fresh render, in that order"""
+        png = self.get_cached(registration_id)
+        if png is not None:
+            return png
+
+        path = self._path_for(registration_id)
+        png = await asyncio.to_thread(_read_file, path)
+        if png is None:
+            png = await self._render_once(registration_id, path)
+
+        self._remember(registration_id, png)
+        return png
+
+    async def _render_once(self, registration_id: str, path: Path) -> bytes:
+        # Concurrent misses for the same id share a single render
+        pending = self._rendering.get(registration_id)
+        if pending is None:
+            pending = asyncio.ensure_future(self._render_and_store(registration_id, path))
+            self._rendering[registration_id] = pending
+            pending.add_done_callback(lambda _: self._rendering.pop(registration_id, None))
+        return await asyncio.shield(pending)
+
+    async def _render_and_store(self, registration_id: str, path: Path) -> bytes:
+        png = await self.engine.render_png(registration_id)
+        await asyncio.to_thread(_write_file_atomic, path, png)
+        return png
+
+    def _remember(self, registration_id: str, png: bytes):
+        self._memory[registration_id] = png
+        self._memory.move_to_end(registration_id)
+        while len(self._memory) > self.max_entries:
+            self._memory.popitem(last=False)
+
+    def discard(self, registration_id: str):
+        """Drop a deleted registration's asset from memory and disk"""
+        self._memory.pop(registration_id, None)
+        try:
+            self._path_for(registration_id).unlink()
+        except FileNotFoundError:
+            pass
+
+    async def discard_many(self, registration_ids: Iterable[str]):
+        """discard() for a bulk deletion; the files are removed off the event loop"""
+        paths = []
+        for registration_id in registration_ids:
+            self._memory.pop(registration_id, None)
+            paths.append(self._path_for(registration_id))
+        await asyncio.to_thread(_unlink_all, paths)
+
+def _unlink_all(paths: List[Path]):
+    for path in paths:
+        path.unlink(missing_ok=True)
+
+def _read_file(path: Path) -> Optional[bytes]:
+    try:
+        return path.read_bytes()
+    except FileNotFoundError:
+        return None
+
+def _write_file_atomic(path: Path, data: bytes):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = path.with_suffix(f".{os.getpid()}.tmp")
+    tmp_path.write_bytes(data)
+    os.replace(tmp_path, path)
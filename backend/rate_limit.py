@@ -0,0 +1,209 @@
+import ipaddress
+import json
+import logging
+import math
+import os
+import time
+from dataclasses import dataclass
+from datetime import datetime, timezone, timedelta
+from typing import Dict, Tuple, Optional, Any, List, Union
+
+from fastapi import Request
+from pymongo import ReturnDocument
+
+# Peers whose X-Forwarded-For is believed, as IPs or CIDRs: nginx on the same host by
+# default. "*" trusts every peer, for platforms like Vercel where all traffic comes
+# through an edge that overwrites the header (TRUST_FORWARDED_FOR=1 is the old spelling)
+TRUSTED_PROXIES = os.getenv('TRUSTED_PROXIES', '127.0.0.1,::1')
+TRUST_FORWARDED_FOR = os.getenv('TRUST_FORWARDED_FOR', '0') == '1'
+# "mongo" shares buckets between all gunicorn workers; "memory" keeps one per worker,
+# so N workers allow N times each limit (single-worker or test setups only)
+RATE_LIMIT_BACKEND = os.getenv('RATE_LIMIT_BACKEND', 'mongo')
+# Buckets idle this long are full again and can be dropped
+BUCKET_IDLE_SECONDS = 600
+
+IPNetwork = Union[ipaddress.IPv4Network, ipaddress.IPv6Network]
+
+@dataclass(frozen=True)
+class RateRule:
+    capacity: float  # burst size
+    per_minute: float  # refill
+
+    @property
+    def rate(self) -> float:
+        return self.per_minute / 60
+
+# Public routes a bot or a refresh storm can hammer; keys are "METHOD path"
+DEFAULT_RATE_RULES: Dict[str, RateRule] = {
+    "POST /api/registrations": RateRule(capacity=5, per_minute=10),
+    "POST /api/registrations/calculate": RateRule(capacity=30, per_minute=60),
+    "POST /api/coupons/validate": RateRule(capacity=10, per_minute=30),
+    # Several gate tablets can share one venue IP
+    "POST /api/qr/scan": RateRule(capacity=60, per_minute=600),
+}
+
+def load_rate_rules() -> Dict[str, RateRule]:
+    """DEFAULT_RATE_RULES, overridden by RATE_LIMITS='{"POST /api/qr/scan": [capacity, per_minute]}'"""
+    rules = dict(DEFAULT_RATE_RULES)
+    overrides = os.getenv('RATE_LIMITS')
+    if overrides:
+        for route, (capacity, per_minute) in json.loads(overrides).items():
+            rules[route] = RateRule(capacity=float(capacity), per_minute=float(per_minute))
+    return rules
+
+def parse_trusted_proxies(value: str) -> Optional[List[IPNetwork]]:
+    """Networks from a TRUSTED_PROXIES value; None means every peer is trusted"""
+    if TRUST_FORWARDED_FOR or value.strip() == "*":
+        return None
+    networks = []
+    for entry in value.split(","):
+        if entry.strip():
+            try:
+                networks.append(ipaddress.ip_network(entry.strip(), strict=False))
+            except ValueError:
+                logging.warning(f"Ignoring invalid TRUSTED_PROXIES entry {entry.strip()!r}")
+    return networks
+
+_trusted_networks = parse_trusted_proxies(TRUSTED_PROXIES)
+
+def is_trusted_proxy(address: str) -> bool:
+    if _trusted_networks is None:
+        return True
+    try:
+        ip = ipaddress.ip_address(address)
+    except ValueError:
+        return False
+    return any(ip in network for network in _trusted_networks)
+
+def client_ip(request: Request) -> str:
+    """
+    The peer address, unless the peer is a trusted proxy: then the rightmost
+    X-Forwarded-For entry not added by a trusted proxy. Entries further left
+    were written by the client itself and cannot pick its bucket.
+    """
+    peer = request.client.host if request.client else "unknown"
+    if not is_trusted_proxy(peer):
+        return peer
+    hops = [hop.strip() for hop in request.headers.get("x-forwarded-for", "").split(",") if hop.strip()]
+    for hop in reversed(hops):
+        if not is_trusted_proxy(hop):
+            return hop
+    return hops[0] if hops else peer
+
+class MemoryBackend:
+    """Token buckets in this worker's memory"""
+
+    name = "memory"
+
+    def __init__(self):
+        self._buckets: Dict[str, Tuple[float, float]] = {}
+        self._last_sweep = time.monotonic()
+
+    async def take(self, key: str, rule: RateRule) -> float:
+        """Take a token; returns 0 when allowed, else seconds until one is available"""
+        now = time.monotonic()
+        tokens, updated = self._buckets.get(key, (rule.capacity, now))
+        tokens = min(rule.capacity, tokens + (now - updated) * rule.rate)
+        if tokens >= 1:
+            self._buckets[key] = (tokens - 1, now)
+            retry_after = 0.0
+        else:
+            self._buckets[key] = (tokens, now)
+            retry_after = (1 - tokens) / rule.rate
+        if now - self._last_sweep > BUCKET_IDLE_SECONDS:
+            self._sweep(now)
+        return retry_after
+
+    def _sweep(self, now: float):
+        self._buckets = {
+            key: bucket for key, bucket in self._buckets.items()
+            if now - bucket[1] < BUCKET_IDLE_SECONDS
+        }
+        self._last_sweep = now
+
+class MongoBackend:
+    """
+    Token buckets in the `rate_limits` collection, refilled and spent in one
+    pipeline find_one_and_update, so every worker draws from the same bucket.
+    """
+
+    name = "mongo"
+
+    def __init__(self, db):
+        self.db = db
+
+    async def take(self, key: str, rule: RateRule) -> float:
+        now = datetime.now(timezone.utc)
+        elapsed_seconds = {"$divide": [{"$subtract": [now, {"$ifNull": ["$updated_at", now]}]}, 1000]}
+        bucket = await self.db.rate_limits.find_one_and_update(
+            {"_id": key},
+            [
+                {"$set": {"tokens": {"$min": [rule.capacity, {"$add": [
+                    {"$ifNull": ["$tokens", rule.capacity]},
+                    {"$multiply": [elapsed_seconds, rule.rate]},
+                ]}]}}},
+                {"$set": {
+                    "allowed": {"$gte": ["$tokens", 1]},
+                    "updated_at": now,
+                    "expires_at": now + timedelta(seconds=BUCKET_IDLE_SECONDS),
+                }},
+                {"$set": {"tokens": {"$cond": ["$allowed", {"$subtract": ["$tokens", 1]}, "$tokens"]}}},
+            ],
+            upsert=True,
+            return_document=ReturnDocument.AFTER,
+            projection={"_id": 0, "tokens": 1, "allowed": 1}
+        )
+        if bucket["allowed"]:
+            return 0.0
+        return (1 - bucket["tokens"]) / rule.rate
+
+class RateLimiter:
+    """Per-route, per-client token buckets with rejection metrics"""
+
+    def __init__(self, backend, rules: Dict[str, RateRule]):
+        self.backend = backend
+        self.rules = rules
+        self._allowed: Dict[str, int] = {route: 0 for route in rules}
+        self._rejected: Dict[str, int] = {route: 0 for route in rules}
+        self._errors = 0
+
+    def rule_for(self, method: str, path: str) -> Optional[str]:
+        route = f"{method} {path.rstrip('/') or '/'}"
+        return route if route in self.rules else None
+
+    async def check(self, route: str, client: str) -> int:
+        """0 when the request may proceed, else the Retry-After seconds"""
+        try:
+            retry_after = await self.backend.take(f"{route}|{client}", self.rules[route])
+        except Exception as e:
+            # Fail open: a limiter outage must not take registrations down with it
+            self._errors += 1
+            logging.error(f"Rate limiter error on {route}: {str(e)}")
+            return 0
+        if retry_after:
+            self._rejected[route] += 1
+            return max(1, math.ceil(retry_after))
+        self._allowed[route] += 1
+        return 0
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "backend": self.backend.name,
+            "errors": self._errors,
+            "routes": {
+                route: {
+                    "capacity": rule.capacity,
+                    "per_minute": rule.per_minute,
+                    "allowed": self._allowed[route],
+                    "rejected": self._rejected[route],
+                }
+                for route, rule in self.rules.items()
+            },
+        }
+
+def create_rate_limiter(db, backend: str = RATE_LIMIT_BACKEND) -> RateLimiter:
+    if backend == "mongo":
+        return RateLimiter(MongoBackend(db), load_rate_rules())
+    if backend != "memory":
+        logging.warning(f"Unknown RATE_LIMIT_BACKEND {backend!r}, using memory")
+    return RateLimiter(MemoryBackend(), load_rate_rules())
@@ -0,0 +1,76 @@
+import csv
+import io
+import json
+import re
+from datetime import datetime
+from typing import AsyncIterator, Dict, Any, List
+
+from registration_query import REGISTRATION_SORT
+
+EXPORT_BATCH_SIZE = 500
+
+DEFAULT_EXPORT_COLUMNS = [
+    "id", "nombre", "apellido", "cedula", "numero_competicion", "celular",
+    "correo", "liga", "categorias", "precio_final", "codigo_cupon",
+    "estado_pago", "check_in", "check_in_time", "created_at",
+]
+
+EXPORT_MEDIA_TYPES = {
+    "csv": "text/csv; charset=utf-8",
+    "ndjson": "application/x-ndjson",
+}
+
+# A cell starting with one of these runs as a formula in Excel and Sheets
+FORMULA_PREFIXES = ("=", "+", "-", "@", "\t", "\r")
+# Phone numbers such as "+593 99 123 4567": at most arithmetic, never a function call
+PHONE_NUMBER = re.compile(r"^\+?[0-9][0-9 ()-]*$")
+
+def _csv_value(value: Any) -> Any:
+    if value is None:
+        return ""
+    if isinstance(value, list):
+        value = "; ".join(str(item) for item in value)
+    if isinstance(value, datetime):
+        return value.isoformat()
+    if isinstance(value, str) and value.startswith(FORMULA_PREFIXES) and not PHONE_NUMBER.match(value):
+        # Names, leagues and emails are user input: keep them as text
+        return "'" + value
+    return value
+
+def _json_default(value: Any):
+    if isinstance(value, datetime):
+        return value.isoformat()
+    raise TypeError(f"{type(value).__name__} is not JSON serializable")
+
+async def stream_registrations(
+    collection,
+    query: Dict[str, Any],
+    columns: List[str],
+    export_format: str,
+) -> AsyncIterator[bytes]:
+    """
+    Yield an export one row at a time from a Motor cursor, so memory stays
+    flat regardless of event size and the header goes out before any query.
+    """
+    projection = {"_id": 0}
+    for column in columns:
+        projection[column] = 1
+
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+
+    if export_format == "csv":
+        # BOM so Excel opens accents in names and categories correctly
+        writer.writerow(columns)
+        yield ("\ufeff" + buffer.getvalue()).encode()
+
+    cursor = collection.find(query, projection).sort(REGISTRATION_SORT).batch_size(EXPORT_BATCH_SIZE)
+    async for doc in cursor:
+        if export_format == "csv":
+            buffer.seek(0)
+            buffer.truncate()
+            writer.writerow([_csv_value(doc.get(column)) for column in columns])
+            yield buffer.getvalue().encode()
+        else:
+            row = {column: doc.get(column) for column in columns}
+            yield (json.dumps(row, ensure_ascii=False, default=_json_default) + "\n").encode()
@@ -0,0 +1,128 @@
+import asyncio
+import logging
+import os
+import time
+from typing import Optional, Dict, Any, Iterable
+
+from gate_manifest import SYNC_OVERLAP_MS, gate_version_now
+
+REGISTRATION_INDEX_SYNC_SECONDS = float(os.getenv('REGISTRATION_INDEX_SYNC_SECONDS', '2'))
+
+FLAG_PAID = 1
+FLAG_CHECKED_IN = 2
+
+INDEX_PROJECTION = {"_id": 0, "id": 1, "estado_pago": 1, "check_in": 1}
+
+def flags_of(reg: Dict[str, Any]) -> int:
+    flags = 0
+    if reg.get("estado_pago") == "completado":
+        flags |= FLAG_PAID
+    if reg.get("check_in"):
+        flags |= FLAG_CHECKED_IN
+    return flags
+
+class RegistrationIndex:
+    """
+    Per-worker map of registration id -> payment/check-in flags, so QR scans
+    are answered without reading the registration.
+
+    Loaded in full at startup. Writes made by this worker are applied
+    directly through `put`/`remove`; writes from other workers arrive by
+    polling registrations and gate tombstones whose gate_version moved,
+    at most `sync_interval` seconds later.
+    """
+
+    def __init__(self, db, sync_interval: float = REGISTRATION_INDEX_SYNC_SECONDS):
+        self.db = db
+        self.sync_interval = sync_interval
+        self._flags: Dict[str, int] = {}
+        self._synced_version: Optional[int] = None
+        self._task: Optional[asyncio.Task] = None
+        self.loaded = False
+        self.lookups = 0
+        self.last_sync_ms: Optional[float] = None
+
+    async def start(self):
+        try:
+            await self.load()
+        except Exception as e:
+            logging.error(f"Could not load registration index: {str(e)}")
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def load(self):
+        version = gate_version_now() - SYNC_OVERLAP_MS
+        flags = {}
+        async for reg in self.db.registrations.find({}, INDEX_PROJECTION):
+            flags[reg["id"]] = flags_of(reg)
+        self._flags = flags
+        self._synced_version = version
+        self.loaded = True
+
+    def lookup(self, registration_id: str) -> Optional[int]:
+        """Flags of a registration, or None when it does not exist"""
+        self.lookups += 1
+        return self._flags.get(registration_id)
+
+    def put(self, reg: Dict[str, Any]):
+        self._flags[reg["id"]] = flags_of(reg)
+
+    def remove(self, registration_ids: Iterable[str]):
+        for registration_id in registration_ids:
+            self._flags.pop(registration_id, None)
+
+    def clear(self):
+        self._flags.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "loaded": self.loaded,
+            "size": len(self._flags),
+            "paid": sum(1 for flags in self._flags.values() if flags & FLAG_PAID),
+            "checked_in": sum(1 for flags in self._flags.values() if flags & FLAG_CHECKED_IN),
+            "lookups": self.lookups,
+            "synced_version": self._synced_version,
+            "last_sync_ms": self.last_sync_ms,
+        }
+
+    async def sync(self):
+        """Apply registrations and deletions stamped since the last sync"""
+        if not self.loaded:
+            await self.load()
+            return
+        started = time.perf_counter()
+        since = self._synced_version
+        version = gate_version_now() - SYNC_OVERLAP_MS
+
+        changed = await self.db.registrations.find(
+            {"gate_version": {"$gt": since}}, INDEX_PROJECTION
+        ).to_list(None)
+        tombstones = await self.db.gate_tombstones.find(
+            {"gate_version": {"$gt": since}}, {"_id": 0, "id": 1}
+        ).to_list(None)
+
+        live_ids = {reg["id"] for reg in changed}
+        self.remove(t["id"] for t in tombstones if t["id"] not in live_ids)
+        for reg in changed:
+            self.put(reg)
+        self._synced_version = version
+        self.last_sync_ms = round((time.perf_counter() - started) * 1000, 2)
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(self.sync_interval)
+            try:
+                await self.sync()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logging.error(f"Registration index sync error: {str(e)}")
@@ -0,0 +1,196 @@
+import base64
+import json
+import os
+from datetime import datetime, timezone
+from typing import Optional, List, Dict, Any
+from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
+
+from fastapi import HTTPException
+
+from date_migration import date_range
+
+PAGE_SIZE_DEFAULT = 100
+PAGE_SIZE_MAX = 1000
+
+# Timeline buckets are cut in the event's local time
+EVENT_TIMEZONE = os.getenv('EVENT_TIMEZONE', 'America/Bogota')
+TIMELINE_BUCKETS = {"hour": "%Y-%m-%dT%H:00", "day": "%Y-%m-%d"}
+
+# Keyset order for every registration listing; indexes in server.py match it
+REGISTRATION_SORT = [("created_at", -1), ("id", -1)]
+# Most recent check-ins first (attendance list)
+CHECK_IN_SORT = [("check_in_time", -1), ("id", -1)]
+
+REGISTRATION_FIELDS = {
+    "id", "nombre", "apellido", "cedula", "numero_competicion", "celular",
+    "correo", "liga", "categorias", "precio_base", "descuento", "precio_final",
+    "comision_plataforma", "neto_evento", "codigo_cupon", "estado_pago",
+    "mercadopago_payment_id", "mercadopago_preference_id", "check_in",
+    "check_in_time", "created_at", "fecha_preinscripcion",
+}
+
+def build_registration_filter(
+    estado_pago: Optional[str] = None,
+    check_in: Optional[bool] = None,
+    liga: Optional[str] = None,
+    categoria: Optional[str] = None,
+    date_from: Optional[datetime] = None,
+    date_to: Optional[datetime] = None,
+) -> Dict[str, Any]:
+    """Filters shared by the admin listings, the export and the timeline; dates are [date_from, date_to)"""
+    query = {}
+    if estado_pago:
+        query["estado_pago"] = estado_pago
+    if check_in is not None:
+        query["check_in"] = check_in
+    if liga:
+        query["liga"] = liga
+    if categoria:
+        query["categorias"] = categoria
+    if date_from or date_to:
+        # A range on the keyset index: only the matching slice is read
+        query.update(date_range(
+            "created_at",
+            gte=_as_utc(date_from) if date_from else None,
+            lt=_as_utc(date_to) if date_to else None,
+        ))
+    return query
+
+def _as_utc(value: datetime) -> datetime:
+    return value if value.tzinfo else value.replace(tzinfo=timezone.utc)
+
+def build_timeline_pipeline(query: Dict[str, Any], bucket: str, tz: str = EVENT_TIMEZONE) -> List[Dict[str, Any]]:
+    """Registrations, payments and revenue per hour or day of created_at"""
+    if bucket not in TIMELINE_BUCKETS:
+        raise HTTPException(status_code=400, detail="Intervalo no válido. Use 'hour' o 'day'")
+    try:
+        ZoneInfo(tz)
+    except (ZoneInfoNotFoundError, ValueError):
+        raise HTTPException(status_code=400, detail="Zona horaria no válida")
+
+    paid = {"$eq": ["$estado_pago", "completado"]}
+    # Rows still holding a string date (before migrate_dates_to_bson.py) cannot be bucketed
+    match = {"$and": [query, {"created_at": {"$type": "date"}}]} if query else {"created_at": {"$type": "date"}}
+    return [
+        {"$match": match},
+        {"$group": {
+            "_id": {"$dateToString": {"format": TIMELINE_BUCKETS[bucket], "date": "$created_at", "timezone": tz}},
+            "registrations": {"$sum": 1},
+            "paid": {"$sum": {"$cond": [paid, 1, 0]}},
+            "revenue": {"$sum": {"$cond": [paid, "$precio_final", 0]}},
+        }},
+        {"$sort": {"_id": 1}},
+        {"$project": {"_id": 0, "bucket": "$_id", "registrations": 1, "paid": 1, "revenue": 1}},
+    ]
+
+def build_summary_pipeline(query: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """Counts and amounts per payment status, and registrations per category"""
+    return [
+        {"$match": query},
+        {"$facet": {
+            "by_status": [{"$group": {
+                "_id": "$estado_pago",
+                "registrations": {"$sum": 1},
+                "revenue": {"$sum": "$precio_final"},
+                "commission": {"$sum": "$comision_plataforma"},
+                "net": {"$sum": {"$ifNull": ["$neto_evento", "$precio_final"]}},
+            }}],
+            "by_category": [
+                {"$unwind": "$categorias"},
+                {"$group": {"_id": "$categorias", "registrations": {"$sum": 1}}},
+            ],
+        }},
+    ]
+
+def parse_fields(fields: Optional[str]) -> Optional[List[str]]:
+    """Parse a `fields=a,b,c` parameter, rejecting unknown names"""
+    if not fields:
+        return None
+    names = [name.strip() for name in fields.split(",") if name.strip()]
+    unknown = [name for name in names if name not in REGISTRATION_FIELDS]
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Campos no válidos: {', '.join(unknown)}")
+    return names
+
+def build_projection(fields: Optional[List[str]]) -> Dict[str, int]:
+    if not fields:
+        return {"_id": 0, "qr_code": 0}
+    projection = {"_id": 0, "id": 1, "created_at": 1}
+    for name in fields:
+        projection[name] = 1
+    return projection
+
+def encode_cursor(doc: Dict[str, Any], field: str = "created_at") -> str:
+    value = doc.get(field)
+    if isinstance(value, datetime):
+        key = {"d": value.isoformat(), "id": doc["id"]}
+    else:
+        key = {"c": value, "id": doc["id"]}
+    raw = json.dumps(key, separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+def decode_cursor(cursor: str, field: str = "created_at") -> Dict[str, Any]:
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        key = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        value = datetime.fromisoformat(key["d"]) if "d" in key else key["c"]
+        return {field: value, "id": key["id"]}
+    except (ValueError, KeyError, TypeError):
+        raise HTTPException(status_code=400, detail="Cursor no válido")
+
+def after_cursor(query: Dict[str, Any], cursor: Optional[str], field: str = "created_at") -> Dict[str, Any]:
+    """Restrict a filter to rows strictly after `cursor` in descending (field, id) order"""
+    if not cursor:
+        return query
+    key = decode_cursor(cursor, field)
+    value = key[field]
+    clauses = [
+        {field: {"$lt": value}},
+        {field: value, "id": {"$lt": key["id"]}},
+    ]
+    # $lt never crosses BSON types. Descending, dates come first, then the
+    # ISO strings not yet migrated (migrate_dates_to_bson.py), then null/missing
+    if isinstance(value, datetime):
+        clauses.append({field: {"$not": {"$type": "date"}}})
+    elif isinstance(value, str):
+        clauses.append({field: None})
+    keyset = {"$or": clauses}
+    return {"$and": [query, keyset]} if query else keyset
+
+async def fetch_registration_page(
+    collection,
+    query: Dict[str, Any],
+    projection: Dict[str, int],
+    cursor: Optional[str] = None,
+    limit: int = PAGE_SIZE_DEFAULT,
+    sort: List[tuple] = REGISTRATION_SORT,
+) -> Dict[str, Any]:
+    """Fetch one keyset page; reads limit + 1 rows to know if another page exists"""
+    limit = max(1, min(limit, PAGE_SIZE_MAX))
+    field = sort[0][0]
+    rows = await collection.find(
+        after_cursor(query, cursor, field), projection
+    ).sort(sort).limit(limit + 1).to_list(limit + 1)
+
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = encode_cursor(rows[-1], field)
+    return {"registrations": rows, "count": len(rows), "next_cursor": next_cursor}
+
+async def fetch_registration_summary(collection, query: Dict[str, Any]) -> Dict[str, Any]:
+    """Totals for the admin dashboards, computed by the server instead of from every row"""
+    facets = (await collection.aggregate(build_summary_pipeline(query)).to_list(1))[0]
+    by_status = {
+        row["_id"]: {key: row[key] for key in ("registrations", "revenue", "commission", "net")}
+        for row in facets["by_status"]
+    }
+    return {
+        "total": sum(row["registrations"] for row in by_status.values()),
+        "revenue": sum(row["revenue"] for row in by_status.values()),
+        "by_status": by_status,
+        "by_category": {
+            row["_id"]: row["registrations"]
+            for row in sorted(facets["by_category"], key=lambda row: row["_id"])
+        },
+    }
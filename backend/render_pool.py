@@ -0,0 +1,118 @@
+import asyncio
+import logging
+import multiprocessing
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Optional, Callable, Any
+
+def summarize_times(samples) -> dict:
+    """Count, average and percentiles in milliseconds of samples given in seconds"""
+    if not samples:
+        return {"samples": 0, "avg": 0.0, "p50": 0.0, "p95": 0.0, "max": 0.0}
+    ordered = sorted(samples)
+    count = len(ordered)
+    return {
+        "samples": count,
+        "avg": round(sum(ordered) / count * 1000, 2),
+        "p50": round(ordered[count // 2] * 1000, 2),
+        "p95": round(ordered[min(count - 1, int(count * 0.95))] * 1000, 2),
+        "max": round(ordered[-1] * 1000, 2),
+    }
+
+class ProcessPoolRenderer:
+    """
+    CPU-bound rendering in a bounded ProcessPoolExecutor, so it never runs
+    on the event loop. Subclasses submit module-level functions that
+    return (result, seconds spent rendering) through `_run`.
+
+    At most `max_pending` renders are submitted to the pool at once; extra
+    callers wait on a semaphore, which is what `waiting` reports. If a
+    worker dies the pool is broken for good, so it is replaced on the next
+    render.
+    """
+
+    name = "Render"
+
+    def __init__(self, max_workers: int, max_pending: int, sample_size: int = 512):
+        self.max_workers = max(1, max_workers)
+        self.max_pending = max(1, max_pending)
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._slots: Optional[asyncio.Semaphore] = None
+        self._waiting = 0
+        self._in_flight = 0
+        self._completed = 0
+        self._failed = 0
+        self._restarts = 0
+        self._render_times = deque(maxlen=sample_size)
+        self._total_times = deque(maxlen=sample_size)
+
+    def start(self):
+        if self._executor is None:
+            # spawn: never fork a process that already holds Motor's threads
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.max_workers,
+                mp_context=multiprocessing.get_context("spawn")
+            )
+            if self._slots is None:
+                # Kept across restarts: renders still in flight release into it
+                self._slots = asyncio.Semaphore(self.max_pending)
+            logging.info(f"{self.name} pool started with {self.max_workers} workers")
+
+    def shutdown(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+    async def _run(self, fn: Callable[..., tuple], *args) -> Any:
+        if self._executor is None:
+            self.start()
+
+        started = time.perf_counter()
+        self._waiting += 1
+        try:
+            await self._slots.acquire()
+        finally:
+            self._waiting -= 1
+
+        self._in_flight += 1
+        try:
+            if self._executor is None:
+                # Shut down after a worker died while this call was waiting
+                self.start()
+            executor = self._executor
+            loop = asyncio.get_running_loop()
+            result, render_seconds = await loop.run_in_executor(executor, fn, *args)
+        except BrokenProcessPool:
+            self._failed += 1
+            if executor is self._executor:
+                logging.warning(f"{self.name} pool lost a worker; the next render starts a new pool")
+                self._restarts += 1
+                self.shutdown()
+            raise
+        except Exception:
+            self._failed += 1
+            raise
+        finally:
+            self._in_flight -= 1
+            self._slots.release()
+
+        self._completed += 1
+        self._render_times.append(render_seconds)
+        self._total_times.append(time.perf_counter() - started)
+        return result
+
+    def metrics(self) -> dict:
+        return {
+            "workers": self.max_workers,
+            "max_pending": self.max_pending,
+            "queue_depth": self._waiting + self._in_flight,
+            "waiting": self._waiting,
+            "in_flight": self._in_flight,
+            "completed": self._completed,
+            "failed": self._failed,
+            "restarts": self._restarts,
+            "render_ms": summarize_times(self._render_times),
+            "total_ms": summarize_times(self._total_times),
+        }
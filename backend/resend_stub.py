@@ -0,0 +1,35 @@
+"""
+Local stand-in for the Resend API, for testing the email outbox without
+sending real emails.
+
+Run:  uvicorn resend_stub:app --port 8025
+Then: RESEND_API_URL=http://localhost:8025 RESEND_API_KEY=test in backend/.env
+Set RESEND_STUB_FAIL_RATE (0-1) to simulate provider errors and exercise retries.
+"""
+import os
+import random
+import uuid
+from datetime import datetime, timezone
+
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse
+
+FAIL_RATE = float(os.getenv('RESEND_STUB_FAIL_RATE', '0'))
+
+app = FastAPI(title="Resend stub")
+sent_emails = []
+
+@app.post("/emails")
+async def send(request: Request):
+    if not request.headers.get("authorization", "").startswith("Bearer "):
+        return JSONResponse(status_code=401, content={"message": "Missing API key"})
+    if random.random() < FAIL_RATE:
+        return JSONResponse(status_code=503, content={"message": "Simulated outage"})
+    payload = await request.json()
+    email_id = str(uuid.uuid4())
+    sent_emails.append({"id": email_id, "received_at": datetime.now(timezone.utc).isoformat(), **payload})
+    return {"id": email_id}
+
+@app.get("/emails")
+async def list_sent():
+    return {"data": sent_emails, "total": len(sent_emails)}
@@ -1,6 +1,8 @@
-from fastapi import FastAPI, APIRouter, HTTPException, Depends, status, Request, UploadFile, File, Form
+from fastapi import FastAPI, APIRouter, HTTPException, Depends, status, Request, Response
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from fastapi.staticfiles import StaticFiles
+from fastapi.responses import StreamingResponse, JSONResponse, FileResponse
+import asyncio
 from dotenv import load_dotenv
 from starlette.middleware.cors import CORSMiddleware
 from motor.motor_asyncio import AsyncIOMotorClient
@@ -15,14 +17,47 @@ import bcrypt
 import jwt
 from decimal import Decimal
 import mercadopago
-import requests
-import hashlib
 import base64
-import shutil
-import urllib.parse
-from qr_service import generate_qr_code, verify_qr_code
+from qr_service import verify_qr_code
+from qr_engine import QRRenderEngine
+from qr_store import QRAssetStore
+from db_indexes import IndexManager
+from config_cache import ConfigCache
+from http_cache import PublicResponseCache, CACHE_CONTROL_REVALIDATE
+from json_responses import OrjsonResponse, DirectJSONRoute
+from compression import CompressionMiddleware
+from upload_pipeline import ImageUploadPipeline, StoredUpload, safe_name_prefix
+from image_variants import ImageVariantEngine
+from image_store import ImageVariantStore, parse_variant_name
+from email_outbox import EmailOutbox
+from email_templates import render_confirmation_email
+from pymongo import UpdateOne
+from check_in import (
+    CHECK_IN_RESULTS, CHECKED_IN, ALREADY_CHECKED_IN, UNPAID, ScanTimeOutOfRange, atomic_check_in, batch_check_in
+)
+from gate_manifest import gate_version_now, manifest_key, record_deletions, build_manifest
+from attendance_counters import AttendanceCounters, deltas_for
+from coupon_index import CouponIndex
+from rate_limit import create_rate_limiter, client_ip
+from coupon_redemption import (
+    CouponReservations, RESERVED, EXHAUSTED, reserve_coupon, release_coupon,
+    release_for_deleted, reclaim_for_paid
+)
+from commission_rollups import (
+    ROLLUP_PROJECTION, apply_payment_change, read_commission_totals, rebuild_commission_rollups
+)
+from live_events import (
+    LiveEventBus, registration_event,
+    EVENT_REGISTRATION_CREATED, EVENT_PAYMENT_STATUS, EVENT_CHECKED_IN
+)
+from registration_index import RegistrationIndex, FLAG_PAID, FLAG_CHECKED_IN, INDEX_PROJECTION, flags_of
+from registration_query import (
+    PAGE_SIZE_DEFAULT, CHECK_IN_SORT, EVENT_TIMEZONE, build_registration_filter, parse_fields,
+    build_projection, fetch_registration_page, fetch_registration_summary, build_timeline_pipeline
+)
+from registration_export import DEFAULT_EXPORT_COLUMNS, EXPORT_MEDIA_TYPES, stream_registrations
 from models import (
-    SiteSettings, SettingsUpdate, QRScanRequest, CheckInRequest,
+    SiteSettings, SettingsUpdate, QRScanRequest, CheckInRequest, BulkStatusUpdate, CheckInBatch,
     PlatformConfig, PlatformConfigUpdate, EventMercadoPagoConfig, 
     EventMercadoPagoUpdate, SuperAdminLogin, SuperAdminCreate, 
     GalleryImage, CommissionType
@@ -35,18 +70,45 @@ load_dotenv(ROOT_DIR / '.env')
 UPLOADS_DIR = ROOT_DIR / "uploads"
 UPLOADS_DIR.mkdir(exist_ok=True)
 
+QR_CACHE_DIR = Path(os.getenv('QR_CACHE_DIR', str(ROOT_DIR / "qr_cache")))
+# Uploads in progress; never under UPLOADS_DIR, which is served publicly
+UPLOAD_STAGING_DIR = Path(os.getenv('UPLOAD_STAGING_DIR', str(ROOT_DIR / "upload_staging")))
+IMAGE_CACHE_DIR = Path(os.getenv('IMAGE_CACHE_DIR', str(ROOT_DIR / "image_cache")))
+# Upload names are unique and never rewritten; the ETag covers a change of render settings
+IMAGE_VARIANT_HEADERS = {"Cache-Control": "public, max-age=604800"}
+
 mongo_url = os.environ['MONGO_URL']
-client = AsyncIOMotorClient(mongo_url)
+# Dates come back timezone-aware (UTC), so they serialize with their offset
+client = AsyncIOMotorClient(mongo_url, tz_aware=True)
 db = client[os.environ['DB_NAME']]
-
-app = FastAPI(title="Super GP Corona XP 2026 API")
-api_router = APIRouter(prefix="/api")
+index_manager = IndexManager(db)
+# Singleton config documents are read from memory; writers must call config_cache.invalidate
+config_cache = ConfigCache(db)
+# Serialized public GET bodies with ETags; they follow config_cache version stamps
+public_cache = PublicResponseCache(config_cache)
+# Payment/check-in flags per registration id; writers must call registration_index.put/remove
+registration_index = RegistrationIndex(db)
+# Running attendance totals; writers must call attendance_counters.bump with what they changed
+attendance_counters = AttendanceCounters(db)
+# Pushes registration changes to dashboards over SSE; writers publish what they changed
+event_bus = LiveEventBus(db)
+coupon_reservations = CouponReservations(db)
+# Active coupons by code; admin coupon writes must call coupon_index.invalidate
+coupon_index = CouponIndex(db)
+# Token buckets per route and client IP for the public write-heavy routes (see rate_limit.py)
+rate_limiter = create_rate_limiter(db)
+
+# Responses are rendered by orjson; datetimes from Mongo are serialized as they come
+app = FastAPI(title="Super GP Corona XP 2026 API", default_response_class=OrjsonResponse)
+api_router = APIRouter(prefix="/api", route_class=DirectJSONRoute)
 security = HTTPBearer()
 
 # Mount static files for uploads
 app.mount("/uploads", StaticFiles(directory=str(UPLOADS_DIR)), name="uploads")
 
 JWT_SECRET = os.getenv('JWT_SECRET', 'super-secret-key-change-in-production')
+# Gate devices verify manifests with this key; it is derived, never the JWT secret itself
+GATE_MANIFEST_KEY = manifest_key(os.getenv('GATE_MANIFEST_SECRET') or JWT_SECRET)
 JWT_ALGORITHM = 'HS256'
 SUPER_ADMIN_SECRET = os.getenv('SUPER_ADMIN_SECRET', 'platform-super-secret-2026')
 MERCADOPAGO_ACCESS_TOKEN = os.getenv('MERCADOPAGO_ACCESS_TOKEN')
@@ -58,10 +120,36 @@ FRONTEND_URL = os.getenv('FRONTEND_URL', 'http://localhost:3000')
 
 sdk = mercadopago.SDK(MERCADOPAGO_ACCESS_TOKEN)
 
+# Handlers only enqueue; the outbox worker delivers through Resend (or RESEND_API_URL)
+email_outbox = EmailOutbox(db, RESEND_API_KEY)
+CONFIRMATION_SUBJECT = "Confirmación de Inscripción - Super GP Corona XP 2026"
+
+# Uploads stream to disk in the threadpool with a byte limit and format sniffing
+upload_pipeline = ImageUploadPipeline(UPLOAD_STAGING_DIR)
+# Resized WebP copies of uploads, rendered in a process pool; deleters must call image_store.discard
+image_engine = ImageVariantEngine()
+image_store = ImageVariantStore(image_engine, UPLOADS_DIR, IMAGE_CACHE_DIR)
+
+# QR codes are rendered off the event loop, in a per-worker process pool
+qr_engine = QRRenderEngine(JWT_SECRET)
+qr_store = QRAssetStore(qr_engine, QR_CACHE_DIR)
+
+# QR PNGs live in qr_store, never in registration documents
+REGISTRATION_PROJECTION = {"_id": 0, "qr_code": 0}
+
 # Helper functions for dynamic MercadoPago and Commission
+async def load_event_mercadopago_config():
+    return await db.event_mercadopago.find_one({"event_id": "default"}, {"_id": 0})
+
+async def load_platform_config():
+    return await db.platform_config.find_one({"_id": "config"}, {"_id": 0})
+
+config_cache.register("event_mercadopago", load_event_mercadopago_config)
+config_cache.register("platform_config", load_platform_config)
+
 async def get_event_mercadopago_config():
     """Get the event organizer's MercadoPago configuration"""
-    config = await db.event_mercadopago.find_one({"event_id": "default"}, {"_id": 0})
+    config = await config_cache.get("event_mercadopago")
     if config and config.get("mercadopago_access_token"):
         return config
     # Fallback to environment variables
@@ -73,7 +161,7 @@ async def get_event_mercadopago_config():
 
 async def get_platform_config():
     """Get the platform (super admin) configuration"""
-    config = await db.platform_config.find_one({"_id": "config"}, {"_id": 0})
+    config = await config_cache.get("platform_config")
     if config:
         return config
     # Default config
@@ -164,7 +252,6 @@ class Registration(BaseModel):
     estado_pago: str = "pendiente"
     mercadopago_payment_id: Optional[str] = None
     mercadopago_preference_id: Optional[str] = None
-    qr_code: Optional[str] = None
     check_in: bool = False
     check_in_time: Optional[datetime] = None
     created_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
@@ -221,14 +308,13 @@ class ContentUpdate(BaseModel):
     key: str
     value: Any
 
-async def get_category_prices():
+async def load_category_prices():
     prices_doc = await db.category_prices.find_one({"_id": "prices"})
     if prices_doc:
         return prices_doc.get("prices", PRECIOS_BASE)
     return PRECIOS_BASE
 
-async def get_categories_from_db():
-    """Get categories from database, fallback to default CATEGORIAS"""
+async def load_categories():
     categories_doc = await db.categories.find_one({"_id": "categories_list"})
     if categories_doc and categories_doc.get("categories"):
         return categories_doc.get("categories")
@@ -240,6 +326,24 @@ async def get_categories_from_db():
     )
     return CATEGORIAS
 
+async def load_category_groups():
+    groups_doc = await db.category_groups.find_one({"_id": "groups"})
+    return groups_doc.get("groups", {}) if groups_doc else {}
+
+config_cache.register("category_prices", load_category_prices)
+config_cache.register("categories", load_categories)
+config_cache.register("category_groups", load_category_groups)
+
+async def get_category_prices():
+    return await config_cache.get("category_prices")
+
+async def get_categories_from_db():
+    """Get categories from database, fallback to default CATEGORIAS"""
+    return await config_cache.get("categories")
+
+async def get_category_groups():
+    return await config_cache.get("category_groups")
+
 async def update_category_price(categoria: str, precio: float):
     prices = await get_category_prices()
     prices[categoria] = precio
@@ -248,216 +352,14 @@ async def update_category_price(categoria: str, precio: float):
         {"$set": {"prices": prices}},
         upsert=True
     )
+    await config_cache.invalidate("category_prices")
 
-def send_email(to: str, subject: str, html: str, cc: Optional[str] = None):
-    try:
-        if not RESEND_API_KEY:
-            logging.error("RESEND_API_KEY not configured")
-            return False
-            
-        headers = {
-            "Authorization": f"Bearer {RESEND_API_KEY}",
-            "Content-Type": "application/json"
-        }
-        
-        payload = {
-            "from": "Super GP Corona <coronaclubxp@vittalix.com>",
-            "to": [to],
-            "subject": subject,
-            "html": html
-        }
-        
-        if cc:
-            payload["cc"] = [cc]
-        
-        logging.info(f"Sending email to {to} with subject: {subject}")
-        
-        response = requests.post(
-            "https://api.resend.com/emails",
-            json=payload,
-            headers=headers
-        )
-        
-        logging.info(f"Resend response status: {response.status_code}")
-        logging.info(f"Resend response body: {response.text}")
-        
-        if response.status_code in [200, 201]:
-            logging.info(f"Email sent successfully to {to}")
-            return True
-        else:
-            logging.error(f"Failed to send email: {response.status_code} - {response.text}")
-            return False
-    except Exception as e:
-        logging.error(f"Error sending email: {str(e)}")
-        return False
-
-def generate_qr_url(registration_id: str, secret_key: str) -> str:
-    """Generate a QR code URL using quickchart.io service (compatible with email clients)"""
-    verification_hash = hashlib.sha256(
-        f"{registration_id}{secret_key}".encode()
-    ).hexdigest()[:16]
-    qr_data = f"{registration_id}|{verification_hash}"
-    encoded_data = urllib.parse.quote(qr_data)
-    return f"https://quickchart.io/qr?text={encoded_data}&size=200&dark=000000&light=ffffff"
-
-def generate_confirmation_email(registration: dict, qr_code: str = None) -> str:
-    # Generate QR URL for email (quickchart.io is compatible with all email clients)
-    qr_url = generate_qr_url(registration['id'], JWT_SECRET)
-    
-    categories_html = ''.join([f'<tr><td style="padding: 5px 10px; color: #333333; font-size: 14px;">• {cat}</td></tr>' for cat in registration['categorias']])
-    
-    return f"""
-    <!DOCTYPE html>
-    <html>
-    <head>
-        <meta charset="UTF-8">
-        <meta name="viewport" content="width=device-width, initial-scale=1.0">
-    </head>
-    <body style="margin: 0; padding: 0; font-family: Arial, Helvetica, sans-serif; background-color: #f4f4f4;">
-        <table role="presentation" width="100%" cellspacing="0" cellpadding="0" border="0" style="background-color: #f4f4f4;">
-            <tr>
-                <td align="center" style="padding: 20px 10px;">
-                    <table role="presentation" width="600" cellspacing="0" cellpadding="0" border="0" style="background-color: #ffffff; max-width: 600px;">
-                        
-                        <!-- Header -->
-                        <tr>
-                            <td style="background-color: #DC2626; padding: 30px 20px; text-align: center;">
-                                <h1 style="margin: 0; color: #ffffff; font-size: 28px; font-weight: bold;">INSCRIPCIÓN CONFIRMADA</h1>
-                                <p style="margin: 10px 0 0 0; color: #ffffff; font-size: 16px;">Campeonato Interligas Super GP Corona XP 2026</p>
-                            </td>
-                        </tr>
-                        
-                        <!-- Welcome -->
-                        <tr>
-                            <td style="padding: 30px 30px 20px 30px;">
-                                <h2 style="margin: 0 0 15px 0; color: #DC2626; font-size: 22px;">¡Bienvenido al campeonato!</h2>
-                                <p style="margin: 0 0 10px 0; color: #333333; font-size: 16px; line-height: 1.5;">
-                                    Estimado/a <strong>{registration['nombre']} {registration['apellido']}</strong>,
-                                </p>
-                                <p style="margin: 0; color: #333333; font-size: 16px; line-height: 1.5;">
-                                    Tu inscripción ha sido confirmada exitosamente para el Campeonato Interligas Super GP Corona XP 2026.
-                                </p>
-                            </td>
-                        </tr>
-                        
-                        <!-- QR Code Section -->
-                        <tr>
-                            <td style="padding: 0 30px 20px 30px;">
-                                <table role="presentation" width="100%" cellspacing="0" cellpadding="0" border="0" style="background-color: #f8f9fa; border: 2px dashed #10B981; border-radius: 8px;">
-                                    <tr>
-                                        <td style="padding: 25px; text-align: center;">
-                                            <h3 style="margin: 0 0 15px 0; color: #333333; font-size: 18px; font-weight: bold;">Tu Código QR de Acceso</h3>
-                                            <img src="{qr_url}" alt="Código QR" width="200" height="200" style="display: block; margin: 0 auto; border: 4px solid #ffffff; box-shadow: 0 2px 8px rgba(0,0,0,0.1);" />
-                                            <p style="margin: 15px 0 0 0; color: #666666; font-size: 14px;">Presenta este QR el día del evento para tu check-in</p>
-                                        </td>
-                                    </tr>
-                                </table>
-                            </td>
-                        </tr>
-                        
-                        <!-- Details Section -->
-                        <tr>
-                            <td style="padding: 0 30px 20px 30px;">
-                                <h3 style="margin: 0 0 15px 0; color: #10B981; font-size: 18px; border-bottom: 2px solid #10B981; padding-bottom: 10px;">Detalles de tu inscripción</h3>
-                                <table role="presentation" width="100%" cellspacing="0" cellpadding="0" border="0">
-                                    <tr>
-                                        <td style="padding: 8px 0; border-bottom: 1px solid #eeeeee;">
-                                            <strong style="color: #10B981;">ID de Inscripción:</strong>
-                                            <span style="color: #333333; margin-left: 10px;">{registration['id']}</span>
-                                        </td>
-                                    </tr>
-                                    <tr>
-                                        <td style="padding: 8px 0; border-bottom: 1px solid #eeeeee;">
-                                            <strong style="color: #10B981;">Número de Competición:</strong>
-                                            <span style="color: #333333; margin-left: 10px; font-weight: bold; font-size: 18px;">#{registration['numero_competicion']}</span>
-                                        </td>
-                                    </tr>
-                                    <tr>
-                                        <td style="padding: 8px 0; border-bottom: 1px solid #eeeeee;">
-                                            <strong style="color: #10B981;">Cédula:</strong>
-                                            <span style="color: #333333; margin-left: 10px;">{registration['cedula']}</span>
-                                        </td>
-                                    </tr>
-                                    <tr>
-                                        <td style="padding: 8px 0; border-bottom: 1px solid #eeeeee;">
-                                            <strong style="color: #10B981;">Categorías:</strong>
-                                        </td>
-                                    </tr>
-                                    {categories_html}
-                                    <tr>
-                                        <td style="padding: 8px 0; border-bottom: 1px solid #eeeeee;">
-                                            <strong style="color: #10B981;">Precio Total:</strong>
-                                            <span style="color: #333333; margin-left: 10px; font-weight: bold;">COP {registration['precio_final']:,.0f}</span>
-                                        </td>
-                                    </tr>
-                                    <tr>
-                                        <td style="padding: 8px 0;">
-                                            <strong style="color: #10B981;">Estado de Pago:</strong>
-                                            <span style="color: #ffffff; margin-left: 10px; background-color: #10B981; padding: 3px 10px; border-radius: 4px; font-weight: bold; font-size: 12px;">{registration['estado_pago'].upper()}</span>
-                                        </td>
-                                    </tr>
-                                </table>
-                            </td>
-                        </tr>
-                        
-                        <!-- Event Info -->
-                        <tr>
-                            <td style="padding: 0 30px 20px 30px;">
-                                <h3 style="margin: 0 0 15px 0; color: #10B981; font-size: 18px; border-bottom: 2px solid #10B981; padding-bottom: 10px;">Información del Evento</h3>
-                                <p style="margin: 0 0 8px 0; color: #333333; font-size: 15px;">
-                                    <strong>Fechas:</strong> 27, 28 de Febrero y 1 de Marzo 2026
-                                </p>
-                                <p style="margin: 0; color: #333333; font-size: 15px;">
-                                    <strong>Ubicación:</strong> Corona Club XP, Avenida Panamericana Km 9 El Cofre, Popayán
-                                </p>
-                            </td>
-                        </tr>
-                        
-                        <!-- Important Notice -->
-                        <tr>
-                            <td style="padding: 0 30px 20px 30px;">
-                                <table role="presentation" width="100%" cellspacing="0" cellpadding="0" border="0" style="background-color: #DC2626; border-radius: 8px;">
-                                    <tr>
-                                        <td style="padding: 15px 20px; text-align: center;">
-                                            <p style="margin: 0; color: #ffffff; font-size: 14px; font-weight: bold;">
-                                                ⚠️ IMPORTANTE: Lleva tu QR code impreso o en tu celular el día del evento
-                                            </p>
-                                        </td>
-                                    </tr>
-                                </table>
-                            </td>
-                        </tr>
-                        
-                        <!-- Contact -->
-                        <tr>
-                            <td style="padding: 0 30px 30px 30px;">
-                                <p style="margin: 0 0 15px 0; color: #333333; font-size: 14px;">
-                                    Para cualquier consulta, contáctanos en <a href="mailto:inscripcionescorona@gmail.com" style="color: #10B981; text-decoration: none; font-weight: bold;">inscripcionescorona@gmail.com</a>
-                                </p>
-                                <p style="margin: 0; color: #DC2626; font-size: 16px; font-weight: bold;">
-                                    ¡Nos vemos en la pista! 🏁
-                                </p>
-                            </td>
-                        </tr>
-                        
-                        <!-- Footer -->
-                        <tr>
-                            <td style="background-color: #1a1a1a; padding: 20px 30px; text-align: center;">
-                                <p style="margin: 0; color: #999999; font-size: 12px;">
-                                    © 2026 Corona Club XP - Campeonato Interligas Super GP
-                                </p>
-                            </td>
-                        </tr>
-                        
-                    </table>
-                </td>
-            </tr>
-        </table>
-    </body>
-    </html>
-    """
+def generate_confirmation_email(registration: dict) -> str:
+    return render_confirmation_email(registration, JWT_SECRET)
 
-async def calculate_precio(categorias: List[str], codigo_cupon: Optional[str] = None) -> tuple:
+async def calculate_precio(categorias: List[str], codigo_cupon: Optional[str] = None,
+                           coupon: Optional[dict] = None) -> tuple:
+    """Price a registration; pass `coupon` when it was already read (reserved) to skip the lookup"""
     prices = await get_category_prices()
     precio_base = sum([prices.get(cat, 120000) for cat in categorias])
     descuento = 0.0
@@ -473,11 +375,11 @@ async def calculate_precio(categorias: List[str], codigo_cupon: Optional[str] =
         fase_actual = "extraordinaria"
         precio_base = precio_base * 1.2
     
-    if codigo_cupon:
-        coupon = await db.coupons.find_one({"codigo": codigo_cupon.upper(), "activo": True})
-        if coupon:
-            tipo_descuento = coupon.get("tipo_descuento", 0)
-            descuento = precio_base * (tipo_descuento / 100)
+    if codigo_cupon and coupon is None:
+        coupon = await coupon_index.lookup(codigo_cupon)
+    if coupon:
+        tipo_descuento = coupon.get("tipo_descuento", 0)
+        descuento = precio_base * (tipo_descuento / 100)
     
     precio_final = precio_base - descuento
     return precio_base, descuento, precio_final, fase_actual, tipo_descuento
@@ -512,7 +414,7 @@ async def test_email(email: str):
         <p style="color: #10B981; font-weight: bold;">¡Si recibes este email, la configuración es correcta!</p>
     </div>
     """
-    success = send_email(email, "Prueba - Super GP Corona XP 2026", test_html)
+    success = await email_outbox.send_now(email, "Prueba - Super GP Corona XP 2026", test_html)
     
     if success:
         return {"status": "success", "message": f"Email de prueba enviado a {email}"}
@@ -525,15 +427,22 @@ async def get_mercadopago_public_key():
     mp_config = await get_event_mercadopago_config()
     return {"public_key": mp_config.get("mercadopago_public_key", MERCADOPAGO_PUBLIC_KEY)}
 
-@api_router.get("/categories")
-async def get_categories():
+async def load_public_categories():
     categories = await get_categories_from_db()
     prices = await get_category_prices()
-    # Get category groups
-    groups_doc = await db.category_groups.find_one({"_id": "groups"})
-    groups = groups_doc.get("groups", {}) if groups_doc else {}
+    groups = await get_category_groups()
     return {"categorias": categories, "precios": prices, "grupos": groups}
 
+public_cache.register(
+    "categories", load_public_categories,
+    depends_on=("categories", "category_prices", "category_groups"),
+    cache_control=CACHE_CONTROL_REVALIDATE
+)
+
+@api_router.get("/categories")
+async def get_categories(request: Request):
+    return await public_cache.respond("categories", request)
+
 @api_router.post("/registrations/calculate")
 async def calculate_registration_price(data: dict):
     categorias = data.get("categorias", [])
@@ -554,45 +463,54 @@ async def calculate_registration_price(data: dict):
 
 @api_router.post("/registrations", response_model=Registration)
 async def create_registration(reg: RegistrationCreate):
-    precio_base, descuento, precio_final, fase, tipo_desc = await calculate_precio(reg.categorias, reg.codigo_cupon)
-    
-    # Calculate commission (kept for record-keeping)
-    comision, neto_evento = await calculate_commission(precio_final)
-    
-    registration = Registration(
-        nombre=reg.nombre,
-        apellido=reg.apellido,
-        cedula=reg.cedula,
-        numero_competicion=reg.numero_competicion,
-        celular=reg.celular,
-        correo=reg.correo,
-        liga=reg.liga,
-        categorias=reg.categorias,
-        precio_base=precio_base,
-        descuento=descuento,
-        precio_final=precio_final,
-        comision_plataforma=comision,
-        neto_evento=neto_evento,
-        codigo_cupon=reg.codigo_cupon,
-        estado_pago="pendiente_pago"  # Always pending - manual payment verification
-    )
-    
-    qr_code = generate_qr_code(registration.id, JWT_SECRET)
-    registration.qr_code = qr_code
+    # The coupon use is reserved before pricing, in the same round trip that reads the discount
+    coupon = None
+    if reg.codigo_cupon:
+        outcome, coupon = await reserve_coupon(db, reg.codigo_cupon)
+        if outcome == EXHAUSTED:
+            raise HTTPException(status_code=400, detail="Cupón agotado")
     
-    doc = registration.model_dump()
-    doc['created_at'] = doc['created_at'].isoformat()
-    doc['fecha_preinscripcion'] = doc['created_at']  # Add pre-registration date
-    if doc.get('check_in_time'):
-        doc['check_in_time'] = doc['check_in_time'].isoformat()
-    
-    await db.registrations.insert_one(doc)
-    
-    if reg.codigo_cupon and precio_final < precio_base:
-        await db.coupons.update_one(
-            {"codigo": reg.codigo_cupon.upper()},
-            {"$inc": {"usos_actuales": 1}}
+    try:
+        precio_base, descuento, precio_final, fase, tipo_desc = await calculate_precio(reg.categorias, coupon=coupon)
+        
+        # Calculate commission (kept for record-keeping)
+        comision, neto_evento = await calculate_commission(precio_final)
+        
+        registration = Registration(
+            nombre=reg.nombre,
+            apellido=reg.apellido,
+            cedula=reg.cedula,
+            numero_competicion=reg.numero_competicion,
+            celular=reg.celular,
+            correo=reg.correo,
+            liga=reg.liga,
+            categorias=reg.categorias,
+            precio_base=precio_base,
+            descuento=descuento,
+            precio_final=precio_final,
+            comision_plataforma=comision,
+            neto_evento=neto_evento,
+            codigo_cupon=reg.codigo_cupon,
+            estado_pago="pendiente_pago"  # Always pending - manual payment verification
         )
+        
+        # QR is rendered lazily by GET /registration/{id}/qr and kept in qr_store
+        doc = registration.model_dump()
+        doc['fecha_preinscripcion'] = doc['created_at']  # Add pre-registration date
+        doc['gate_version'] = gate_version_now()
+        if coupon:
+            doc['cupon_estado'] = RESERVED
+        
+        await db.registrations.insert_one(doc)
+    except Exception:
+        # Nothing was stored, so the reserved use goes back to the coupon
+        if coupon:
+            await release_coupon(db, coupon["codigo"])
+        raise
+    
+    registration_index.put(doc)
+    await attendance_counters.bump(total_registrations=1)
+    await event_bus.publish(EVENT_REGISTRATION_CREATED, registration_event(doc))
     
     # Note: Email will be sent after manual payment verification by admin
     
@@ -627,18 +545,28 @@ async def mercadopago_webhook(request: Request):
                 reg = await db.registrations.find_one({"id": external_reference})
                 
                 if reg:
-                    await db.registrations.update_one(
-                        {"id": external_reference},
+                    result = await db.registrations.update_one(
+                        {"id": external_reference, "estado_pago": {"$ne": "completado"}},
                         {
                             "$set": {
                                 "estado_pago": "completado",
-                                "mercadopago_payment_id": str(payment_id)
+                                "mercadopago_payment_id": str(payment_id),
+                                "gate_version": gate_version_now()
                             }
                         }
                     )
+                    registration_index.put({**reg, "estado_pago": "completado"})
+                    await attendance_counters.bump(completed_payments=result.modified_count)
+                    if result.modified_count:
+                        await apply_payment_change(db, [reg], 1)
+                        await reclaim_for_paid(db, [reg])
+                        await event_bus.publish(EVENT_PAYMENT_STATUS, registration_event(
+                            reg, estado_pago="completado", estado_pago_anterior=reg.get("estado_pago")
+                        ))
                     
-                    email_html = generate_confirmation_email(reg, reg.get('qr_code'))
-                    send_email(reg["correo"], "Confirmación de Inscripción - Super GP Corona XP 2026", email_html, EMAIL_ADMIN)
+                    email_html = generate_confirmation_email(reg)
+                    await email_outbox.enqueue(reg["correo"], CONFIRMATION_SUBJECT, email_html, EMAIL_ADMIN,
+                                               registration_id=external_reference, template="confirmation")
         
         return {"status": "ok"}
     except Exception as e:
@@ -675,20 +603,30 @@ async def verify_payment(registration_id: str):
         for payment in payments:
             if payment.get("status") == "approved":
                 # Update registration
-                await db.registrations.update_one(
-                    {"id": registration_id},
+                result = await db.registrations.update_one(
+                    {"id": registration_id, "estado_pago": {"$ne": "completado"}},
                     {
                         "$set": {
                             "estado_pago": "completado",
-                            "mercadopago_payment_id": str(payment.get("id"))
+                            "mercadopago_payment_id": str(payment.get("id")),
+                            "gate_version": gate_version_now()
                         }
                     }
                 )
+                await attendance_counters.bump(completed_payments=result.modified_count)
                 
                 # Send confirmation email
                 updated_reg = await db.registrations.find_one({"id": registration_id}, {"_id": 0})
-                email_html = generate_confirmation_email(updated_reg, updated_reg.get('qr_code'))
-                send_email(updated_reg["correo"], "Confirmación de Inscripción - Super GP Corona XP 2026", email_html, EMAIL_ADMIN)
+                registration_index.put(updated_reg)
+                if result.modified_count:
+                    await apply_payment_change(db, [updated_reg], 1)
+                    await reclaim_for_paid(db, [updated_reg])
+                    await event_bus.publish(EVENT_PAYMENT_STATUS, registration_event(
+                        updated_reg, estado_pago_anterior=reg.get("estado_pago")
+                    ))
+                email_html = generate_confirmation_email(updated_reg)
+                await email_outbox.enqueue(updated_reg["correo"], CONFIRMATION_SUBJECT, email_html, EMAIL_ADMIN,
+                                           registration_id=registration_id, template="confirmation")
                 
                 return {"status": "completed", "message": "Pago confirmado exitosamente"}
         
@@ -709,54 +647,237 @@ async def update_registration_status(registration_id: str, data: dict, payload:
     if not reg:
         raise HTTPException(status_code=404, detail="Inscripción no encontrada")
     
-    await db.registrations.update_one(
-        {"id": registration_id},
-        {"$set": {"estado_pago": new_status}}
-    )
+    if reg.get("estado_pago") == new_status:
+        return {"message": f"Estado actualizado a {new_status}"}
     
-    # If marking as completed and email not sent, send it
+    # Conditional on the status read: the counters and rollups below take
+    # their sign from it, so a concurrent change must not be overwritten
+    result = await db.registrations.update_one(
+        {"id": registration_id, "estado_pago": reg.get("estado_pago")},
+        {"$set": {"estado_pago": new_status, "gate_version": gate_version_now()}}
+    )
+    if not result.modified_count:
+        raise HTTPException(status_code=409, detail="La inscripción cambió mientras se actualizaba. Intente de nuevo")
+    
+    registration_index.put({**reg, "estado_pago": new_status})
+    if "completado" in (new_status, reg.get("estado_pago")):
+        sign = 1 if new_status == "completado" else -1
+        await attendance_counters.bump(completed_payments=sign)
+        await apply_payment_change(db, [reg], sign)
+        if sign > 0:
+            await reclaim_for_paid(db, [reg])
+    await event_bus.publish(EVENT_PAYMENT_STATUS, registration_event(
+        reg, estado_pago=new_status, estado_pago_anterior=reg.get("estado_pago")
+    ))
+    
+    # Newly completed: send the confirmation email
     if new_status == "completado":
         updated_reg = await db.registrations.find_one({"id": registration_id}, {"_id": 0})
-        email_html = generate_confirmation_email(updated_reg, updated_reg.get('qr_code'))
-        send_email(updated_reg["correo"], "Confirmación de Inscripción - Super GP Corona XP 2026", email_html, EMAIL_ADMIN)
+        email_html = generate_confirmation_email(updated_reg)
+        await email_outbox.enqueue(updated_reg["correo"], CONFIRMATION_SUBJECT, email_html, EMAIL_ADMIN,
+                                   registration_id=registration_id, template="confirmation")
     
     return {"message": f"Estado actualizado a {new_status}"}
 
+@api_router.put("/admin/registrations/bulk-status")
+async def bulk_update_registration_status(update: BulkStatusUpdate, payload: dict = Depends(verify_token)):
+    """Update the payment status of many registrations, each conditional on the status read (admin only)"""
+    if update.estado_pago not in ["pendiente", "completado"]:
+        raise HTTPException(status_code=400, detail="Estado no válido")
+    
+    ids = list(dict.fromkeys(update.registration_ids))
+    regs = await db.registrations.find({"id": {"$in": ids}}, REGISTRATION_PROJECTION).to_list(len(ids))
+    regs_by_id = {reg["id"]: reg for reg in regs}
+    
+    results = {}
+    candidates = []
+    for registration_id in ids:
+        reg = regs_by_id.get(registration_id)
+        if reg is None:
+            results[registration_id] = "not_found"
+        elif reg.get("estado_pago") == update.estado_pago:
+            results[registration_id] = "unchanged"
+        else:
+            candidates.append(reg)
+    
+    # One unordered bulk_write, each update conditional on the status read
+    # above: if another request changed a row meanwhile, that request owns
+    # its side effects. The batch id tells this request's writes apart
+    batch_id = str(uuid.uuid4())
+    if candidates:
+        await db.registrations.bulk_write([
+            UpdateOne(
+                {"id": reg["id"], "estado_pago": reg.get("estado_pago")},
+                {"$set": {"estado_pago": update.estado_pago, "gate_version": gate_version_now(),
+                          "status_batch": batch_id}}
+            )
+            for reg in candidates
+        ], ordered=False)
+    written = await db.registrations.find(
+        {"id": {"$in": [reg["id"] for reg in candidates]}, "status_batch": batch_id},
+        {**REGISTRATION_PROJECTION, "status_batch": 0}
+    ).to_list(len(candidates))
+    written_by_id = {reg["id"]: reg for reg in written}
+    
+    to_update = []
+    was_paid = []
+    previous_status = {}
+    for before in candidates:
+        after = written_by_id.get(before["id"])
+        if after is None:
+            results[before["id"]] = "conflict"
+            continue
+        results[before["id"]] = "updated"
+        previous_status[before["id"]] = before.get("estado_pago")
+        to_update.append(after)
+        if before.get("estado_pago") == "completado":
+            was_paid.append(after)
+    
+    if to_update:
+        for reg in to_update:
+            registration_index.put(reg)
+        await event_bus.publish_many(EVENT_PAYMENT_STATUS, [
+            registration_event(reg, estado_pago_anterior=previous_status[reg["id"]]) for reg in to_update
+        ])
+        if update.estado_pago == "completado":
+            await attendance_counters.bump(completed_payments=len(to_update))
+            await apply_payment_change(db, to_update, 1)
+            await reclaim_for_paid(db, to_update)
+        elif was_paid:
+            await attendance_counters.bump(completed_payments=-len(was_paid))
+            await apply_payment_change(db, was_paid, -1)
+    
+    queued = 0
+    if update.estado_pago == "completado" and to_update:
+        queued = await email_outbox.enqueue_many([
+            {"to": reg["correo"], "subject": CONFIRMATION_SUBJECT, "html": generate_confirmation_email(reg),
+             "cc": EMAIL_ADMIN, "registration_id": reg["id"]}
+            for reg in to_update
+        ], template="confirmation")
+    
+    return {
+        "message": f"{len(to_update)} inscripciones actualizadas a {update.estado_pago}",
+        "updated": len(to_update),
+        "emails_queued": queued,
+        "results": [{"id": registration_id, "result": results[registration_id]} for registration_id in ids]
+    }
+
 @api_router.get("/registrations")
-async def get_registrations(payload: dict = Depends(verify_token)):
-    registrations = await db.registrations.find({}, {"_id": 0}).to_list(1000)
-    for reg in registrations:
-        if isinstance(reg.get('created_at'), str):
-            reg['created_at'] = datetime.fromisoformat(reg['created_at'])
-    return {"registrations": registrations, "total": len(registrations)}
+async def get_registrations(
+    cursor: Optional[str] = None,
+    limit: int = PAGE_SIZE_DEFAULT,
+    estado_pago: Optional[str] = None,
+    check_in: Optional[bool] = None,
+    liga: Optional[str] = None,
+    categoria: Optional[str] = None,
+    date_from: Optional[datetime] = None,
+    date_to: Optional[datetime] = None,
+    fields: Optional[str] = None,
+    payload: dict = Depends(verify_token)
+):
+    """Registrations newest first, one keyset page at a time (follow next_cursor)"""
+    page = await fetch_registration_page(
+        db.registrations,
+        build_registration_filter(estado_pago, check_in, liga, categoria, date_from, date_to),
+        build_projection(parse_fields(fields)),
+        cursor,
+        limit
+    )
+    return page
+
+@api_router.get("/admin/registrations/export")
+async def export_registrations(
+    format: str = "csv",
+    fields: Optional[str] = None,
+    estado_pago: Optional[str] = None,
+    check_in: Optional[bool] = None,
+    liga: Optional[str] = None,
+    categoria: Optional[str] = None,
+    date_from: Optional[datetime] = None,
+    date_to: Optional[datetime] = None,
+    payload: dict = Depends(verify_token)
+):
+    """Stream every matching registration as CSV or NDJSON, with no row cap"""
+    if format not in EXPORT_MEDIA_TYPES:
+        raise HTTPException(status_code=400, detail="Formato no válido. Use 'csv' o 'ndjson'")
+    
+    columns = parse_fields(fields) or DEFAULT_EXPORT_COLUMNS
+    query = build_registration_filter(estado_pago, check_in, liga, categoria, date_from, date_to)
+    filename = f"inscripciones_{datetime.now(timezone.utc).strftime('%Y%m%d_%H%M%S')}.{format}"
+    
+    return StreamingResponse(
+        stream_registrations(db.registrations, query, columns, format),
+        media_type=EXPORT_MEDIA_TYPES[format],
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'}
+    )
+
+@api_router.get("/admin/registrations/timeline")
+async def get_registration_timeline(
+    bucket: str = "day",
+    tz: str = EVENT_TIMEZONE,
+    estado_pago: Optional[str] = None,
+    liga: Optional[str] = None,
+    categoria: Optional[str] = None,
+    date_from: Optional[datetime] = None,
+    date_to: Optional[datetime] = None,
+    payload: dict = Depends(verify_token)
+):
+    """Registrations, payments and revenue per hour or day, over the created_at index"""
+    query = build_registration_filter(estado_pago, None, liga, categoria, date_from, date_to)
+    series = await db.registrations.aggregate(build_timeline_pipeline(query, bucket, tz)).to_list(None)
+    return {"bucket": bucket, "timezone": tz, "series": series}
+
+@api_router.get("/admin/registrations/summary")
+async def get_registration_summary(
+    estado_pago: Optional[str] = None,
+    check_in: Optional[bool] = None,
+    liga: Optional[str] = None,
+    categoria: Optional[str] = None,
+    date_from: Optional[datetime] = None,
+    date_to: Optional[datetime] = None,
+    payload: dict = Depends(verify_token)
+):
+    """Totals, amounts per payment status and registrations per category, aggregated in MongoDB"""
+    query = build_registration_filter(estado_pago, check_in, liga, categoria, date_from, date_to)
+    return await fetch_registration_summary(db.registrations, query)
 
 @api_router.get("/registrations/{registration_id}")
 async def get_registration(registration_id: str):
-    reg = await db.registrations.find_one({"id": registration_id}, {"_id": 0})
+    reg = await db.registrations.find_one({"id": registration_id}, REGISTRATION_PROJECTION)
     if not reg:
         raise HTTPException(status_code=404, detail="Inscripción no encontrada")
-    if isinstance(reg.get('created_at'), str):
-        reg['created_at'] = datetime.fromisoformat(reg['created_at'])
     return reg
 
 @api_router.delete("/admin/registrations/{registration_id}")
 async def delete_registration(registration_id: str, payload: dict = Depends(verify_token)):
     """Delete a single registration"""
-    reg = await db.registrations.find_one({"id": registration_id})
+    reg = await db.registrations.find_one_and_delete(
+        {"id": registration_id}, projection={**ROLLUP_PROJECTION, "check_in": 1, "codigo_cupon": 1, "cupon_estado": 1}
+    )
     if not reg:
         raise HTTPException(status_code=404, detail="Inscripción no encontrada")
     
-    result = await db.registrations.delete_one({"id": registration_id})
-    
-    if result.deleted_count == 0:
-        raise HTTPException(status_code=500, detail="Error al eliminar inscripción")
+    qr_store.discard(registration_id)
+    await record_deletions(db, [registration_id])
+    registration_index.remove([registration_id])
+    await attendance_counters.bump(**deltas_for([reg], sign=-1))
+    if reg.get("estado_pago") == "completado":
+        await apply_payment_change(db, [reg], -1)
+    await release_for_deleted(db, [reg])
     
     return {"message": "Inscripción eliminada exitosamente", "id": registration_id}
 
 @api_router.delete("/admin/registrations")
 async def delete_all_registrations(payload: dict = Depends(verify_token)):
     """Delete all registrations - USE WITH CAUTION"""
+    deleted = await db.registrations.find({}, {"_id": 0, "id": 1, "codigo_cupon": 1, "cupon_estado": 1}).to_list(None)
     result = await db.registrations.delete_many({})
+    await qr_store.discard_many(reg["id"] for reg in deleted)
+    await record_deletions(db, [reg["id"] for reg in deleted])
+    await release_for_deleted(db, deleted)
+    registration_index.clear()
+    await attendance_counters.reconcile()
+    await rebuild_commission_rollups(db)
     return {
         "message": f"Se eliminaron {result.deleted_count} inscripciones",
         "deleted_count": result.deleted_count
@@ -768,7 +889,17 @@ async def delete_registrations_by_status(status: str, payload: dict = Depends(ve
     if status not in ["pendiente", "completado"]:
         raise HTTPException(status_code=400, detail="Estado no válido. Use 'pendiente' o 'completado'")
     
+    deleted = await db.registrations.find(
+        {"estado_pago": status}, {**ROLLUP_PROJECTION, "check_in": 1, "codigo_cupon": 1, "cupon_estado": 1}
+    ).to_list(None)
     result = await db.registrations.delete_many({"estado_pago": status})
+    await qr_store.discard_many(reg["id"] for reg in deleted)
+    await record_deletions(db, [reg["id"] for reg in deleted])
+    registration_index.remove(reg["id"] for reg in deleted)
+    await attendance_counters.bump(**deltas_for(deleted, sign=-1))
+    if status == "completado":
+        await apply_payment_change(db, deleted, -1)
+    await release_for_deleted(db, deleted)
     return {
         "message": f"Se eliminaron {result.deleted_count} inscripciones con estado '{status}'",
         "deleted_count": result.deleted_count
@@ -776,8 +907,7 @@ async def delete_registrations_by_status(status: str, payload: dict = Depends(ve
 
 @api_router.post("/coupons/validate")
 async def validate_coupon(data: dict):
-    codigo = data.get("codigo", "").upper()
-    coupon = await db.coupons.find_one({"codigo": codigo, "activo": True}, {"_id": 0})
+    coupon = await coupon_index.lookup(data.get("codigo", ""))
     
     if not coupon:
         raise HTTPException(status_code=404, detail="Cupón no válido o inactivo")
@@ -796,9 +926,9 @@ async def create_coupon(coupon: CouponCreate, payload: dict = Depends(verify_tok
     )
     
     doc = new_coupon.model_dump()
-    doc['created_at'] = doc['created_at'].isoformat()
     
     await db.coupons.insert_one(doc)
+    coupon_index.invalidate()
     return new_coupon
 
 @api_router.get("/admin/coupons")
@@ -815,19 +945,21 @@ async def create_news(news: NewsCreate, payload: dict = Depends(verify_token)):
     )
     
     doc = new_news.model_dump()
-    doc['created_at'] = doc['created_at'].isoformat()
     
     await db.news.insert_one(doc)
+    await config_cache.invalidate("news")
     return new_news
 
-@api_router.get("/news")
-async def get_news():
+async def load_public_news():
     news_list = await db.news.find({}, {"_id": 0}).sort("created_at", -1).to_list(100)
-    for news in news_list:
-        if isinstance(news.get('created_at'), str):
-            news['created_at'] = datetime.fromisoformat(news['created_at'])
     return {"news": news_list}
 
+public_cache.register("news", load_public_news, depends_on=("news",), cache_control=CACHE_CONTROL_REVALIDATE)
+
+@api_router.get("/news")
+async def get_news(request: Request):
+    return await public_cache.respond("news", request)
+
 @api_router.put("/admin/category-price")
 async def update_price(update: CategoryPriceUpdate, payload: dict = Depends(verify_token)):
     # Get categories from database
@@ -865,6 +997,7 @@ async def create_category(category: CategoryCreate, payload: dict = Depends(veri
         {"$set": {"categories": categories}},
         upsert=True
     )
+    await config_cache.invalidate("categories")
     
     # Set the price
     await update_category_price(category.nombre, category.precio)
@@ -905,9 +1038,8 @@ async def update_category(old_name: str, category: CategoryUpdate, payload: dict
         )
         
         # Update category name in groups
-        groups_doc = await db.category_groups.find_one({"_id": "groups"})
-        if groups_doc and groups_doc.get("groups"):
-            groups = groups_doc["groups"]
+        groups = await get_category_groups()
+        if groups:
             updated = False
             for group_name, group_cats in groups.items():
                 if old_name in group_cats:
@@ -920,6 +1052,8 @@ async def update_category(old_name: str, category: CategoryUpdate, payload: dict
                     {"$set": {"groups": groups}},
                     upsert=True
                 )
+        
+        await config_cache.invalidate("categories", "category_prices", "category_groups")
     else:
         # Just update price
         await update_category_price(category.nombre, category.precio)
@@ -953,9 +1087,8 @@ async def delete_category(nombre: str, payload: dict = Depends(verify_token)):
         )
     
     # Remove from groups
-    groups_doc = await db.category_groups.find_one({"_id": "groups"})
-    if groups_doc and groups_doc.get("groups"):
-        groups = groups_doc["groups"]
+    groups = await get_category_groups()
+    if groups:
         updated = False
         for group_name, group_cats in groups.items():
             if nombre in group_cats:
@@ -968,6 +1101,8 @@ async def delete_category(nombre: str, payload: dict = Depends(verify_token)):
                 upsert=True
             )
     
+    await config_cache.invalidate("categories", "category_prices", "category_groups")
+    
     return {"message": "Categoría eliminada exitosamente"}
 
 @api_router.put("/admin/category-groups")
@@ -979,6 +1114,7 @@ async def update_category_groups(data: dict, payload: dict = Depends(verify_toke
         {"$set": {"groups": groups}},
         upsert=True
     )
+    await config_cache.invalidate("category_groups")
     return {"message": "Grupos actualizados exitosamente", "grupos": groups}
 
 @api_router.put("/admin/categories-bulk")
@@ -1009,6 +1145,8 @@ async def bulk_update_categories(data: dict, payload: dict = Depends(verify_toke
         upsert=True
     )
     
+    await config_cache.invalidate("categories", "category_prices", "category_groups")
+    
     return {
         "message": "Categorías actualizadas exitosamente",
         "total_categorias": len(categorias),
@@ -1019,16 +1157,22 @@ async def bulk_update_categories(data: dict, payload: dict = Depends(verify_toke
 async def update_content(update: ContentUpdate, payload: dict = Depends(verify_token)):
     await db.site_content.update_one(
         {"key": update.key},
-        {"$set": {"value": update.value, "updated_at": datetime.now(timezone.utc).isoformat()}},
+        {"$set": {"value": update.value, "updated_at": datetime.now(timezone.utc)}},
         upsert=True
     )
+    await config_cache.invalidate("site_content")
     return {"message": "Contenido actualizado", "key": update.key}
 
-@api_router.get("/content")
-async def get_content():
+async def load_public_content():
     contents = await db.site_content.find({}, {"_id": 0}).to_list(100)
     return {"contents": {c["key"]: c["value"] for c in contents}}
 
+public_cache.register("content", load_public_content, depends_on=("site_content",))
+
+@api_router.get("/content")
+async def get_content(request: Request):
+    return await public_cache.respond("content", request)
+
 # ==================== CALENDAR ENDPOINTS ====================
 
 DEFAULT_CALENDAR = [
@@ -1069,9 +1213,7 @@ DEFAULT_DISCIPLINES = [
     {"id": "6", "nombre": "KARTS", "ubicacion": "Kartodromo"}
 ]
 
-@api_router.get("/calendar")
-async def get_calendar():
-    """Get calendar events and disciplines"""
+async def load_public_calendar():
     calendar_doc = await db.calendar.find_one({"_id": "calendar"}, {"_id": 0})
     if not calendar_doc:
         return {"eventos": DEFAULT_CALENDAR, "disciplinas": DEFAULT_DISCIPLINES}
@@ -1080,13 +1222,20 @@ async def get_calendar():
         "disciplinas": calendar_doc.get("disciplinas", DEFAULT_DISCIPLINES)
     }
 
+public_cache.register("calendar", load_public_calendar, depends_on=("calendar",))
+
+@api_router.get("/calendar")
+async def get_calendar(request: Request):
+    """Get calendar events and disciplines"""
+    return await public_cache.respond("calendar", request)
+
 @api_router.put("/admin/calendar")
 async def update_calendar(data: dict, payload: dict = Depends(verify_token)):
     """Update calendar events and disciplines"""
     update_data = {
         "eventos": data.get("eventos", []),
         "disciplinas": data.get("disciplinas", []),
-        "updated_at": datetime.now(timezone.utc).isoformat()
+        "updated_at": datetime.now(timezone.utc)
     }
     
     await db.calendar.update_one(
@@ -1094,6 +1243,7 @@ async def update_calendar(data: dict, payload: dict = Depends(verify_token)):
         {"$set": update_data},
         upsert=True
     )
+    await config_cache.invalidate("calendar")
     return {"message": "Calendario actualizado exitosamente"}
 
 @api_router.post("/admin/login")
@@ -1121,92 +1271,168 @@ async def admin_register(credentials: AdminCreate):
         "id": str(uuid.uuid4()),
         "email": credentials.email,
         "password_hash": password_hash,
-        "created_at": datetime.now(timezone.utc).isoformat()
+        "created_at": datetime.now(timezone.utc)
     }
     
     await db.admins.insert_one(admin_doc)
     return {"message": "Admin creado exitosamente"}
 
-@api_router.get("/settings")
-async def get_settings():
+async def load_public_settings():
     settings = await db.site_settings.find_one({"_id": "settings"}, {"_id": 0})
     if not settings:
         default_settings = SiteSettings().model_dump()
         return {"settings": default_settings}
     return {"settings": settings}
 
+public_cache.register("settings", load_public_settings, depends_on=("site_settings",))
+
+@api_router.get("/settings")
+async def get_settings(request: Request):
+    return await public_cache.respond("settings", request)
+
 @api_router.put("/admin/settings")
 async def update_settings(settings: SiteSettings, payload: dict = Depends(verify_token)):
     settings_dict = settings.model_dump()
-    settings_dict["updated_at"] = datetime.now(timezone.utc).isoformat()
+    settings_dict["updated_at"] = datetime.now(timezone.utc)
     
     await db.site_settings.update_one(
         {"_id": "settings"},
         {"$set": settings_dict},
         upsert=True
     )
+    await config_cache.invalidate("site_settings")
     return {"message": "Configuración actualizada", "settings": settings_dict}
 
 @api_router.post("/qr/scan")
 async def scan_qr(request: QRScanRequest):
+    """Answer a scan from the in-memory registration index; details come from GET /registrations/{id}"""
     is_valid, registration_id = verify_qr_code(request.qr_data, JWT_SECRET)
     
     if not is_valid:
         raise HTTPException(status_code=400, detail="Código QR inválido")
     
-    reg = await db.registrations.find_one({"id": registration_id}, {"_id": 0})
-    if not reg:
+    if registration_index.loaded:
+        flags = registration_index.lookup(registration_id)
+    else:
+        reg = await db.registrations.find_one({"id": registration_id}, INDEX_PROJECTION)
+        flags = None if reg is None else flags_of(reg)
+    if flags is None:
         raise HTTPException(status_code=404, detail="Inscripción no encontrada")
     
+    paid, checked_in = bool(flags & FLAG_PAID), bool(flags & FLAG_CHECKED_IN)
+    code = ALREADY_CHECKED_IN if checked_in else (UNPAID if not paid else None)
     return {
         "valid": True,
-        "registration": reg,
-        "can_check_in": not reg.get("check_in", False) and reg.get("estado_pago") == "completado"
+        "registration_id": registration_id,
+        "paid": paid,
+        "check_in": checked_in,
+        "can_check_in": code is None,
+        "code": code,
+        "message": CHECK_IN_RESULTS[code][1] if code else None
     }
 
 @api_router.post("/admin/check-in")
 async def check_in_registration(request: CheckInRequest, payload: dict = Depends(verify_token)):
-    reg = await db.registrations.find_one({"id": request.registration_id})
-    if not reg:
-        raise HTTPException(status_code=404, detail="Inscripción no encontrada")
-    
-    if reg.get("check_in"):
-        raise HTTPException(status_code=400, detail="Este piloto ya hizo check-in")
-    
-    if reg.get("estado_pago") != "completado":
-        raise HTTPException(status_code=400, detail="El pago no está completado")
-    
-    await db.registrations.update_one(
-        {"id": request.registration_id},
-        {
-            "$set": {
-                "check_in": True,
-                "check_in_time": datetime.now(timezone.utc).isoformat()
-            }
-        }
-    )
-    
-    return {"message": "Check-in exitoso", "registration_id": request.registration_id}
+    code, reg = await atomic_check_in(db, request.registration_id, datetime.now(timezone.utc))
+    if reg is not None:
+        registration_index.put(reg)
+    if code == CHECKED_IN:
+        await attendance_counters.bump(checked_in=1)
+        await event_bus.publish(EVENT_CHECKED_IN, registration_event(reg))
+    status_code, message = CHECK_IN_RESULTS[code]
+    
+    if code != CHECKED_IN:
+        return JSONResponse(status_code=status_code, content={"detail": message, "code": code})
+    
+    return {"message": message, "code": code, "registration_id": request.registration_id, "registration": reg}
+
+@api_router.get("/admin/gate/manifest")
+async def get_gate_manifest(since: Optional[int] = None, payload: dict = Depends(verify_token)):
+    """Signed manifest of paid registrations for offline gate devices; `since` returns only changes"""
+    return await build_manifest(db, JWT_SECRET, GATE_MANIFEST_KEY, since)
+
+@api_router.post("/admin/check-in/batch")
+@api_router.post("/admin/gate/check-ins")
+async def check_in_batch(batch: CheckInBatch, payload: dict = Depends(verify_token)):
+    """Apply scans buffered by gate devices in one bulk_write, keeping each scan time"""
+    try:
+        results = await batch_check_in(db, [record.model_dump() for record in batch.check_ins])
+    except ScanTimeOutOfRange as e:
+        raise HTTPException(status_code=400, detail=f"Fecha de escaneo fuera del rango permitido: {e}")
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Fecha de escaneo no válida")
+    checked_in = [result for result in results if result["code"] == CHECKED_IN]
+    for result in checked_in:
+        registration_index.put({"id": result["registration_id"], "estado_pago": "completado", "check_in": True})
+    applied = len(checked_in)
+    await attendance_counters.bump(checked_in=applied)
+    await event_bus.publish_many(EVENT_CHECKED_IN, [
+        {**result["pilot"], "id": result["registration_id"], "check_in": True, "check_in_time": result["scanned_at"]}
+        for result in checked_in
+    ])
+    
+    conflicts = [result for result in results if "conflict" in result]
+    return {
+        "applied": applied,
+        "conflicts": len(conflicts),
+        "results": results
+    }
 
 @api_router.get("/admin/attendance")
 async def get_attendance_stats(payload: dict = Depends(verify_token)):
-    total_registrations = await db.registrations.count_documents({})
-    completed_payments = await db.registrations.count_documents({"estado_pago": "completado"})
-    checked_in = await db.registrations.count_documents({"check_in": True})
-    
-    checked_in_list = await db.registrations.find(
-        {"check_in": True},
-        {"_id": 0, "nombre": 1, "apellido": 1, "numero_competicion": 1, "check_in_time": 1, "categorias": 1}
-    ).to_list(1000)
+    """Attendance totals from the counters document; the list is at /admin/attendance/checked-in"""
+    counters = await attendance_counters.read()
+    completed_payments = counters["completed_payments"]
+    checked_in = counters["checked_in"]
     
     return {
-        "total_registrations": total_registrations,
-        "completed_payments": completed_payments,
-        "checked_in": checked_in,
-        "attendance_rate": (checked_in / completed_payments * 100) if completed_payments > 0 else 0,
-        "checked_in_list": checked_in_list
+        **counters,
+        "attendance_rate": (checked_in / completed_payments * 100) if completed_payments > 0 else 0
     }
 
+@api_router.get("/admin/events")
+async def stream_live_events(request: Request, token: Optional[str] = None, last_event_id: Optional[int] = None):
+    """
+    Server-sent events for new registrations, payment status changes and
+    check-ins. EventSource cannot send headers, so the token may come as a
+    query parameter; reconnects resume from Last-Event-ID.
+    """
+    authorization = request.headers.get("authorization", "")
+    credentials = token or authorization.removeprefix("Bearer ").strip()
+    verify_token(HTTPAuthorizationCredentials(scheme="Bearer", credentials=credentials))
+    
+    header_id = request.headers.get("last-event-id")
+    if header_id:
+        try:
+            last_event_id = int(header_id)
+        except ValueError:
+            raise HTTPException(status_code=400, detail="Last-Event-ID no válido")
+    
+    if not event_bus.has_capacity():
+        raise HTTPException(status_code=503, detail="Demasiadas conexiones abiertas")
+    
+    return StreamingResponse(
+        event_bus.stream(last_event_id),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+@api_router.get("/admin/attendance/checked-in")
+async def get_checked_in_registrations(
+    cursor: Optional[str] = None,
+    limit: int = PAGE_SIZE_DEFAULT,
+    payload: dict = Depends(verify_token)
+):
+    """Checked-in pilots, most recent first, one keyset page at a time"""
+    return await fetch_registration_page(
+        db.registrations,
+        {"check_in": True},
+        {"_id": 0, "id": 1, "nombre": 1, "apellido": 1, "numero_competicion": 1, "check_in_time": 1, "categorias": 1},
+        cursor,
+        limit,
+        sort=CHECK_IN_SORT
+    )
+
 
 @api_router.post("/admin/resend-email/{registration_id}")
 async def resend_confirmation_email(registration_id: str, payload: dict = Depends(verify_token)):
@@ -1214,29 +1440,68 @@ async def resend_confirmation_email(registration_id: str, payload: dict = Depend
     if not reg:
         raise HTTPException(status_code=404, detail="Inscripción no encontrada")
     
-    email_html = generate_confirmation_email(reg, reg.get('qr_code'))
-    success = send_email(reg["correo"], "Confirmación de Inscripción - Super GP Corona XP 2026", email_html, EMAIL_ADMIN)
+    email_html = generate_confirmation_email(reg)
+    entry = await email_outbox.enqueue(reg["correo"], CONFIRMATION_SUBJECT, email_html, EMAIL_ADMIN,
+                                       registration_id=registration_id, template="confirmation", resend=True)
     
-    if success:
-        return {"message": "Email reenviado exitosamente", "to": reg["correo"]}
-    else:
-        raise HTTPException(status_code=500, detail="Error al enviar email")
+    return {"message": "Email en cola para reenvío", "to": reg["correo"], "email_id": entry["id"]}
+
+@api_router.get("/admin/email-outbox")
+async def get_email_outbox_status(registration_id: Optional[str] = None, payload: dict = Depends(verify_token)):
+    """Outbox counts by status and recent failures, or the emails of one registration"""
+    if registration_id:
+        emails = await db.email_outbox.find(
+            {"registration_id": registration_id}, {"_id": 0, "html": 0}
+        ).to_list(100)
+        return {"emails": emails}
+    return await email_outbox.summary()
+
+QR_CACHE_HEADERS = {"Cache-Control": "public, max-age=31536000, immutable"}
 
 @api_router.get("/registration/{registration_id}/qr")
-async def get_registration_qr(registration_id: str):
-    reg = await db.registrations.find_one({"id": registration_id}, {"_id": 0})
+async def get_registration_qr(registration_id: str, request: Request):
+    """Serve the registration's QR as PNG; the bytes never change for a given id"""
+    etag = qr_store.etag_for(registration_id)
+    headers = {**QR_CACHE_HEADERS, "ETag": etag}
+    
+    # Checked even when this worker has the PNG in memory: a deletion handled
+    # by another worker only cleared that worker's cache and the disk copy
+    reg = await db.registrations.find_one({"id": registration_id}, {"_id": 1})
     if not reg:
         raise HTTPException(status_code=404, detail="Inscripción no encontrada")
     
-    if not reg.get("qr_code"):
-        qr_code = generate_qr_code(registration_id, JWT_SECRET)
-        await db.registrations.update_one(
-            {"id": registration_id},
-            {"$set": {"qr_code": qr_code}}
-        )
-        return {"qr_code": qr_code}
+    if request.headers.get("if-none-match") == etag:
+        return Response(status_code=304, headers=headers)
     
-    return {"qr_code": reg["qr_code"]}
+    png = await qr_store.get_png(registration_id)
+    return Response(content=png, media_type="image/png", headers=headers)
+
+@api_router.get("/admin/indexes")
+async def get_index_report(payload: dict = Depends(verify_token)):
+    """Index usage ($indexStats), missing declared indexes and collection scans per collection"""
+    return await index_manager.report()
+
+@api_router.get("/admin/qr/metrics")
+async def get_qr_metrics(payload: dict = Depends(verify_token)):
+    """QR render pool queue depth and render times, to size QR_POOL_WORKERS"""
+    return {"metrics": qr_engine.metrics()}
+
+@api_router.get("/admin/metrics")
+async def get_metrics(payload: dict = Depends(verify_token)):
+    """In-memory caches, live event bus and render pools of this worker"""
+    return {
+        "qr": qr_engine.metrics(),
+        "registration_index": registration_index.stats(),
+        "live_events": event_bus.stats(),
+        "coupon_index": coupon_index.stats(),
+        "public_cache": public_cache.stats(),
+        "image_variants": {**image_store.stats(), "metrics": image_engine.metrics()}
+    }
+
+@api_router.get("/admin/rate-limits")
+async def get_rate_limit_metrics(payload: dict = Depends(verify_token)):
+    """Allowed and rejected requests per rate-limited route in this worker"""
+    return rate_limiter.stats()
 
 
 # ==================== SUPER ADMIN ENDPOINTS ====================
@@ -1271,7 +1536,7 @@ async def super_admin_register(credentials: SuperAdminCreate):
         "id": str(uuid.uuid4()),
         "email": credentials.email,
         "password_hash": password_hash,
-        "created_at": datetime.now(timezone.utc).isoformat()
+        "created_at": datetime.now(timezone.utc)
     }
     
     await db.super_admins.insert_one(admin_doc)
@@ -1291,13 +1556,14 @@ async def get_platform_config_endpoint(payload: dict = Depends(verify_super_admi
 async def update_platform_config(update: PlatformConfigUpdate, payload: dict = Depends(verify_super_admin_token)):
     """Update platform configuration (Super Admin only)"""
     update_dict = {k: v for k, v in update.model_dump().items() if v is not None}
-    update_dict["updated_at"] = datetime.now(timezone.utc).isoformat()
+    update_dict["updated_at"] = datetime.now(timezone.utc)
     
     await db.platform_config.update_one(
         {"_id": "config"},
         {"$set": update_dict},
         upsert=True
     )
+    await config_cache.invalidate("platform_config")
     return {"message": "Configuración de plataforma actualizada"}
 
 @api_router.get("/superadmin/event-mercadopago")
@@ -1315,84 +1581,89 @@ async def update_event_mp_config(update: EventMercadoPagoUpdate, payload: dict =
     """Update event's MercadoPago configuration (Super Admin only)"""
     update_dict = {k: v for k, v in update.model_dump().items() if v is not None}
     update_dict["event_id"] = "default"
-    update_dict["updated_at"] = datetime.now(timezone.utc).isoformat()
+    update_dict["updated_at"] = datetime.now(timezone.utc)
     
     await db.event_mercadopago.update_one(
         {"event_id": "default"},
         {"$set": update_dict},
         upsert=True
     )
+    await config_cache.invalidate("event_mercadopago")
     return {"message": "Configuración de MercadoPago del evento actualizada"}
 
 @api_router.get("/superadmin/commission-stats")
-async def get_commission_stats(payload: dict = Depends(verify_super_admin_token)):
-    """Get commission statistics (Super Admin only)"""
-    pipeline = [
-        {"$match": {"estado_pago": "completado"}},
-        {"$group": {
-            "_id": None,
-            "total_registrations": {"$sum": 1},
-            "total_revenue": {"$sum": "$precio_final"},
-            "total_commission": {"$sum": "$comision_plataforma"},
-            "total_net_to_events": {"$sum": "$neto_evento"}
-        }}
-    ]
-    
-    result = await db.registrations.aggregate(pipeline).to_list(1)
-    
-    if result:
-        stats = result[0]
-        del stats["_id"]
-    else:
-        stats = {
-            "total_registrations": 0,
-            "total_revenue": 0,
-            "total_commission": 0,
-            "total_net_to_events": 0
-        }
+async def get_commission_stats(
+    date_from: Optional[str] = None,
+    date_to: Optional[str] = None,
+    event_id: Optional[str] = None,
+    payload: dict = Depends(verify_super_admin_token)
+):
+    """Get commission statistics from the daily rollups, optionally for a date range (Super Admin only)"""
+    for value in (date_from, date_to):
+        if value:
+            try:
+                datetime.strptime(value, "%Y-%m-%d")
+            except ValueError:
+                raise HTTPException(status_code=400, detail="Fecha no válida. Use el formato AAAA-MM-DD")
+    
+    rollups = await read_commission_totals(db, date_from, date_to, event_id)
+    stats = rollups["totals"]
     
     config = await get_platform_config()
     stats["commission_type"] = config.get("commission_type", "percentage")
     stats["commission_value"] = config.get("commission_value", 5.0)
     
-    return {"stats": stats}
+    return {"stats": stats, "by_day": rollups["by_day"]}
 
 @api_router.get("/superadmin/registrations")
-async def get_all_registrations_super(payload: dict = Depends(verify_super_admin_token)):
-    """Get all registrations with commission details (Super Admin only)"""
-    registrations = await db.registrations.find(
-        {},
-        {"_id": 0}
-    ).sort("created_at", -1).to_list(1000)
-    
-    return {"registrations": registrations, "total": len(registrations)}
+async def get_all_registrations_super(
+    cursor: Optional[str] = None,
+    limit: int = PAGE_SIZE_DEFAULT,
+    estado_pago: Optional[str] = None,
+    check_in: Optional[bool] = None,
+    liga: Optional[str] = None,
+    categoria: Optional[str] = None,
+    date_from: Optional[datetime] = None,
+    date_to: Optional[datetime] = None,
+    fields: Optional[str] = None,
+    payload: dict = Depends(verify_super_admin_token)
+):
+    """Get registrations with commission details, paginated like GET /registrations (Super Admin only)"""
+    return await fetch_registration_page(
+        db.registrations,
+        build_registration_filter(estado_pago, check_in, liga, categoria, date_from, date_to),
+        build_projection(parse_fields(fields)),
+        cursor,
+        limit
+    )
 
 
 # ==================== IMAGE UPLOAD ENDPOINTS ====================
 
+async def receive_upload(request: Request) -> StoredUpload:
+    try:
+        return await upload_pipeline.receive(request)
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error al guardar imagen: {str(e)}")
+
 @api_router.post("/admin/upload-image")
-async def upload_image(
-    file: UploadFile = File(...),
-    image_type: str = Form("general"),
-    payload: dict = Depends(verify_token)
-):
-    """Upload an image (logo, hero, gallery)"""
-    # Validate file type
-    allowed_types = ["image/jpeg", "image/png", "image/gif", "image/webp"]
-    if file.content_type not in allowed_types:
-        raise HTTPException(status_code=400, detail="Tipo de archivo no permitido. Use JPG, PNG, GIF o WebP")
-    
-    # Generate unique filename
-    ext = file.filename.split(".")[-1] if "." in file.filename else "jpg"
-    filename = f"{image_type}_{uuid.uuid4()}.{ext}"
-    filepath = UPLOADS_DIR / filename
-    
-    # Save file
+async def upload_image(request: Request, payload: dict = Depends(verify_token)):
+    """Upload an image (logo, hero, gallery): multipart `file` plus optional `image_type`"""
+    upload = await receive_upload(request)
     try:
-        with open(filepath, "wb") as buffer:
-            shutil.copyfileobj(file.file, buffer)
+        image_type = safe_name_prefix(upload.fields.get("image_type"), "general")
+        # The extension comes from the sniffed format, never from the client's filename
+        filename = f"{image_type}_{uuid.uuid4()}.{upload.format}"
+        await upload.save_as(UPLOADS_DIR / filename)
+    except HTTPException:
+        await upload.discard()
+        raise
     except Exception as e:
+        await upload.discard()
         raise HTTPException(status_code=500, detail=f"Error al guardar imagen: {str(e)}")
+    image_store.pregenerate(filename)
     
     # Return URL
     image_url = f"/uploads/{filename}"
@@ -1408,6 +1679,7 @@ async def delete_image(filename: str, payload: dict = Depends(verify_token)):
     
     try:
         filepath.unlink()
+        await image_store.discard(filename)
         return {"message": "Imagen eliminada", "filename": filename}
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error al eliminar imagen: {str(e)}")
@@ -1415,36 +1687,45 @@ async def delete_image(filename: str, payload: dict = Depends(verify_token)):
 
 # ==================== GALLERY MANAGEMENT ENDPOINTS ====================
 
-@api_router.get("/gallery")
-async def get_gallery():
-    """Get all gallery images"""
-    settings = await db.site_settings.find_one({"_id": "settings"}, {"_id": 0})
+async def load_public_gallery():
+    settings = await db.site_settings.find_one({"_id": "settings"}, {"gallery_images": 1})
     gallery = settings.get("gallery_images", []) if settings else []
     return {"images": gallery}
 
+# Gallery images live in the settings document
+public_cache.register("gallery", load_public_gallery, depends_on=("site_settings",))
+
+@api_router.get("/gallery")
+async def get_gallery(request: Request):
+    """Get all gallery images"""
+    return await public_cache.respond("gallery", request)
+
+# First paint of the public site in one round trip; each part has the shape of its own endpoint.
+# Prices must be current, so it revalidates on every use like /categories and /news.
+public_cache.register_bundle(
+    "bootstrap", ["settings", "categories", "calendar", "content", "news", "gallery"],
+    cache_control=CACHE_CONTROL_REVALIDATE
+)
+
+@api_router.get("/bootstrap")
+async def get_bootstrap(request: Request):
+    """Settings, categories, calendar, content, news and gallery for the landing page"""
+    return await public_cache.respond("bootstrap", request)
+
 @api_router.post("/admin/gallery")
-async def add_gallery_image(
-    file: UploadFile = File(...),
-    title: str = Form(None),
-    payload: dict = Depends(verify_token)
-):
-    """Add an image to the gallery"""
-    # Validate file type
-    allowed_types = ["image/jpeg", "image/png", "image/gif", "image/webp"]
-    if file.content_type not in allowed_types:
-        raise HTTPException(status_code=400, detail="Tipo de archivo no permitido")
-    
-    # Generate unique filename
-    ext = file.filename.split(".")[-1] if "." in file.filename else "jpg"
-    filename = f"gallery_{uuid.uuid4()}.{ext}"
-    filepath = UPLOADS_DIR / filename
+async def add_gallery_image(request: Request, payload: dict = Depends(verify_token)):
+    """Add an image to the gallery: multipart `file` plus optional `title`"""
+    upload = await receive_upload(request)
+    title = upload.fields.get("title")
+    filename = f"gallery_{uuid.uuid4()}.{upload.format}"
     
-    # Save file
     try:
-        with open(filepath, "wb") as buffer:
-            shutil.copyfileobj(file.file, buffer)
+        await upload.save_as(UPLOADS_DIR / filename)
     except Exception as e:
+        await upload.discard()
         raise HTTPException(status_code=500, detail=f"Error al guardar imagen: {str(e)}")
+    # Thumbnails are ready by the time the public gallery asks for them
+    image_store.pregenerate(filename)
     
     # Create gallery image object
     image_url = f"/uploads/{filename}"
@@ -1459,7 +1740,7 @@ async def add_gallery_image(
         "url": image_url,
         "title": title,
         "order": order,
-        "created_at": datetime.now(timezone.utc).isoformat()
+        "created_at": datetime.now(timezone.utc)
     }
     
     # Add to gallery
@@ -1468,6 +1749,7 @@ async def add_gallery_image(
         {"$push": {"gallery_images": new_image}},
         upsert=True
     )
+    await config_cache.invalidate("site_settings")
     
     return {"message": "Imagen agregada a la galería", "image": new_image}
 
@@ -1495,15 +1777,38 @@ async def delete_gallery_image(image_id: str, payload: dict = Depends(verify_tok
         filepath = UPLOADS_DIR / filename
         if filepath.exists():
             filepath.unlink()
+        await image_store.discard(filename)
     
     # Remove from gallery
     await db.site_settings.update_one(
         {"_id": "settings"},
         {"$pull": {"gallery_images": {"id": image_id}}}
     )
+    await config_cache.invalidate("site_settings")
     
     return {"message": "Imagen eliminada de la galería"}
 
+@api_router.get("/images/{name}")
+async def get_image_variant(name: str, request: Request, size: Optional[str] = None):
+    """
+    An upload resized and re-encoded as WebP: /images/<file>@thumb.webp,
+    or /images/<file>?size=thumb (thumb, medium or full)
+    """
+    filename, variant = parse_variant_name(name, size)
+    source, signature = await image_store.lookup(filename, variant)
+    etag = f'"{signature}"'
+    headers = {**IMAGE_VARIANT_HEADERS, "ETag": etag}
+    
+    if request.headers.get("if-none-match") == etag:
+        return Response(status_code=304, headers=headers)
+    
+    try:
+        path = await image_store.get_path(source, variant, signature)
+    except Exception as e:
+        logging.error(f"Error rendering {variant} variant of {filename}: {e}")
+        raise HTTPException(status_code=422, detail="No se pudo procesar la imagen")
+    return FileResponse(path, media_type="image/webp", headers=headers)
+
 @api_router.put("/admin/gallery/reorder")
 async def reorder_gallery(order: List[str], payload: dict = Depends(verify_token)):
     """Reorder gallery images"""
@@ -1534,12 +1839,27 @@ async def reorder_gallery(order: List[str], payload: dict = Depends(verify_token
         {"_id": "settings"},
         {"$set": {"gallery_images": new_gallery}}
     )
+    await config_cache.invalidate("site_settings")
     
     return {"message": "Galería reordenada", "gallery": new_gallery}
 
 
 app.include_router(api_router)
 
+@app.middleware("http")
+async def enforce_rate_limits(request: Request, call_next):
+    """Shed excess traffic on rate-limited routes before the body is read or Mongo is touched"""
+    route = rate_limiter.rule_for(request.method, request.url.path)
+    if route:
+        retry_after = await rate_limiter.check(route, client_ip(request))
+        if retry_after:
+            return JSONResponse(
+                status_code=429,
+                content={"detail": "Demasiadas solicitudes. Intente de nuevo en unos segundos"},
+                headers={"Retry-After": str(retry_after)}
+            )
+    return await call_next(request)
+
 app.add_middleware(
     CORSMiddleware,
     allow_credentials=True,
@@ -1547,6 +1867,8 @@ app.add_middleware(
     allow_methods=["*"],
     allow_headers=["*"],
 )
+# Outermost, so it sees the final body and headers; see compression.py for what is skipped
+app.add_middleware(CompressionMiddleware)
 
 logging.basicConfig(
     level=logging.INFO,
@@ -1554,6 +1876,54 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+@app.on_event("startup")
+async def start_qr_engine():
+    qr_engine.start()
+
+@app.on_event("startup")
+async def start_image_engine():
+    image_engine.start()
+
+@app.on_event("startup")
+async def warm_config_cache():
+    await config_cache.warm()
+
+@app.on_event("startup")
+async def warm_public_cache():
+    await public_cache.warm()
+
+@app.on_event("startup")
+async def start_email_outbox():
+    await email_outbox.start()
+
+@app.on_event("startup")
+async def start_registration_index():
+    await registration_index.start()
+
+@app.on_event("startup")
+async def start_attendance_counters():
+    await attendance_counters.start()
+
+@app.on_event("startup")
+async def start_event_bus():
+    await event_bus.start()
+
+@app.on_event("startup")
+async def start_coupon_reservations():
+    await coupon_reservations.start()
+
+@app.on_event("startup")
+async def bootstrap_indexes():
+    # Runs in the background so a large index build never delays startup
+    app.state.index_bootstrap = asyncio.create_task(index_manager.ensure())
+
 @app.on_event("shutdown")
 async def shutdown_db_client():
+    await email_outbox.stop()
+    await registration_index.stop()
+    await attendance_counters.stop()
+    await event_bus.stop()
+    await coupon_reservations.stop()
+    qr_engine.shutdown()
+    image_engine.shutdown()
     client.close()
@@ -0,0 +1,238 @@
+import asyncio
+import os
+import re
+import shutil
+import uuid
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Optional, Dict, List, Tuple
+
+from fastapi import HTTPException, Request
+from python_multipart.multipart import MultipartParser, parse_options_header
+from starlette.concurrency import run_in_threadpool
+
+# Per uploaded file; race photos straight from the camera run to ~20 MB
+UPLOAD_MAX_BYTES = int(os.getenv('UPLOAD_MAX_BYTES', str(25 * 1024 * 1024)))
+# Block writes running in the threadpool at once in this worker; the rest wait their turn
+UPLOAD_MAX_CONCURRENT = int(os.getenv('UPLOAD_MAX_CONCURRENT', '4'))
+# Received bytes are written in blocks this size, each in the threadpool
+UPLOAD_WRITE_BLOCK = 1024 * 1024
+# Text fields (image_type, title) are short; anything bigger is not a form we sent
+UPLOAD_FIELD_MAX_BYTES = 4096
+# Multipart boundaries and part headers on top of the file itself
+MULTIPART_OVERHEAD_BYTES = 64 * 1024
+
+# Leading bytes of each accepted format -> stored extension
+IMAGE_SIGNATURES: List[Tuple[bytes, str]] = [
+    (b"\xff\xd8\xff", "jpg"),
+    (b"\x89PNG\r\n\x1a\n", "png"),
+    (b"GIF87a", "gif"),
+    (b"GIF89a", "gif"),
+]
+SNIFF_BYTES = 12
+
+_NAME_PREFIX = re.compile(r"^[a-z0-9_-]{1,32}$")
+
+def sniff_image_format(head: bytes) -> Optional[str]:
+    """Extension of the image format `head` starts with, judged by magic bytes alone"""
+    for signature, ext in IMAGE_SIGNATURES:
+        if head.startswith(signature):
+            return ext
+    if head[:4] == b"RIFF" and head[8:12] == b"WEBP":
+        return "webp"
+    return None
+
+def safe_name_prefix(value: Optional[str], default: str) -> str:
+    value = (value or default).strip().lower()
+    if not _NAME_PREFIX.match(value):
+        raise HTTPException(status_code=400, detail="Tipo de imagen no válido")
+    return value
+
+@dataclass
+class StoredUpload:
+    path: Path
+    format: str
+    size: int
+    filename: Optional[str]
+    fields: Dict[str, str] = field(default_factory=dict)
+
+    async def save_as(self, destination: Path) -> Path:
+        # A rename when staging and destination share a filesystem, a copy otherwise
+        await run_in_threadpool(shutil.move, self.path, destination)
+        self.path = destination
+        return destination
+
+    async def discard(self):
+        await run_in_threadpool(_unlink, self.path)
+
+def _unlink(path: Path):
+    try:
+        path.unlink()
+    except FileNotFoundError:
+        pass
+
+class _FormState:
+    """What the synchronous multipart callbacks hand over to the async loop"""
+
+    def __init__(self):
+        self.header_name = b""
+        self.header_value = b""
+        self.disposition = b""
+        self.field_name: Optional[str] = None
+        self.filename: Optional[str] = None
+        self.is_file = False
+        self.value = bytearray()
+        self.file_parts = 0
+        self.file_data: List[bytes] = []
+        self.fields: Dict[str, str] = {}
+        self.error: Optional[HTTPException] = None
+
+class ImageUploadPipeline:
+    """
+    Receives one image from a multipart request straight off the socket.
+
+    The body is parsed as it arrives; file bytes are buffered into
+    UPLOAD_WRITE_BLOCK blocks and written in the threadpool, so the event
+    loop never waits on the disk. The format is sniffed from the first
+    bytes before anything is written, and the byte limit is enforced as
+    data arrives: an oversized upload is cut off without being read to
+    the end. Files are staged in `staging_dir` under a random name, outside
+    the public /uploads mount, and moved into place with
+    `StoredUpload.save_as` once validated. Only the block writes share
+    the `max_concurrent` slots, so slow clients never hold one while
+    their bytes trickle in.
+    """
+
+    def __init__(self, staging_dir: Path, max_bytes: int = UPLOAD_MAX_BYTES,
+                 max_concurrent: int = UPLOAD_MAX_CONCURRENT):
+        self.incoming = Path(staging_dir)
+        self.incoming.mkdir(parents=True, exist_ok=True)
+        self.max_bytes = max_bytes
+        self._slots = asyncio.Semaphore(max_concurrent)
+
+    def _too_large(self) -> HTTPException:
+        return HTTPException(
+            status_code=413,
+            detail=f"La imagen supera el tamaño máximo de {round(self.max_bytes / (1024 * 1024), 1):g} MB"
+        )
+
+    async def receive(self, request: Request, file_field: str = "file") -> StoredUpload:
+        content_type, params = parse_options_header(request.headers.get("content-type", ""))
+        if content_type != b"multipart/form-data" or b"boundary" not in params:
+            raise HTTPException(status_code=400, detail="Se esperaba un formulario multipart con la imagen")
+        declared = request.headers.get("content-length")
+        if declared and declared.isdigit() and int(declared) > self.max_bytes + MULTIPART_OVERHEAD_BYTES:
+            # Rejected before a single body byte is read
+            raise self._too_large()
+
+        return await self._receive(request, params[b"boundary"], file_field)
+
+    async def _write(self, handle, data: bytes):
+        async with self._slots:
+            await run_in_threadpool(handle.write, data)
+
+    async def _receive(self, request: Request, boundary: bytes, file_field: str) -> StoredUpload:
+        state = _FormState()
+        parser = MultipartParser(boundary, _callbacks(state, file_field))
+        path = self.incoming / f"{uuid.uuid4().hex}.part"
+        handle = None
+        pending = bytearray()
+        size = 0
+        image_format: Optional[str] = None
+
+        try:
+            async for chunk in request.stream():
+                parser.write(chunk)
+                if state.error:
+                    raise state.error
+                for data in state.file_data:
+                    size += len(data)
+                    if size > self.max_bytes:
+                        raise self._too_large()
+                    pending += data
+                state.file_data.clear()
+
+                if image_format is None and len(pending) >= SNIFF_BYTES:
+                    image_format = self._sniff(pending)
+                if len(pending) >= UPLOAD_WRITE_BLOCK:
+                    if handle is None:
+                        handle = await run_in_threadpool(open, path, "wb")
+                    await self._write(handle, bytes(pending))
+                    pending.clear()
+
+            parser.finalize()
+            if state.error:
+                raise state.error
+            if not state.file_parts or size == 0:
+                raise HTTPException(status_code=400, detail="No se recibió ninguna imagen")
+            if image_format is None:
+                image_format = self._sniff(pending)
+
+            if handle is None:
+                handle = await run_in_threadpool(open, path, "wb")
+            if pending:
+                await self._write(handle, bytes(pending))
+            await run_in_threadpool(handle.close)
+            handle = None
+        except BaseException:
+            # Inline rather than in the threadpool: on a client disconnect this
+            # runs in a cancelled task, where another await could be cut short
+            if handle is not None:
+                handle.close()
+            _unlink(path)
+            raise
+
+        return StoredUpload(path=path, format=image_format, size=size, filename=state.filename, fields=state.fields)
+
+    @staticmethod
+    def _sniff(head: bytes) -> str:
+        image_format = sniff_image_format(bytes(head[:SNIFF_BYTES]))
+        if image_format is None:
+            raise HTTPException(status_code=400, detail="Tipo de archivo no permitido. Use JPG, PNG, GIF o WebP")
+        return image_format
+
+def _callbacks(state: _FormState, file_field: str) -> Dict[str, object]:
+    def on_header_field(data: bytes, start: int, end: int):
+        state.header_name += data[start:end]
+
+    def on_header_value(data: bytes, start: int, end: int):
+        state.header_value += data[start:end]
+
+    def on_header_end():
+        if state.header_name.lower() == b"content-disposition":
+            state.disposition = state.header_value
+        state.header_name = b""
+        state.header_value = b""
+
+    def on_headers_finished():
+        _, options = parse_options_header(state.disposition)
+        state.field_name = options.get(b"name", b"").decode("utf-8", "replace")
+        state.is_file = b"filename" in options
+        state.value = bytearray()
+        if state.is_file:
+            if state.field_name != file_field or state.file_parts:
+                state.error = HTTPException(status_code=400, detail="Solo se permite una imagen por solicitud")
+            state.file_parts += 1
+            state.filename = options[b"filename"].decode("utf-8", "replace")
+
+    def on_part_data(data: bytes, start: int, end: int):
+        if state.is_file:
+            state.file_data.append(data[start:end])
+        else:
+            state.value += data[start:end]
+            if len(state.value) > UPLOAD_FIELD_MAX_BYTES:
+                state.error = HTTPException(status_code=400, detail="Campo de formulario demasiado largo")
+
+    def on_part_end():
+        if not state.is_file and state.field_name:
+            state.fields[state.field_name] = state.value.decode("utf-8", "replace")
+        state.disposition = b""
+
+    return {
+        "on_header_field": on_header_field,
+        "on_header_value": on_header_value,
+        "on_header_end": on_header_end,
+        "on_headers_finished": on_headers_finished,
+        "on_part_data": on_part_data,
+        "on_part_end": on_part_end,
+    }
@@ -0,0 +1,47 @@
+#!/usr/bin/env python3
+"""
+Reconstruye los acumulados diarios de comisiones (colección commission_rollups)
+a partir de las inscripciones pagadas. GET /api/superadmin/commission-stats lee
+estos acumulados en lugar de agregar todas las inscripciones en cada consulta.
+Es seguro ejecutarlo varias veces; los acumulados sin inscripciones se eliminan.
+
+Uso:
+  python3 backfill_commission_rollups.py
+"""
+
+import asyncio
+import sys
+from motor.motor_asyncio import AsyncIOMotorClient
+import os
+from dotenv import load_dotenv
+from pathlib import Path
+
+# Cargar variables de entorno
+ROOT_DIR = Path(__file__).parent
+load_dotenv(ROOT_DIR / 'backend/.env')
+sys.path.insert(0, str(ROOT_DIR / 'backend'))
+
+from commission_rollups import rebuild_commission_rollups
+
+MONGO_URL = os.environ.get('MONGO_URL')
+DB_NAME = os.environ.get('DB_NAME')
+
+async def backfill():
+    print(f"Conectando a MongoDB: {MONGO_URL[:30]}...")
+    client = AsyncIOMotorClient(MONGO_URL)
+    db = client[DB_NAME]
+    
+    paid = await db.registrations.count_documents({"estado_pago": "completado"})
+    print(f"\nInscripciones pagadas: {paid}")
+    
+    rollups = await rebuild_commission_rollups(db)
+    print(f"   ✓ {len(rollups)} acumulados diarios reconstruidos")
+    for rollup in sorted(rollups, key=lambda r: (r["event_id"], r["day"])):
+        print(f"     {rollup['event_id']} {rollup['day']}: {rollup['total_registrations']} inscripciones, "
+              f"comisión {rollup['total_commission']:.2f}")
+    
+    client.close()
+    print("\n¡Reconstrucción completada!")
+
+if __name__ == "__main__":
+    asyncio.run(backfill())
@@ -1,5 +1,6 @@
 import React, { createContext, useContext, useState, useEffect } from 'react';
 import axios from 'axios';
+import { fetchPublic } from '../lib/bootstrap';
 
 const BACKEND_URL = process.env.REACT_APP_BACKEND_URL;
 const API = `${BACKEND_URL}/api`;
@@ -38,14 +39,15 @@ export const SettingsProvider = ({ children }) => {
   const [loading, setLoading] = useState(true);
 
   useEffect(() => {
-    fetchSettings();
+    // First load comes from the bootstrap the public pages share
+    fetchSettings(() => fetchPublic('settings'));
   }, []);
 
-  const fetchSettings = async () => {
+  const fetchSettings = async (load = async () => (await axios.get(`${API}/settings`)).data) => {
     try {
-      const response = await axios.get(`${API}/settings`);
-      if (response.data.settings) {
-        setSettings((prev) => ({ ...prev, ...response.data.settings }));
+      const data = await load();
+      if (data.settings) {
+        setSettings((prev) => ({ ...prev, ...data.settings }));
       }
     } catch (error) {
       console.error('Error fetching settings:', error);
@@ -0,0 +1,39 @@
+import axios from 'axios';
+
+const BACKEND_URL = process.env.REACT_APP_BACKEND_URL;
+const API = `${BACKEND_URL}/api`;
+
+// Same as the server's Cache-Control max-age: after that the browser revalidates
+// the bootstrap with If-None-Match, so an unchanged payload costs a 304
+const BOOTSTRAP_TTL_MS = 60 * 1000;
+
+let bootstrapRequest = null;
+let bootstrapRequestedAt = 0;
+
+// Everything the public pages need on first paint, in one request shared by all of them
+// until it is BOOTSTRAP_TTL_MS old, so admin edits reach tabs that stay open
+export const loadBootstrap = () => {
+  if (!bootstrapRequest || Date.now() - bootstrapRequestedAt > BOOTSTRAP_TTL_MS) {
+    bootstrapRequestedAt = Date.now();
+    bootstrapRequest = axios.get(`${API}/bootstrap`)
+      .then((response) => response.data)
+      .catch((error) => {
+        bootstrapRequest = null;
+        throw error;
+      });
+  }
+  return bootstrapRequest;
+};
+
+// Data of a public endpoint (settings, categories, calendar, content, news, gallery),
+// taken from the bootstrap when it has it, otherwise from the endpoint itself
+export const fetchPublic = async (part) => {
+  try {
+    const data = await loadBootstrap();
+    if (data[part]) return data[part];
+  } catch (error) {
+    console.error('Error fetching bootstrap:', error);
+  }
+  const response = await axios.get(`${API}/${part}`);
+  return response.data;
+};
@@ -0,0 +1,22 @@
+const BACKEND_URL = process.env.REACT_APP_BACKEND_URL;
+
+// Longest side of each variant served by /api/images (IMAGE_VARIANTS in the backend)
+export const IMAGE_SIZES = { thumb: 480, medium: 1024, full: 1920 };
+
+// Uploads are served resized as WebP; external URLs (Unsplash defaults) are used as they are
+export const imageUrl = (url, size = 'medium') => {
+  if (!url) return '';
+  if (url.startsWith('/uploads/')) {
+    return `${BACKEND_URL}/api/images/${url.slice('/uploads/'.length)}@${size}.webp`;
+  }
+  if (url.startsWith('/')) return `${BACKEND_URL}${url}`;
+  return url;
+};
+
+// srcSet with every variant, so the browser picks the smallest that fills the slot
+export const imageSrcSet = (url) => {
+  if (!url || !url.startsWith('/uploads/')) return undefined;
+  return Object.entries(IMAGE_SIZES)
+    .map(([size, width]) => `${imageUrl(url, size)} ${width}w`)
+    .join(', ');
+};
@@ -0,0 +1,29 @@
+// Subscribes to the admin SSE stream. EventSource reconnects by itself and resends
+// Last-Event-ID. After a `reset` (client too slow) the stream is reopened: from the
+// last id, or, when `handlers.reset` is given, from now, and `reset` reloads the state.
+export const subscribeLiveEvents = (apiUrl, token, handlers) => {
+  const { reset, ...eventHandlers } = handlers;
+  let source = null;
+  let lastEventId = null;
+
+  const open = () => {
+    const params = new URLSearchParams({ token });
+    if (lastEventId) params.set('last_event_id', lastEventId);
+    source = new EventSource(`${apiUrl}/admin/events?${params}`);
+    Object.entries(eventHandlers).forEach(([type, handler]) => {
+      source.addEventListener(type, (event) => {
+        lastEventId = event.lastEventId;
+        handler(JSON.parse(event.data));
+      });
+    });
+    source.addEventListener('reset', () => {
+      source.close();
+      if (reset) lastEventId = null;
+      open();
+      if (reset) reset();
+    });
+  };
+
+  open();
+  return { close: () => source.close() };
+};
@@ -0,0 +1,22 @@
+import axios from 'axios';
+
+// One keyset page of a registration listing; pass the returned nextCursor to load the next one
+export const fetchPage = async (url, config = {}, cursor = null, pageSize = 100) => {
+  const params = { ...(config.params || {}), limit: pageSize };
+  if (cursor) params.cursor = cursor;
+  const response = await axios.get(url, { ...config, params });
+  return {
+    rows: response.data.registrations || [],
+    nextCursor: response.data.next_cursor || null,
+  };
+};
+
+// Server-side export of every matching registration, saved as a file download
+export const downloadExport = async (url, config = {}, filename) => {
+  const response = await axios.get(url, { ...config, responseType: 'blob' });
+  const link = document.createElement('a');
+  link.href = URL.createObjectURL(response.data);
+  link.download = filename;
+  link.click();
+  URL.revokeObjectURL(link.href);
+};
@@ -1,11 +1,8 @@
 import React, { useState, useEffect } from 'react';
-import axios from 'axios';
+import { fetchPublic } from '../lib/bootstrap';
 import { Calendar, Clock, MapPin, Flag } from 'lucide-react';
 import { useSettings } from '../context/SettingsContext';
 
-const BACKEND_URL = process.env.REACT_APP_BACKEND_URL;
-const API = `${BACKEND_URL}/api`;
-
 // Datos por defecto
 const defaultEventos = [
   {
@@ -54,12 +51,12 @@ export const Calendario = () => {
 
   const fetchCalendar = async () => {
     try {
-      const response = await axios.get(`${API}/calendar`);
-      if (response.data.eventos && response.data.eventos.length > 0) {
-        setEventos(response.data.eventos);
+      const data = await fetchPublic('calendar');
+      if (data.eventos && data.eventos.length > 0) {
+        setEventos(data.eventos);
       }
-      if (response.data.disciplinas && response.data.disciplinas.length > 0) {
-        setDisciplinas(response.data.disciplinas);
+      if (data.disciplinas && data.disciplinas.length > 0) {
+        setDisciplinas(data.disciplinas);
       }
     } catch (error) {
       console.error('Error fetching calendar:', error);
@@ -1,10 +1,7 @@
 import React, { useEffect, useState } from 'react';
-import axios from 'axios';
+import { fetchPublic } from '../lib/bootstrap';
 import { Trophy, DollarSign, Flame, Flag, Car, Mountain, Bike } from 'lucide-react';
 
-const BACKEND_URL = process.env.REACT_APP_BACKEND_URL;
-const API = `${BACKEND_URL}/api`;
-
 // Group configuration with colors and icons
 const GROUP_CONFIG = {
   'VELOCIDAD TOP': {
@@ -57,10 +54,10 @@ export const Categorias = () => {
 
   const fetchCategorias = async () => {
     try {
-      const response = await axios.get(`${API}/categories`);
-      setCategorias(response.data.categorias);
-      setPrecios(response.data.precios);
-      setGrupos(response.data.grupos || {});
+      const data = await fetchPublic('categories');
+      setCategorias(data.categorias);
+      setPrecios(data.precios);
+      setGrupos(data.grupos || {});
     } catch (error) {
       console.error('Error fetching categorias:', error);
     } finally {
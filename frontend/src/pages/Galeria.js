@@ -1,10 +1,8 @@
 import React, { useState, useEffect } from 'react';
-import axios from 'axios';
+import { fetchPublic } from '../lib/bootstrap';
+import { imageUrl, imageSrcSet } from '../lib/images';
 import { Image } from 'lucide-react';
 
-const BACKEND_URL = process.env.REACT_APP_BACKEND_URL;
-const API = `${BACKEND_URL}/api`;
-
 // Imágenes por defecto si no hay nada en la galería
 const defaultImages = [
   {
@@ -31,8 +29,8 @@ export const Galeria = () => {
 
   const fetchGallery = async () => {
     try {
-      const response = await axios.get(`${API}/gallery`);
-      const images = response.data.images || [];
+      const data = await fetchPublic('gallery');
+      const images = data.images || [];
       // Si no hay imágenes en la BD, usar las por defecto
       setImagenes(images.length > 0 ? images : defaultImages);
     } catch (error) {
@@ -43,12 +41,6 @@ export const Galeria = () => {
     }
   };
 
-  const getImageUrl = (url) => {
-    if (!url) return '';
-    if (url.startsWith('http')) return url;
-    return `${BACKEND_URL}${url}`;
-  };
-
   if (loading) {
     return (
       <div className="min-h-screen pt-32 flex items-center justify-center">
@@ -83,7 +75,11 @@ export const Galeria = () => {
                 className="group relative overflow-hidden border border-white/20 hover:border-primary transition-all duration-300 aspect-video"
               >
                 <img
-                  src={getImageUrl(imagen.url)}
+                  src={imageUrl(imagen.url, 'medium')}
+                  srcSet={imageSrcSet(imagen.url)}
+                  sizes="(min-width: 1024px) 33vw, (min-width: 768px) 50vw, 100vw"
+                  loading={index < 3 ? 'eager' : 'lazy'}
+                  decoding="async"
                   alt={imagen.title || imagen.titulo || 'Imagen de galería'}
                   className="w-full h-full object-cover transition-transform duration-500 group-hover:scale-110"
                 />
@@ -2,6 +2,7 @@ import React from 'react';
 import { Link } from 'react-router-dom';
 import { Calendar, Trophy, Flag, Timer, MapPin, Flame } from 'lucide-react';
 import { useSettings } from '../context/SettingsContext';
+import { imageUrl } from '../lib/images';
 
 export const Home = () => {
   const { settings, loading } = useSettings();
@@ -19,7 +20,7 @@ export const Home = () => {
       <section
         className="relative h-screen flex items-end pb-20"
         style={{
-          backgroundImage: `url(${settings.hero_image_url})`,
+          backgroundImage: `url(${imageUrl(settings.hero_image_url, 'full')})`,
           backgroundSize: 'cover',
           backgroundPosition: 'center',
         }}
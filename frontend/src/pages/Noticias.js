@@ -1,10 +1,7 @@
 import React, { useEffect, useState } from 'react';
-import axios from 'axios';
+import { fetchPublic } from '../lib/bootstrap';
 import { Calendar, Clock } from 'lucide-react';
 
-const BACKEND_URL = process.env.REACT_APP_BACKEND_URL;
-const API = `${BACKEND_URL}/api`;
-
 export const Noticias = () => {
   const [noticias, setNoticias] = useState([]);
   const [loading, setLoading] = useState(true);
@@ -15,8 +12,8 @@ export const Noticias = () => {
 
   const fetchNoticias = async () => {
     try {
-      const response = await axios.get(`${API}/news`);
-      setNoticias(response.data.news);
+      const data = await fetchPublic('news');
+      setNoticias(data.news);
     } catch (error) {
       console.error('Error fetching news:', error);
     } finally {
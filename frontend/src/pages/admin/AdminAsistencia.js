@@ -4,15 +4,19 @@ import { useNavigate } from 'react-router-dom';
 import { QrCode, Check, Users, TrendingUp } from 'lucide-react';
 import { Html5QrcodeScanner } from 'html5-qrcode';
 import { AdminNavbar } from '../../components/AdminNavbar';
+import { subscribeLiveEvents } from '../../lib/liveEvents';
 
 const BACKEND_URL = process.env.REACT_APP_BACKEND_URL;
 const API = `${BACKEND_URL}/api`;
+const CHECKED_IN_LIMIT = 50;
 
 export const AdminAsistencia = () => {
   const navigate = useNavigate();
   const [stats, setStats] = useState(null);
+  const [checkedIn, setCheckedIn] = useState([]);
   const [scanning, setScanning] = useState(false);
   const [scannedReg, setScannedReg] = useState(null);
+  const [details, setDetails] = useState(null);
   const [loading, setLoading] = useState(true);
 
   useEffect(() => {
@@ -22,6 +26,22 @@ export const AdminAsistencia = () => {
       return;
     }
     fetchStats(token);
+
+    // Apply each pushed event in place; only a `reset` (events missed) reloads from the API
+    const source = subscribeLiveEvents(API, token, {
+      'registration.created': () => applyCounts({ total_registrations: 1 }),
+      'registration.checked_in': (reg) => {
+        applyCounts({ checked_in: 1 });
+        setCheckedIn(prev => [reg, ...prev.filter(r => r.id !== reg.id)].slice(0, CHECKED_IN_LIMIT));
+      },
+      'registration.payment': (reg) => {
+        const wasPaid = reg.estado_pago_anterior === 'completado';
+        const isPaid = reg.estado_pago === 'completado';
+        if (wasPaid !== isPaid) applyCounts({ completed_payments: isPaid ? 1 : -1 });
+      },
+      reset: () => fetchStats(token),
+    });
+    return () => source.close();
   }, [navigate]);
 
   useEffect(() => {
@@ -39,12 +59,27 @@ export const AdminAsistencia = () => {
     }
   }, [scanning]);
 
+  const applyCounts = (deltas) => {
+    setStats(prev => {
+      if (!prev) return prev;
+      const next = { ...prev };
+      Object.entries(deltas).forEach(([field, delta]) => {
+        next[field] = (next[field] || 0) + delta;
+      });
+      next.attendance_rate = next.completed_payments > 0 ? (next.checked_in / next.completed_payments) * 100 : 0;
+      return next;
+    });
+  };
+
   const fetchStats = async (token) => {
     try {
-      const response = await axios.get(`${API}/admin/attendance`, {
-        headers: { Authorization: `Bearer ${token}` },
-      });
-      setStats(response.data);
+      const config = { headers: { Authorization: `Bearer ${token}` } };
+      const [statsResponse, checkedInResponse] = await Promise.all([
+        axios.get(`${API}/admin/attendance`, config),
+        axios.get(`${API}/admin/attendance/checked-in`, { ...config, params: { limit: CHECKED_IN_LIMIT } }),
+      ]);
+      setStats(statsResponse.data);
+      setCheckedIn(checkedInResponse.data.registrations);
     } catch (error) {
       console.error('Error fetching stats:', error);
     } finally {
@@ -56,9 +91,19 @@ export const AdminAsistencia = () => {
     try {
       const response = await axios.post(`${API}/qr/scan`, { qr_data: decodedText });
       setScannedReg(response.data);
+      setDetails(null);
       setScanning(false);
     } catch (error) {
-      alert('QR inválido');
+      alert(error.response?.status === 404 ? 'Inscripción no encontrada' : 'QR inválido');
+    }
+  };
+
+  const fetchDetails = async () => {
+    try {
+      const response = await axios.get(`${API}/registrations/${scannedReg.registration_id}`);
+      setDetails(response.data);
+    } catch (error) {
+      alert(error.response?.data?.detail || 'Error al cargar los datos del piloto');
     }
   };
 
@@ -71,12 +116,13 @@ export const AdminAsistencia = () => {
     try {
       await axios.post(
         `${API}/admin/check-in`,
-        { registration_id: scannedReg.registration.id },
+        { registration_id: scannedReg.registration_id },
         { headers: { Authorization: `Bearer ${token}` } }
       );
       alert('Check-in exitoso');
+      // The stats and the list update from the check-in event this sends
       setScannedReg(null);
-      fetchStats(token);
+      setDetails(null);
     } catch (error) {
       alert(error.response?.data?.detail || 'Error en check-in');
     }
@@ -141,12 +187,24 @@ export const AdminAsistencia = () => {
             {scannedReg && (
               <div className="mt-6 p-6 bg-black/50 border border-secondary">
                 <h3 className="font-heading text-xl font-bold mb-4">Información del Piloto</h3>
-                <div className="space-y-2 text-sm">
-                  <p><span className="text-white/70">Nombre:</span> <strong>{scannedReg.registration.nombre} {scannedReg.registration.apellido}</strong></p>
-                  <p><span className="text-white/70">Número:</span> <strong>#{scannedReg.registration.numero_competicion}</strong></p>
-                  <p><span className="text-white/70">Categorías:</span> {scannedReg.registration.categorias.length}</p>
-                  <p><span className="text-white/70">Pago:</span> <span className={scannedReg.registration.estado_pago === 'completado' ? 'text-secondary' : 'text-primary'}>{scannedReg.registration.estado_pago}</span></p>
-                </div>
+                {details ? (
+                  <div className="space-y-2 text-sm">
+                    <p><span className="text-white/70">Nombre:</span> <strong>{details.nombre} {details.apellido}</strong></p>
+                    <p><span className="text-white/70">Número:</span> <strong>#{details.numero_competicion}</strong></p>
+                    <p><span className="text-white/70">Categorías:</span> {details.categorias.length}</p>
+                    <p><span className="text-white/70">Pago:</span> <span className={details.estado_pago === 'completado' ? 'text-secondary' : 'text-primary'}>{details.estado_pago}</span></p>
+                  </div>
+                ) : (
+                  <div className="space-y-2 text-sm">
+                    <p><span className="text-white/70">Pago:</span> <span className={scannedReg.paid ? 'text-secondary' : 'text-primary'}>{scannedReg.paid ? 'completado' : 'pendiente'}</span></p>
+                    <button
+                      onClick={fetchDetails}
+                      className="w-full mt-2 bg-surface text-white font-heading font-bold uppercase px-6 py-2 border border-white/20"
+                    >
+                      Ver Datos del Piloto
+                    </button>
+                  </div>
+                )}
                 {scannedReg.can_check_in ? (
                   <button
                     onClick={handleCheckIn}
@@ -156,7 +214,7 @@ export const AdminAsistencia = () => {
                   </button>
                 ) : (
                   <div className="mt-4 p-3 bg-warning/20 border border-warning text-center">
-                    <p className="text-warning font-bold">Ya hizo check-in o pago pendiente</p>
+                    <p className="text-warning font-bold">{scannedReg.message || 'Ya hizo check-in o pago pendiente'}</p>
                   </div>
                 )}
               </div>
@@ -166,7 +224,7 @@ export const AdminAsistencia = () => {
           <div className="bg-surface border border-white/10 p-6">
             <h2 className="font-heading text-2xl font-bold uppercase mb-6">Últimos Check-ins</h2>
             <div className="space-y-3 max-h-96 overflow-y-auto">
-              {stats?.checked_in_list?.map((reg, idx) => (
+              {checkedIn.map((reg, idx) => (
                 <div key={idx} className="p-4 bg-black/50 border border-white/10">
                   <div className="flex justify-between items-start">
                     <div>
@@ -28,12 +28,11 @@ export const AdminDashboard = () => {
 
   const fetchStats = async (token) => {
     try {
-      // Fetch registrations
-      const regResponse = await axios.get(`${API}/registrations`, {
+      // Registration totals are aggregated by the server
+      const summaryResponse = await axios.get(`${API}/admin/registrations/summary`, {
         headers: { Authorization: `Bearer ${token}` },
       });
-      const registrations = regResponse.data.registrations || [];
-      const totalRevenue = registrations.reduce((sum, reg) => sum + (reg.precio_final || 0), 0);
+      const summary = summaryResponse.data;
       
       // Fetch coupons
       let cuponesActivos = 0;
@@ -59,8 +58,8 @@ export const AdminDashboard = () => {
       }
       
       setStats({ 
-        registrations: registrations.length, 
-        totalRevenue,
+        registrations: summary.total, 
+        totalRevenue: summary.revenue,
         cuponesActivos,
         cuponesUsados,
         noticias
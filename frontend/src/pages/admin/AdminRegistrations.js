@@ -3,6 +3,7 @@ import axios from 'axios';
 import { useNavigate } from 'react-router-dom';
 import { Users, Download, Filter, CheckCircle, XCircle, RefreshCw, Trash2, AlertTriangle } from 'lucide-react';
 import { AdminNavbar } from '../../components/AdminNavbar';
+import { fetchPage, downloadExport } from '../../lib/pagination';
 
 const BACKEND_URL = process.env.REACT_APP_BACKEND_URL;
 const API = `${BACKEND_URL}/api`;
@@ -10,6 +11,9 @@ const API = `${BACKEND_URL}/api`;
 export const AdminRegistrations = () => {
   const navigate = useNavigate();
   const [registrations, setRegistrations] = useState([]);
+  const [nextCursor, setNextCursor] = useState(null);
+  const [loadingMore, setLoadingMore] = useState(false);
+  const [summary, setSummary] = useState({ total: 0, by_status: {}, by_category: {} });
   const [categories, setCategories] = useState([]);
   const [loading, setLoading] = useState(true);
   const [selectedCategory, setSelectedCategory] = useState('all');
@@ -26,17 +30,37 @@ export const AdminRegistrations = () => {
       return;
     }
     fetchData(token);
-  }, [navigate]);
+  }, [navigate, selectedCategory, statusFilter]);
+
+  const authHeaders = (token) => ({ Authorization: `Bearer ${token}` });
+
+  // Filters are applied by the server, so each page only holds matching rows
+  const filterParams = () => {
+    const params = {};
+    if (selectedCategory !== 'all') params.categoria = selectedCategory;
+    if (statusFilter !== 'all') params.estado_pago = statusFilter;
+    return params;
+  };
+
+  const fetchSummary = async (token) => {
+    const response = await axios.get(`${API}/admin/registrations/summary`, {
+      headers: authHeaders(token),
+    });
+    setSummary(response.data);
+  };
 
   const fetchData = async (token) => {
     try {
-      const [regResponse, catResponse] = await Promise.all([
-        axios.get(`${API}/registrations`, {
-          headers: { Authorization: `Bearer ${token}` },
+      const [page, catResponse] = await Promise.all([
+        fetchPage(`${API}/registrations`, {
+          headers: authHeaders(token),
+          params: filterParams(),
         }),
-        axios.get(`${API}/categories`)
+        axios.get(`${API}/categories`),
+        fetchSummary(token)
       ]);
-      setRegistrations(regResponse.data.registrations || []);
+      setRegistrations(page.rows);
+      setNextCursor(page.nextCursor);
       setCategories(catResponse.data.categorias || []);
     } catch (error) {
       console.error('Error fetching data:', error);
@@ -49,6 +73,24 @@ export const AdminRegistrations = () => {
     }
   };
 
+  const handleLoadMore = async () => {
+    setLoadingMore(true);
+    const token = localStorage.getItem('admin_token');
+    
+    try {
+      const page = await fetchPage(`${API}/registrations`, {
+        headers: authHeaders(token),
+        params: filterParams(),
+      }, nextCursor);
+      setRegistrations(prev => [...prev, ...page.rows]);
+      setNextCursor(page.nextCursor);
+    } catch (error) {
+      alert('Error al cargar más inscripciones');
+    } finally {
+      setLoadingMore(false);
+    }
+  };
+
   const handleUpdateStatus = async (registrationId, newStatus) => {
     setUpdatingStatus(registrationId);
     const token = localStorage.getItem('admin_token');
@@ -57,7 +99,7 @@ export const AdminRegistrations = () => {
       await axios.put(
         `${API}/admin/registrations/${registrationId}/status`,
         { estado_pago: newStatus },
-        { headers: { Authorization: `Bearer ${token}` } }
+        { headers: authHeaders(token) }
       );
       
       // Update local state
@@ -68,6 +110,7 @@ export const AdminRegistrations = () => {
             : reg
         )
       );
+      fetchSummary(token);
       
       alert(`Estado actualizado a ${newStatus}`);
     } catch (error) {
@@ -88,10 +131,11 @@ export const AdminRegistrations = () => {
     try {
       await axios.delete(
         `${API}/admin/registrations/${registrationId}`,
-        { headers: { Authorization: `Bearer ${token}` } }
+        { headers: authHeaders(token) }
       );
       
       setRegistrations(prev => prev.filter(reg => reg.id !== registrationId));
+      fetchSummary(token);
       alert('Inscripción eliminada exitosamente');
     } catch (error) {
       alert('Error al eliminar inscripción');
@@ -105,18 +149,13 @@ export const AdminRegistrations = () => {
     
     try {
       let url = `${API}/admin/registrations`;
-      let message = '';
       
-      if (type === 'all') {
-        message = `Se eliminarán TODAS las ${registrations.length} inscripciones`;
-      } else {
+      if (type !== 'all') {
         url = `${API}/admin/registrations/status/${type}`;
-        const count = registrations.filter(r => r.estado_pago === type).length;
-        message = `Se eliminarán ${count} inscripciones con estado "${type}"`;
       }
       
       const response = await axios.delete(url, {
-        headers: { Authorization: `Bearer ${token}` }
+        headers: authHeaders(token)
       });
       
       alert(response.data.message);
@@ -142,58 +181,31 @@ export const AdminRegistrations = () => {
     });
   };
 
-  // Filter registrations
-  const filteredRegistrations = registrations.filter(reg => {
-    const categoryMatch = selectedCategory === 'all' || 
-      reg.categorias?.includes(selectedCategory);
-    const statusMatch = statusFilter === 'all' || 
-      reg.estado_pago === statusFilter;
-    return categoryMatch && statusMatch;
-  });
-
-  // Get unique categories from registrations
-  const usedCategories = [...new Set(registrations.flatMap(r => r.categorias || []))];
+  // Categories with at least one registration, counted by the server
+  const usedCategories = Object.keys(summary.by_category || {});
+  const statusCount = (status) => summary.by_status?.[status]?.registrations || 0;
 
-  // Export to CSV
-  const exportToCSV = (data, filename) => {
-    const headers = ['Nombre', 'Apellido', 'Cédula', 'Número', 'Correo', 'Celular', 'Categorías', 'Precio', 'Estado', 'Fecha'];
-    const rows = data.map(reg => [
-      reg.nombre,
-      reg.apellido,
-      reg.cedula,
-      reg.numero_competicion,
-      reg.correo,
-      reg.celular,
-      (reg.categorias || []).join('; '),
-      reg.precio_final || 0,
-      reg.estado_pago,
-      formatDate(reg.created_at)
-    ]);
-    
-    const csvContent = [headers, ...rows]
-      .map(row => row.map(cell => `"${cell}"`).join(','))
-      .join('\n');
-    
-    const blob = new Blob(['\ufeff' + csvContent], { type: 'text/csv;charset=utf-8;' });
-    const link = document.createElement('a');
-    link.href = URL.createObjectURL(blob);
-    link.download = `${filename}.csv`;
-    link.click();
+  // Export to CSV: the server streams every matching row, not only the loaded pages
+  const exportToCSV = (params, filename) => {
+    const token = localStorage.getItem('admin_token');
+    downloadExport(`${API}/admin/registrations/export`, {
+      headers: authHeaders(token),
+      params: { format: 'csv', ...params },
+    }, `${filename}.csv`).catch(() => alert('Error al exportar inscripciones'));
   };
 
   const handleExportAll = () => {
-    exportToCSV(registrations, 'inscripciones_todas');
+    exportToCSV({}, 'inscripciones_todas');
   };
 
   const handleExportFiltered = () => {
     const suffix = selectedCategory !== 'all' ? `_${selectedCategory.replace(/\s+/g, '_')}` : '';
     const statusSuffix = statusFilter !== 'all' ? `_${statusFilter}` : '';
-    exportToCSV(filteredRegistrations, `inscripciones${suffix}${statusSuffix}`);
+    exportToCSV(filterParams(), `inscripciones${suffix}${statusSuffix}`);
   };
 
   const handleExportByCategory = (category) => {
-    const categoryRegs = registrations.filter(r => r.categorias?.includes(category));
-    exportToCSV(categoryRegs, `inscripciones_${category.replace(/\s+/g, '_')}`);
+    exportToCSV({ categoria: category }, `inscripciones_${category.replace(/\s+/g, '_')}`);
   };
 
   const handleExportAllByCategory = () => {
@@ -268,22 +280,22 @@ export const AdminRegistrations = () => {
             <div className="grid grid-cols-1 md:grid-cols-4 gap-6 text-center">
               <div>
                 <p className="text-white/70 text-sm mb-1">Total Inscripciones</p>
-                <p className="font-heading text-3xl font-black text-primary">{registrations.length}</p>
+                <p className="font-heading text-3xl font-black text-primary">{summary.total}</p>
               </div>
               <div>
                 <p className="text-white/70 text-sm mb-1">Mostrando</p>
-                <p className="font-heading text-3xl font-black text-accent">{filteredRegistrations.length}</p>
+                <p className="font-heading text-3xl font-black text-accent">{registrations.length}</p>
               </div>
               <div>
                 <p className="text-white/70 text-sm mb-1">Pagos Pendientes</p>
                 <p className="font-heading text-3xl font-black text-warning">
-                  {registrations.filter((r) => r.estado_pago === 'pendiente').length}
+                  {statusCount('pendiente')}
                 </p>
               </div>
               <div>
                 <p className="text-white/70 text-sm mb-1">Pagos Completados</p>
                 <p className="font-heading text-3xl font-black text-secondary">
-                  {registrations.filter((r) => r.estado_pago === 'completado').length}
+                  {statusCount('completado')}
                 </p>
               </div>
             </div>
@@ -328,7 +340,7 @@ export const AdminRegistrations = () => {
               <p className="text-white/70 text-sm mb-3">Exportar por categoría individual:</p>
               <div className="flex flex-wrap gap-2">
                 {usedCategories.sort().map((cat, idx) => {
-                  const count = registrations.filter(r => r.categorias?.includes(cat)).length;
+                  const count = summary.by_category[cat];
                   return (
                     <button
                       key={idx}
@@ -360,7 +372,7 @@ export const AdminRegistrations = () => {
                 </tr>
               </thead>
               <tbody>
-                {filteredRegistrations.map((reg, index) => (
+                {registrations.map((reg, index) => (
                   <tr
                     key={reg.id}
                     data-testid={`registration-row-${index}`}
@@ -444,11 +456,25 @@ export const AdminRegistrations = () => {
             </table>
           </div>
 
-          {filteredRegistrations.length === 0 && (
+          {registrations.length === 0 && (
             <div className="text-center py-12 text-white/50">
               No hay inscripciones que coincidan con los filtros seleccionados.
             </div>
           )}
+
+          {nextCursor && (
+            <div className="text-center mt-6">
+              <button
+                onClick={handleLoadMore}
+                disabled={loadingMore}
+                className="inline-flex items-center space-x-2 bg-surface text-white font-heading font-bold uppercase px-6 py-3 border border-white/20 hover:border-primary transition-colors disabled:opacity-50"
+                data-testid="btn-cargar-mas"
+              >
+                {loadingMore && <RefreshCw className="w-4 h-4 animate-spin" />}
+                <span>Cargar más</span>
+              </button>
+            </div>
+          )}
         </div>
       </div>
 
@@ -465,8 +491,8 @@ export const AdminRegistrations = () => {
             
             <p className="text-white mb-4">
               {deleteAllType === 'all' 
-                ? `¿Estás seguro de eliminar TODAS las ${registrations.length} inscripciones? Esta acción NO se puede deshacer.`
-                : `¿Estás seguro de eliminar todas las inscripciones con estado "${deleteAllType}"? Esta acción NO se puede deshacer.`
+                ? `¿Estás seguro de eliminar TODAS las ${summary.total} inscripciones? Esta acción NO se puede deshacer.`
+                : `¿Estás seguro de eliminar todas las ${statusCount(deleteAllType)} inscripciones con estado "${deleteAllType}"? Esta acción NO se puede deshacer.`
               }
             </p>
             
@@ -1,10 +1,11 @@
 import React, { useState, useEffect } from 'react';
 import { useNavigate, Link } from 'react-router-dom';
-import axios from 'axios';
 import { 
   Shield, ArrowLeft, Search, Download, Users,
   DollarSign, CheckCircle, Clock, XCircle
 } from 'lucide-react';
+import axios from 'axios';
+import { fetchPage, downloadExport } from '../../lib/pagination';
 
 const API = `${process.env.REACT_APP_BACKEND_URL}/api`;
 
@@ -12,6 +13,9 @@ export const SuperAdminRegistrations = () => {
   const navigate = useNavigate();
   const [registrations, setRegistrations] = useState([]);
   const [filteredRegistrations, setFilteredRegistrations] = useState([]);
+  const [nextCursor, setNextCursor] = useState(null);
+  const [loadingMore, setLoadingMore] = useState(false);
+  const [summary, setSummary] = useState({ total: 0, by_status: {} });
   const [loading, setLoading] = useState(true);
   const [searchTerm, setSearchTerm] = useState('');
   const [statusFilter, setStatusFilter] = useState('all');
@@ -23,19 +27,27 @@ export const SuperAdminRegistrations = () => {
       return;
     }
     fetchRegistrations();
-  }, [navigate]);
+  }, [navigate, statusFilter]);
 
   useEffect(() => {
     filterRegistrations();
-  }, [registrations, searchTerm, statusFilter]);
+  }, [registrations, searchTerm]);
+
+  // The status filter is applied by the server; the search only covers the loaded pages
+  const requestConfig = () => ({
+    headers: { Authorization: `Bearer ${localStorage.getItem('super_admin_token')}` },
+    params: statusFilter !== 'all' ? { estado_pago: statusFilter } : {},
+  });
 
   const fetchRegistrations = async () => {
     try {
-      const token = localStorage.getItem('super_admin_token');
-      const response = await axios.get(`${API}/superadmin/registrations`, {
-        headers: { Authorization: `Bearer ${token}` }
-      });
-      setRegistrations(response.data.registrations);
+      const [page, summaryResponse] = await Promise.all([
+        fetchPage(`${API}/superadmin/registrations`, requestConfig()),
+        axios.get(`${API}/admin/registrations/summary`, requestConfig())
+      ]);
+      setRegistrations(page.rows);
+      setNextCursor(page.nextCursor);
+      setSummary(summaryResponse.data);
     } catch (error) {
       if (error.response?.status === 401 || error.response?.status === 403) {
         localStorage.removeItem('super_admin_token');
@@ -46,6 +58,19 @@ export const SuperAdminRegistrations = () => {
     }
   };
 
+  const loadMore = async () => {
+    setLoadingMore(true);
+    try {
+      const page = await fetchPage(`${API}/superadmin/registrations`, requestConfig(), nextCursor);
+      setRegistrations(prev => [...prev, ...page.rows]);
+      setNextCursor(page.nextCursor);
+    } catch (error) {
+      console.error('Error loading registrations:', error);
+    } finally {
+      setLoadingMore(false);
+    }
+  };
+
   const filterRegistrations = () => {
     let filtered = registrations;
 
@@ -59,10 +84,6 @@ export const SuperAdminRegistrations = () => {
       );
     }
 
-    if (statusFilter !== 'all') {
-      filtered = filtered.filter(reg => reg.estado_pago === statusFilter);
-    }
-
     setFilteredRegistrations(filtered);
   };
 
@@ -91,38 +112,29 @@ export const SuperAdminRegistrations = () => {
     );
   };
 
+  // Every matching registration is streamed by the server, not only the loaded pages
   const exportToCSV = () => {
-    const headers = ['Nombre', 'Apellido', 'Email', 'Cédula', 'Total', 'Comisión', 'Neto Evento', 'Estado', 'Fecha'];
-    const rows = filteredRegistrations.map(reg => [
-      reg.nombre,
-      reg.apellido,
-      reg.correo,
-      reg.cedula,
-      reg.precio_final,
-      reg.comision_plataforma || 0,
-      reg.neto_evento || reg.precio_final,
-      reg.estado_pago,
-      new Date(reg.created_at).toLocaleDateString()
-    ]);
-
-    const csvContent = [headers, ...rows].map(row => row.join(',')).join('\n');
-    const blob = new Blob([csvContent], { type: 'text/csv;charset=utf-8;' });
-    const link = document.createElement('a');
-    link.href = URL.createObjectURL(blob);
-    link.download = `registros_${new Date().toISOString().split('T')[0]}.csv`;
-    link.click();
+    const config = requestConfig();
+    downloadExport(`${API}/admin/registrations/export`, {
+      ...config,
+      params: {
+        ...config.params,
+        format: 'csv',
+        fields: 'nombre,apellido,correo,cedula,precio_final,comision_plataforma,neto_evento,estado_pago,created_at',
+      },
+    }, `registros_${new Date().toISOString().split('T')[0]}.csv`).catch((error) => {
+      console.error('Error exporting registrations:', error);
+    });
   };
 
-  // Calculate totals
-  const totals = filteredRegistrations.reduce((acc, reg) => {
-    if (reg.estado_pago === 'completado') {
-      acc.revenue += reg.precio_final || 0;
-      acc.commission += reg.comision_plataforma || 0;
-      acc.netToEvent += reg.neto_evento || reg.precio_final || 0;
-      acc.completed += 1;
-    }
-    return acc;
-  }, { revenue: 0, commission: 0, netToEvent: 0, completed: 0 });
+  // Totals of paid registrations, aggregated by the server
+  const completed = summary.by_status?.completado || {};
+  const totals = {
+    revenue: completed.revenue || 0,
+    commission: completed.commission || 0,
+    netToEvent: completed.net || 0,
+    completed: completed.registrations || 0,
+  };
 
   if (loading) {
     return (
@@ -262,8 +274,21 @@ export const SuperAdminRegistrations = () => {
         </div>
 
         <p className="text-gray-500 text-sm mt-4 text-center">
-          Mostrando {filteredRegistrations.length} de {registrations.length} registros
+          Mostrando {filteredRegistrations.length} de {summary.total} registros
         </p>
+
+        {nextCursor && (
+          <div className="text-center mt-4">
+            <button
+              onClick={loadMore}
+              disabled={loadingMore}
+              className="bg-purple-600 text-white px-4 py-3 rounded-lg hover:bg-purple-700 transition-colors disabled:opacity-50"
+              data-testid="load-more-btn"
+            >
+              {loadingMore ? 'Cargando...' : 'Cargar más'}
+            </button>
+          </div>
+        )}
       </main>
     </div>
   );
@@ -0,0 +1,65 @@
+#!/usr/bin/env python3
+"""
+Convierte a fechas BSON los timestamps guardados como texto ISO
+(created_at, check_in_time, updated_at, ...) en todas las colecciones
+listadas en backend/date_migration.py.
+
+Trabaja por lotes en orden de _id y guarda el avance en la colección
+`migrations`, así que se puede interrumpir y volver a ejecutar: continúa
+donde quedó. Ejecutarlo justo después de desplegar la versión que ya
+escribe fechas BSON. Mientras tanto conviven fechas y textos: los
+listados, filtros por fecha y la liberación de cupones leen ambos tipos
+(las inscripciones nuevas aparecen antes que todas las antiguas), pero
+la línea de tiempo (/admin/registrations/timeline) solo cuenta las
+inscripciones ya convertidas.
+
+Uso:
+  python3 migrate_dates_to_bson.py [--desde-cero] [--lote N]
+"""
+
+import argparse
+import asyncio
+import sys
+from motor.motor_asyncio import AsyncIOMotorClient
+import os
+from dotenv import load_dotenv
+from pathlib import Path
+
+# Cargar variables de entorno
+ROOT_DIR = Path(__file__).parent
+load_dotenv(ROOT_DIR / 'backend/.env')
+sys.path.insert(0, str(ROOT_DIR / 'backend'))
+
+from date_migration import DATE_FIELDS, MIGRATION_BATCH_SIZE, migrate_collection, reset_migration
+
+MONGO_URL = os.environ.get('MONGO_URL')
+DB_NAME = os.environ.get('DB_NAME')
+
+def report(name: str, converted: int, unparsed: int):
+    print(f"     {name}: {converted} convertidos, {unparsed} sin formato válido", end="\r")
+
+async def migrate(from_scratch: bool, batch_size: int):
+    print(f"Conectando a MongoDB: {MONGO_URL[:30]}...")
+    client = AsyncIOMotorClient(MONGO_URL, tz_aware=True)
+    db = client[DB_NAME]
+
+    if from_scratch:
+        await reset_migration(db)
+        print("Avance anterior descartado")
+
+    for name, fields in DATE_FIELDS.items():
+        print(f"\n{name} ({', '.join(fields)})")
+        result = await migrate_collection(db, name, fields, batch_size, progress=report)
+        print(f"   ✓ {result['converted']} documentos convertidos" + " " * 30)
+        if result["unparsed"]:
+            print(f"   ⚠ {result['unparsed']} documentos con fechas que no se pudieron leer (se dejaron igual)")
+
+    client.close()
+    print("\n¡Migración completada!")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Migra timestamps ISO a fechas BSON")
+    parser.add_argument("--desde-cero", action="store_true", help="Ignorar el avance guardado")
+    parser.add_argument("--lote", type=int, default=MIGRATION_BATCH_SIZE, help="Documentos por lote")
+    args = parser.parse_args()
+    asyncio.run(migrate(args.desde_cero, args.lote))
@@ -0,0 +1,52 @@
+#!/usr/bin/env python3
+"""
+Migración: elimina el campo qr_code (PNG en base64) de las inscripciones.
+Los QR ahora se sirven desde GET /api/registration/{id}/qr y se cachean en disco,
+así que el campo solo infla los listados. La migración es idempotente.
+
+Uso:
+  python3 strip_registration_qr_codes.py
+"""
+
+import asyncio
+from motor.motor_asyncio import AsyncIOMotorClient
+import os
+from dotenv import load_dotenv
+from pathlib import Path
+
+# Cargar variables de entorno
+ROOT_DIR = Path(__file__).parent
+load_dotenv(ROOT_DIR / 'backend/.env')
+
+MONGO_URL = os.environ.get('MONGO_URL')
+DB_NAME = os.environ.get('DB_NAME')
+
+async def collection_size(db):
+    stats = await db.command("collStats", "registrations")
+    return stats.get("count", 0), stats.get("avgObjSize", 0), stats.get("size", 0)
+
+async def strip_qr_codes():
+    print(f"Conectando a MongoDB: {MONGO_URL[:30]}...")
+    client = AsyncIOMotorClient(MONGO_URL)
+    db = client[DB_NAME]
+    
+    count, avg_size, total_size = await collection_size(db)
+    print(f"\nAntes: {count} inscripciones, {avg_size} bytes promedio, {total_size} bytes en total")
+    
+    pending = await db.registrations.count_documents({"qr_code": {"$exists": True}})
+    print(f"Inscripciones con qr_code embebido: {pending}")
+    
+    result = await db.registrations.update_many(
+        {"qr_code": {"$exists": True}},
+        {"$unset": {"qr_code": ""}}
+    )
+    print(f"   ✓ qr_code eliminado de {result.modified_count} inscripciones")
+    
+    count, avg_size, total_size = await collection_size(db)
+    print(f"\nDespués: {count} inscripciones, {avg_size} bytes promedio, {total_size} bytes en total")
+    
+    client.close()
+    print("\n¡Migración completada!")
+
+if __name__ == "__main__":
+    asyncio.run(strip_qr_codes())
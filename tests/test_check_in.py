@@ -0,0 +1,82 @@
+import asyncio
+from datetime import datetime, timezone, timedelta
+
+import pytest
+
+from check_in import (
+    SCAN_MAX_AGE, SCAN_MAX_CLOCK_SKEW, CHECKED_IN, ALREADY_CHECKED_IN, UNPAID, NOT_FOUND,
+    ScanTimeOutOfRange, parse_scanned_at, batch_check_in,
+)
+
+NOW = datetime(2026, 3, 14, 12, 0, tzinfo=timezone.utc)
+
+def test_parse_scanned_at_defaults_to_now():
+    assert parse_scanned_at(None, NOW) == NOW
+    assert parse_scanned_at("", NOW) == NOW
+
+def test_parse_scanned_at_accepts_the_window_edges():
+    oldest = NOW - SCAN_MAX_AGE
+    newest = NOW + SCAN_MAX_CLOCK_SKEW
+    assert parse_scanned_at(oldest.isoformat(), NOW) == oldest
+    assert parse_scanned_at(newest.isoformat(), NOW) == newest
+
+@pytest.mark.parametrize("offset", [-SCAN_MAX_AGE - timedelta(seconds=1), SCAN_MAX_CLOCK_SKEW + timedelta(seconds=1)])
+def test_parse_scanned_at_rejects_times_outside_the_window(offset):
+    with pytest.raises(ScanTimeOutOfRange):
+        parse_scanned_at((NOW + offset).isoformat(), NOW)
+
+def test_parse_scanned_at_reads_z_and_naive_times_as_utc():
+    expected = NOW - timedelta(minutes=5)
+    assert parse_scanned_at("2026-03-14T11:55:00Z", NOW) == expected
+    assert parse_scanned_at("2026-03-14T11:55:00", NOW) == expected
+
+def _registration(registration_id, **fields):
+    return {"id": registration_id, "nombre": "Piloto", "apellido": registration_id, "numero_competicion": "1",
+            "categorias": [], "estado_pago": "completado", "check_in": False, "check_in_time": None, **fields}
+
+def test_batch_check_in_attributes_each_conflict():
+    mongomock_motor = pytest.importorskip("mongomock_motor")
+    db = mongomock_motor.AsyncMongoMockClient(tz_aware=True)["test"]
+    now = datetime.now(timezone.utc).replace(microsecond=0)
+    earlier, later = now - timedelta(minutes=10), now - timedelta(minutes=5)
+
+    async def run():
+        await db.registrations.insert_many([
+            _registration("fresh"),
+            _registration("twice"),
+            _registration("synced", check_in=True, check_in_time=earlier, check_in_gate="gate-b"),
+            _registration("unpaid", estado_pago="pendiente"),
+        ])
+        return await batch_check_in(db, [
+            {"registration_id": "fresh", "scanned_at": later.isoformat(), "gate_id": "gate-a"},
+            # Listed second but scanned first: the earlier scan wins within the batch
+            {"registration_id": "twice", "scanned_at": later.isoformat(), "gate_id": "gate-a"},
+            {"registration_id": "twice", "scanned_at": earlier.isoformat(), "gate_id": "gate-c"},
+            {"registration_id": "synced", "scanned_at": later.isoformat(), "gate_id": "gate-a"},
+            {"registration_id": "unpaid", "scanned_at": later.isoformat(), "gate_id": "gate-a"},
+            {"registration_id": "missing", "scanned_at": later.isoformat(), "gate_id": "gate-a"},
+        ])
+
+    results = asyncio.run(run())
+    assert [result["code"] for result in results] == [
+        CHECKED_IN, ALREADY_CHECKED_IN, CHECKED_IN, ALREADY_CHECKED_IN, UNPAID, NOT_FOUND,
+    ]
+    assert results[0]["pilot"]["apellido"] == "fresh"
+    assert results[1]["conflict"] == {"check_in_time": earlier, "gate_id": "gate-c"}
+    assert results[3]["conflict"] == {"check_in_time": earlier, "gate_id": "gate-b"}
+    assert "conflict" not in results[4] and "conflict" not in results[5]
+
+def test_batch_check_in_rejects_the_whole_batch_on_a_bad_time():
+    mongomock_motor = pytest.importorskip("mongomock_motor")
+    db = mongomock_motor.AsyncMongoMockClient(tz_aware=True)["test"]
+
+    async def run():
+        await db.registrations.insert_one(_registration("fresh"))
+        with pytest.raises(ScanTimeOutOfRange):
+            await batch_check_in(db, [
+                {"registration_id": "fresh"},
+                {"registration_id": "fresh", "scanned_at": "2000-01-01T00:00:00Z"},
+            ])
+        return await db.registrations.find_one({"id": "fresh"})
+
+    assert asyncio.run(run())["check_in"] is False
@@ -0,0 +1,68 @@
+import asyncio
+
+import pytest
+
+from coupon_redemption import RESERVED, EXHAUSTED, INVALID, reserve_coupon, release_coupon
+
+mongomock_motor = pytest.importorskip("mongomock_motor")
+
+def _coupon(codigo, **fields):
+    return {"codigo": codigo, "activo": True, "tipo_descuento": "porcentaje", "usos_actuales": 0, "usos_maximos": 3, **fields}
+
+def _db():
+    return mongomock_motor.AsyncMongoMockClient()["test"]
+
+def test_reserve_coupon_takes_one_use():
+    db = _db()
+
+    async def run():
+        await db.coupons.insert_one(_coupon("SUPERGP"))
+        # Codes are matched the way users type them
+        return await reserve_coupon(db, " supergp "), await db.coupons.find_one({"codigo": "SUPERGP"})
+
+    (status, coupon), stored = asyncio.run(run())
+    assert status == RESERVED
+    assert coupon["usos_actuales"] == 1
+    assert stored["usos_actuales"] == 1
+
+def test_reserve_coupon_reports_exhaustion_without_taking_a_use():
+    db = _db()
+
+    async def run():
+        await db.coupons.insert_one(_coupon("LLENO", usos_actuales=3))
+        return await reserve_coupon(db, "LLENO"), await db.coupons.find_one({"codigo": "LLENO"})
+
+    (status, coupon), stored = asyncio.run(run())
+    assert (status, coupon) == (EXHAUSTED, None)
+    assert stored["usos_actuales"] == 3
+
+def test_release_coupon_gives_back_one_use_and_stops_at_zero():
+    db = _db()
+
+    async def run():
+        await db.coupons.insert_many([_coupon("LLENO", usos_actuales=3), _coupon("NUEVO")])
+        await release_coupon(db, "lleno")
+        await release_coupon(db, "NUEVO")
+        return {coupon["codigo"]: coupon["usos_actuales"] async for coupon in db.coupons.find()}
+
+    assert asyncio.run(run()) == {"LLENO": 2, "NUEVO": 0}
+
+@pytest.mark.parametrize("usos_maximos", [None, 0])
+def test_reserve_coupon_without_limit_never_runs_out(usos_maximos):
+    db = _db()
+
+    async def run():
+        await db.coupons.insert_one(_coupon("LIBRE", usos_actuales=500, usos_maximos=usos_maximos))
+        return await reserve_coupon(db, "LIBRE")
+
+    assert asyncio.run(run())[0] == RESERVED
+
+@pytest.mark.parametrize("codigo", ["NOEXISTE", "INACTIVO"])
+def test_reserve_coupon_rejects_unknown_and_inactive_codes(codigo):
+    db = _db()
+
+    async def run():
+        await db.coupons.insert_one(_coupon("INACTIVO", activo=False))
+        return await reserve_coupon(db, codigo)
+
+    assert asyncio.run(run()) == (INVALID, None)
@@ -0,0 +1,45 @@
+import asyncio
+from datetime import datetime, timezone, timedelta
+
+import pytest
+from fastapi import HTTPException
+
+from registration_query import encode_cursor, decode_cursor, fetch_registration_page
+
+CREATED = datetime(2026, 3, 1, 9, 30, 15, 123000, tzinfo=timezone.utc)
+
+@pytest.mark.parametrize("doc, field", [
+    ({"id": "a1", "created_at": CREATED}, "created_at"),
+    # ISO strings not yet migrated by migrate_dates_to_bson.py
+    ({"id": "a2", "created_at": CREATED.isoformat()}, "created_at"),
+    ({"id": "a3", "check_in_time": None}, "check_in_time"),
+])
+def test_cursor_round_trips(doc, field):
+    assert decode_cursor(encode_cursor(doc, field), field) == doc
+
+@pytest.mark.parametrize("cursor", ["not-base64!", "e30", "eyJpZCI6ImExIn0"])
+def test_decode_cursor_rejects_garbage(cursor):
+    with pytest.raises(HTTPException) as error:
+        decode_cursor(cursor)
+    assert error.value.status_code == 400
+
+def test_pages_cover_every_registration_once():
+    mongomock_motor = pytest.importorskip("mongomock_motor")
+    collection = mongomock_motor.AsyncMongoMockClient(tz_aware=True)["test"]["registrations"]
+    # Pairs share a created_at, so the id tie-break decides page boundaries
+    docs = [{"id": f"r{i:02d}", "created_at": CREATED + timedelta(seconds=i // 2)} for i in range(11)]
+
+    async def run():
+        await collection.insert_many([dict(doc) for doc in docs])
+        pages, cursor = [], None
+        while True:
+            page = await fetch_registration_page(collection, {}, {"_id": 0, "id": 1, "created_at": 1}, cursor, limit=4)
+            pages.append(page)
+            cursor = page["next_cursor"]
+            if cursor is None:
+                return pages
+
+    pages = asyncio.run(run())
+    assert [page["count"] for page in pages] == [4, 4, 3]
+    ids = [row["id"] for page in pages for row in page["registrations"]]
+    assert ids == [doc["id"] for doc in sorted(docs, key=lambda doc: (doc["created_at"], doc["id"]), reverse=True)]
@@ -0,0 +1,54 @@
+import asyncio
+
+import pytest
+from fastapi import HTTPException
+from starlette.requests import Request
+
+from upload_pipeline import ImageUploadPipeline, sniff_image_format
+
+PNG_HEAD = b"\x89PNG\r\n\x1a\n" + b"\x00" * 8
+WEBP_HEAD = b"RIFF\x00\x00\x00\x00WEBPVP8 "
+
+@pytest.mark.parametrize("head, expected", [
+    (b"\xff\xd8\xff\xe0" + b"\x00" * 8, "jpg"),
+    (PNG_HEAD, "png"),
+    (b"GIF89a" + b"\x00" * 6, "gif"),
+    (WEBP_HEAD, "webp"),
+    (b"<html><body>", None),
+    (b"RIFF\x00\x00\x00\x00WAVE", None),
+    (b"MZ\x90\x00" + b"\x00" * 8, None),
+])
+def test_sniff_image_format(head, expected):
+    assert sniff_image_format(head) == expected
+
+def _multipart_request(filename: str, content: bytes) -> Request:
+    body = (
+        b"--B\r\n"
+        b'Content-Disposition: form-data; name="file"; filename="' + filename.encode() + b'"\r\n'
+        b"Content-Type: image/png\r\n\r\n" + content + b"\r\n--B--\r\n"
+    )
+    chunks = [body[:40], body[40:]]
+
+    async def receive():
+        chunk = chunks.pop(0) if chunks else b""
+        return {"type": "http.request", "body": chunk, "more_body": bool(chunks)}
+
+    headers = [(b"content-type", b"multipart/form-data; boundary=B"), (b"content-length", str(len(body)).encode())]
+    return Request({"type": "http", "method": "POST", "headers": headers}, receive)
+
+def test_upload_rejects_a_disguised_file_and_leaves_nothing_staged(tmp_path):
+    pipeline = ImageUploadPipeline(tmp_path)
+    # The name and declared type say PNG; the bytes say otherwise
+    request = _multipart_request("photo.png", b"<html><script>alert(1)</script></html>" * 10)
+
+    with pytest.raises(HTTPException) as error:
+        asyncio.run(pipeline.receive(request))
+    assert error.value.status_code == 400
+    assert list(tmp_path.iterdir()) == []
+
+def test_upload_keeps_the_sniffed_format(tmp_path):
+    pipeline = ImageUploadPipeline(tmp_path)
+    # Named .jpg, but the extension comes from the bytes
+    upload = asyncio.run(pipeline.receive(_multipart_request("photo.jpg", PNG_HEAD * 4)))
+    assert (upload.format, upload.size, upload.filename) == ("png", 64, "photo.jpg")
+    assert upload.path.read_bytes() == PNG_HEAD * 4